@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""ベンチマーク（オフラインで実行： python -m bench.<名前>）"""
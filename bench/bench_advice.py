@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# local_advice のベンチマーク：旧 if/elif 版 と ルール表エンジン版
+# - 全入力で出力が完全一致することを確認してから速度を比べる
+# - --rules でダミールールを足し、ルール数が増えても1回あたりのコストが変わらないことを確認
+# 実行例： python -m bench.bench_advice --rules 0 1000 5000
+
+import argparse
+import time
+
+from painnavi.engine import AdviceEngine, SCAN_FIELDS, TEXT_FIELDS
+from painnavi.rules import RULES
+from bench.corpus import iter_intakes, synthetic_rules
+from bench.legacy_advice import local_advice as legacy_advice
+
+
+class LinearEngine(AdviceEngine):
+    """比較用：毎回すべてのルールのキーワードを部分文字列検索する（旧実装と同じくルール数に比例）"""
+
+    def _scan(self, intake):
+        fields = {f: getattr(intake, f) or "" for f in SCAN_FIELDS}
+        fields["text"] = " ".join(fields[f] for f in TEXT_FIELDS)
+        hits = {f: set() for f in fields}
+        for r in self.rules:
+            for f, kws in r.get("any", {}).items():
+                hits[f].update(w for w in kws if w in fields[f])
+        return hits
+
+
+def timeit(fn, intakes, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for x in intakes:
+            fn(x)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--rules", type=int, nargs="*", default=[0, 1000, 5000],
+                    help="追加するダミールール数（複数指定可）")
+    args = ap.parse_args(argv)
+
+    intakes = list(iter_intakes())
+    engine = AdviceEngine(RULES)
+    mismatch = [x for x in intakes if engine.advise(x) != legacy_advice(x)]
+    print(f"入力 {len(intakes)} 件 / 出力不一致 {len(mismatch)} 件")
+    if mismatch:
+        print("例:", mismatch[0])
+        return 1
+
+    t = timeit(legacy_advice, intakes, args.repeat)
+    print(f"{'legacy (if/elif)':<24} rules={len(RULES):>5}  {len(intakes)/t:>10.0f} calls/s  {t/len(intakes)*1e6:7.1f} us/call")
+    for extra in args.rules:
+        rules = RULES + synthetic_rules(extra)
+        for name, cls in [("engine (automaton)", AdviceEngine), ("linear scan", LinearEngine)]:
+            eng = cls(rules)
+            t = timeit(eng.advise, intakes, args.repeat)
+            print(f"{name:<24} rules={len(rules):>5}  {len(intakes)/t:>10.0f} calls/s  {t/len(intakes)*1e6:7.1f} us/call")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
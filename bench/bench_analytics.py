@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# ログ分析（列キャッシュ）のベンチマーク：初回の解析・保存済み配列の読み込み・集計の時間
+# - 比較用に csv.DictReader で全ファイルを読み直して部位ごとに数える場合も測る
+# 実行例： python -m bench.bench_analytics --sizes 100000 1000000
+
+import argparse
+import csv
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+from painnavi.analytics import ColumnStore, counts, red_flag_trend, top_items, trend
+from painnavi.painlog import log_files
+from bench.bench_history import make_logs
+
+
+def csv_counts(log_dir):
+    cnt = Counter()
+    for p in log_files(log_dir):
+        with open(p, encoding="utf-8", newline="") as f:
+            cnt.update(r["part"] for r in csv.DictReader(f))
+    return cnt
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, (time.perf_counter() - t0) * 1000
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="*", default=[100_000, 1_000_000])
+    args = ap.parse_args(argv)
+
+    print(f"{'件数':>9}{'CSV再読込':>12}{'初回解析':>12}{'配列読込':>12}{'結合済み':>10}{'内訳':>9}{'週推移':>9}{'赤旗':>9}{'提案上位':>10}")
+    for size in args.sizes:
+        log_dir = make_logs(size)
+        cache = tempfile.mkdtemp()
+        try:
+            naive, t_csv = timed(lambda: csv_counts(log_dir))
+            _, t_cold = timed(lambda: ColumnStore(log_dir, cache).frame())
+            store = ColumnStore(log_dir, cache)
+            cols, t_load = timed(store.frame)
+            _, t_warm = timed(store.frame)
+            by_part, t_cnt = timed(lambda: counts(cols, "part"))
+            assert dict(by_part) == dict(naive)
+            _, t_trend = timed(lambda: trend(cols, "type", "W"))
+            _, t_red = timed(lambda: red_flag_trend(cols, "D", {"part": "膝"}))
+            _, t_top = timed(lambda: top_items(cols, "tips", 10))
+        finally:
+            shutil.rmtree(cache, ignore_errors=True)
+        print(f"{size:>9}" + "".join(f"{t:>10.1f}ms" for t in (t_csv, t_cold, t_load))
+              + f"{t_warm:>8.2f}ms" + "".join(f"{t:>7.1f}ms" for t in (t_cnt, t_trend, t_red)) + f"{t_top:>8.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# HTTP API の負荷試験（ローカルで完結）：サーバを子プロセスで起動し、keep-alive の接続で並行にリクエストを送る
+# - 1件の /v1/advice と、一括の /v1/advice/batch を測る（req/s・件/s・遅延の中央値/p99）
+# - 送信側は asyncio の素のソケット（HTTP/1.1 keep-alive）。重いクライアントで CPU を取り合わないように
+# 実行例： python -m bench.bench_api --workers 0 2 --concurrency 32 --requests 5000
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from bench.corpus import iter_intakes
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def records(n):
+    out = []
+    for i, x in enumerate(itertools.islice(iter_intakes(), 0, None, 37)):
+        if len(out) >= n:
+            break
+        out.append({"id": i, "part": x.part, "ptype": x.ptype, "intensity": x.intensity, "onset": x.onset,
+                    "diurnal": x.diurnal, "factor": x.factor, "free_text": x.free_text})
+    return out
+
+
+def start_server(port, workers, processes=1, timeout=60):
+    proc = subprocess.Popen([sys.executable, "-m", "painnavi.api", "--port", str(port), "--workers", str(workers),
+                             "--processes", str(processes)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=dict(os.environ))
+    url = f"http://127.0.0.1:{port}"
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        try:
+            with urllib.request.urlopen(url + "/readyz", timeout=1):
+                return proc, url, time.perf_counter() - t0
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("サーバが起動しませんでした")
+
+
+async def _post(reader, writer, host, path, body: bytes):
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = next(int(l.split(b":", 1)[1]) for l in head.split(b"\r\n") if l.lower().startswith(b"content-length:"))
+    await reader.readexactly(length)
+    if status != 200:
+        raise RuntimeError(f"HTTP {status}")
+
+
+async def load(url, path, bodies, n, concurrency):
+    """n 回のリクエストを concurrency 本の keep-alive 接続から送る。遅延（秒）のリストと全体の秒数を返す"""
+    host, port = url.rsplit("/", 1)[-1].split(":")
+    payloads = [json.dumps(b, ensure_ascii=False).encode("utf-8") for b in bodies]
+    lat = []
+    counter = itertools.count()
+
+    async def worker():
+        reader, writer = await asyncio.open_connection(host, int(port))
+        try:
+            while (i := next(counter)) < n:
+                t0 = time.perf_counter()
+                await _post(reader, writer, host, path, payloads[i % len(payloads)])
+                lat.append(time.perf_counter() - t0)
+        finally:
+            writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return lat, time.perf_counter() - t0
+
+
+def report(name, lat, total, items_per_req=1):
+    lat = sorted(lat)
+    print(f"  {name:<18}{len(lat) / total:>9.0f} req/s{len(lat) * items_per_req / total:>10.0f} 件/s"
+          f"  中央値 {statistics.median(lat) * 1000:6.2f} ms  p99 {lat[int(len(lat) * 0.99) - 1] * 1000:6.2f} ms")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, nargs="*", default=[0, 2], help="サーバのワーカー数（複数指定で比較）")
+    ap.add_argument("--processes", type=int, default=1)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--requests", type=int, default=3000)
+    ap.add_argument("--batch-size", type=int, default=100)
+    args = ap.parse_args(argv)
+
+    recs = records(2000)
+    batches = [{"items": recs[i:i + args.batch_size]} for i in range(0, len(recs), args.batch_size)]
+    for workers in args.workers:
+        proc, url, ready = start_server(free_port(), workers, args.processes)
+        try:
+            print(f"workers={workers} processes={args.processes}（起動から ready まで {ready:.1f} s）")
+            asyncio.run(load(url, "/v1/advice", recs, 200, args.concurrency))      # 暖機
+            report("/v1/advice", *asyncio.run(load(url, "/v1/advice", recs, args.requests, args.concurrency)))
+            report("/v1/redflags", *asyncio.run(load(url, "/v1/redflags", recs, args.requests, args.concurrency)))
+            n = max(10, args.requests // args.batch_size)
+            report(f"/v1/advice/batch", *asyncio.run(load(url, "/v1/advice/batch", batches, n,
+                                                            min(args.concurrency, 8))), args.batch_size)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# 履歴読み込みのベンチマーク：10^3〜10^6 件のログから直近N件・部位ごとの直近N件・似た相談N件を取る時間
+# - 旧実装（最新ファイルを csv.DictReader で全件読む）と PainLog.tail / tail_by_part / HistoryIndex.search を比べる
+# - HistoryIndex は索引の作成（全 CSV）・保存済みの索引の読み込み・検索（作成後）を分けて測る
+# - 合成ログは .cache/bench/logs_<件数>_<seed>/ に1回だけ作り、次回からは使い回す
+# 実行例： python -m bench.bench_history --sizes 1000 100000 1000000
+
+import argparse
+import csv
+import datetime as dt
+import shutil
+import time
+from pathlib import Path
+
+from painnavi.history import HistoryIndex
+from painnavi.painlog import PainLog, format_history, log_files
+from bench.corpus import log_rows
+
+DATA_DIR = Path(".cache") / "bench"
+
+
+def make_logs(n, seed=0, root=DATA_DIR, max_bytes=5_000_000) -> Path:
+    """n 件の合成ログを作る（作成済みならそのまま返す）"""
+    log_dir = Path(root) / f"logs_{n}_{seed}"
+    done = log_dir / ".complete"
+    if done.exists():
+        return log_dir
+    shutil.rmtree(log_dir, ignore_errors=True)
+    now = [None]    # ファイルの日付はレコードの時刻に合わせる
+    log = PainLog(log_dir, max_bytes=max_bytes, buffer_size=4096, clock=lambda: now[0])
+    for row in log_rows(n, seed):
+        now[0] = dt.datetime.fromisoformat(row["timestamp"])
+        log.append(row)
+    log.flush()
+    done.write_text(str(n), encoding="utf-8")
+    return log_dir
+
+
+def legacy_recent(log_dir, n=3) -> str:
+    """変更前の load_recent_logs：最新ファイルを全件読んで末尾 n 件"""
+    files = log_files(log_dir)
+    if not files:
+        return ""
+    with open(files[-1], "r", encoding="utf-8", newline="") as f:
+        r = list(csv.DictReader(f))
+    return "\n".join(
+        f"部位:{row.get('part','')} / タイプ:{row.get('type','')} / 因子:{row.get('factor','')} / 抜粋:{row.get('advice','')[:160]}"
+        for row in r[-n:])
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+QUERY = {"part": "腰", "ptype": "慢性的な鈍痛", "factor": "長時間座りっぱなし",
+         "free_text": "朝こわばる。前かがみで悪化。座っていると痛い"}
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def measure(log_dir, n=3, repeat=5, part="腰") -> dict:
+    """各読み方の最良時間（秒）。tail_by_part は索引の読み込み（初回）と2回目以降を分けて測る"""
+    log = PainLog(log_dir)
+    cold = timed(lambda: log.tail_by_part(part, n))
+    cache_dir = Path(log_dir) / ".history"
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    index = HistoryIndex(log_dir, cache_dir)
+    build = timed(index.refresh)
+    index.save_snapshot()       # 通常は裏のスレッドで保存（次の読み込みを測るために今すぐ）
+    snapshot = timed(HistoryIndex(log_dir, cache_dir).refresh)
+    return {
+        "legacy_recent": best_of(lambda: legacy_recent(log_dir, n), repeat),
+        "tail": best_of(lambda: format_history(PainLog(log_dir).tail(n)), repeat),
+        "tail_by_part_cold": cold,
+        "tail_by_part": best_of(lambda: format_history(log.tail_by_part(part, n)), repeat),
+        "similar_build": build,
+        "similar_snapshot": snapshot,
+        "similar": best_of(lambda: format_history(index.search(**QUERY, n=n)), repeat * 20),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="*", default=[1_000, 10_000, 100_000])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    print(f"{'件数':>9}{'files':>7}{'legacy':>12}{'tail':>12}{'by_part(初回)':>16}{'by_part':>12}"
+          f"{'似た相談(作成)':>16}{'(保存済)':>12}{'(検索)':>12}")
+    for size in args.sizes:
+        t0 = time.perf_counter()
+        log_dir = make_logs(size)
+        made = time.perf_counter() - t0
+        r = measure(log_dir, repeat=args.repeat)
+        print(f"{size:>9}{len(log_files(log_dir)):>7}" + "".join(
+            f"{r[k]*1000:>10.2f}ms" for k in ("legacy_recent", "tail")) +
+            f"{r['tail_by_part_cold']*1000:>14.2f}ms{r['tail_by_part']*1000:>10.2f}ms"
+            f"{r['similar_build']*1000:>14.2f}ms{r['similar_snapshot']*1000:>10.2f}ms{r['similar']*1000:>10.3f}ms"
+            + (f"   （ログ作成 {made:.1f} s）" if made > 0.5 else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
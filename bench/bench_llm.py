@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# LLM 経路のベンチマーク（ローカルのモックサーバ相手）
+# - 最初のトークンまでの時間（TTFT）と全文受信までの時間を、ストリーミング/非ストリーミング/キャッシュ命中で比べる
+# 実行例： python -m bench.bench_llm --latency 0.3 --token-delay 0.01
+
+import argparse
+import statistics
+import tempfile
+import time
+
+from painnavi.llm import ResponseCache, make_client, stream_chat
+from bench.mock_openai import serve
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--latency", type=float, default=0.3)
+    ap.add_argument("--token-delay", type=float, default=0.01)
+    ap.add_argument("--n", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    server, _ = serve(latency=args.latency, token_delay=args.token_delay)
+    client = make_client("dummy", f"http://127.0.0.1:{server.server_port}/v1", timeout=10, max_retries=0)
+    msgs = [{"role": "system", "content": "sys"}, {"role": "user", "content": "user"}]
+
+    blocking = []
+    for _ in range(args.n):
+        t0 = time.perf_counter()
+        client.chat.completions.create(model="mock", messages=msgs)
+        blocking.append(time.perf_counter() - t0)
+
+    ttft, total = [], []
+    for i in range(args.n):
+        t0 = time.perf_counter()
+        it = stream_chat(client, "sys", f"user {i}", "mock")
+        next(it)
+        ttft.append(time.perf_counter() - t0)
+        for _ in it:
+            pass
+        total.append(time.perf_counter() - t0)
+
+    cache = ResponseCache(tempfile.mkdtemp())
+    "".join(stream_chat(client, "sys", "cached", "mock", cache=cache))
+    hits = []
+    for _ in range(args.n):
+        t0 = time.perf_counter()
+        "".join(stream_chat(client, "sys", "cached", "mock", cache=cache))
+        hits.append(time.perf_counter() - t0)
+
+    med = lambda xs: statistics.median(xs) * 1000
+    print(f"非ストリーミング（表示まで）  {med(blocking):8.1f} ms")
+    print(f"ストリーミング TTFT           {med(ttft):8.1f} ms  / 全文 {med(total):8.1f} ms")
+    print(f"キャッシュ命中                {med(hits):8.3f} ms")
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
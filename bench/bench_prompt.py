@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# プロンプトの大きさの比較（オフライン）：変更前の要約（固定の文字数カット・方針が先頭）と build_prompt
+# - 1リクエストあたりの概算トークン数（全体／毎回変わる部分）と、固定部分が全リクエストで同一かを確認する
+# 実行例： python -m bench.bench_prompt --requests 500 --ref-chars 200000
+
+import argparse
+import itertools
+import statistics
+import time
+
+from painnavi.prompt import BASE_SYSTEM_PROMPT, build_prompt
+from painnavi.rules import H_CAUSES, H_DIFFS, H_TIPS, H_AVOID, H_REFERRAL
+from painnavi.tokens import estimate_tokens
+from bench.corpus import guideline_text, iter_intakes
+
+PROFILE = ("診断名に固執しない。生活で続けられる工夫を最優先。朝のルーティンを必ず提案する。"
+           "運動は1日合計10分以内から。痛みが増える動きは中止し、翌日に持ち越さない範囲で行う。\n") * 12
+
+
+def legacy_messages(x, detail, profile_text, history_text, extra_ref):
+    """変更前（app.py の build_user_summary と SYSTEM_PROMPT）"""
+    system = (profile_text.strip() + "\n\n" + BASE_SYSTEM_PROMPT) if profile_text else BASE_SYSTEM_PROMPT
+    hist = f"\n【直近の相談と出力の要旨】\n{history_text}\n" if history_text else ""
+    ref = f"\n【参考資料の抜粋】\n{extra_ref[:2000]}\n" if extra_ref else ""
+    prof = f"\n【制作者の発信・方針】\n{profile_text[:1500]}\n" if profile_text else ""
+    ft = f"\n【症状の自由記載】\n{x.free_text}\n" if x.free_text else ""
+    user = (
+        f"【安全注記】{x.proceed_note}\n"
+        f"部位: {x.part}\nタイプ: {x.ptype}\n痛み強度: {x.intensity}\n発症期間: {x.onset}\n"
+        f"日内変動: {x.diurnal}\n増悪因子/背景: {x.factor}\n"
+        f"【具体性の指示】レベル{detail}。具体例（1日のルーティン/回数/頻度/所要時間）を入れる。\n"
+        + prof + hist + ref + ft +
+        "以下の見出し・順番でMarkdown出力：\n"
+        f"{H_CAUSES}\n{H_DIFFS}\n{H_TIPS}\n{H_AVOID}\n{H_REFERRAL}\n"
+    )
+    return system, user
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=500)
+    ap.add_argument("--ref-chars", type=int, default=200_000)
+    args = ap.parse_args(argv)
+
+    ref = guideline_text(args.ref_chars)
+    history = "\n".join(f"部位:腰 / タイプ:鈍い痛み / 因子:長時間座りっぱなし / 提案:★★★ 60分ごとに立つ | ★★ 骨盤前後傾{i}"
+                        for i in range(3))
+    intakes = list(itertools.islice(iter_intakes(), 0, args.requests * 53, 53))
+    rows = {"legacy": [], "prompt": []}
+    systems = {"legacy": set(), "prompt": set()}
+    elapsed = 0.0
+    for x in intakes:
+        s, u = legacy_messages(x, 4, PROFILE, history, ref)
+        rows["legacy"].append((estimate_tokens(s), estimate_tokens(u)))
+        systems["legacy"].add(s)
+        t0 = time.perf_counter()
+        p = build_prompt(x, 4, PROFILE, history, ref)
+        elapsed += time.perf_counter() - t0
+        rows["prompt"].append((p.usage["system"], p.usage["user"]))
+        systems["prompt"].add(p.system)
+
+    print(f"{len(intakes)} リクエスト（方針 {len(PROFILE)} 文字・履歴3件・参考資料 {len(ref)} 文字）")
+    print(f"{'':<8}{'固定部分':>10}{'可変部分(平均)':>16}{'合計(平均)':>12}{'固定部分の種類':>16}")
+    for name, r in rows.items():
+        sys_tok = statistics.fmean(a for a, _ in r)
+        user_tok = statistics.fmean(b for _, b in r)
+        print(f"{name:<8}{sys_tok:>10.0f}{user_tok:>16.0f}{sys_tok + user_tok:>12.0f}{len(systems[name]):>16}")
+    print(f"（変更前は方針が要約側にも重複し、見出しの一覧も二重。build_prompt は1件 {elapsed / len(intakes) * 1000:.2f} ms）")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# 赤旗スキャンのベンチマーク：パターンごとの re.search（旧実装） と 統合スキャナ
+# - 旧実装は最初の一致で打ち切る真偽値のみ。統合版は全一致のカテゴリ・位置まで返す
+# 実行例： python -m bench.bench_redflag --sizes 200 100000 1000000
+
+import argparse
+import re
+import time
+
+from painnavi.redflag import RED_FLAG_PATTERNS, RedFlagScanner
+from bench.corpus import long_text
+
+
+def legacy_any(text):
+    return any(re.search(rx, text or "") for rx in RED_FLAG_PATTERNS)
+
+
+def legacy_all(text):
+    """旧パターンで全一致を集める場合（パターン数ぶん走査）"""
+    return sorted((m.start(), m.end()) for rx in RED_FLAG_PATTERNS for m in re.finditer(rx, text))
+
+
+def timeit(fn, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="*", default=[200, 10_000, 100_000, 1_000_000])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    scanner = RedFlagScanner()
+    cases = []
+    for n in args.sizes:
+        cases.append((f"{n} chars / 該当なし", long_text(n)))
+        cases.append((f"{n} chars / 該当{max(1, n // 20000)}件", long_text(n, n_hits=max(1, n // 20000))))
+
+    print(f"{'ケース':<26}{'legacy any':>12}{'legacy all':>12}{'scanner.search':>16}{'scanner.scan':>14}  hits")
+    for name, text in cases:
+        hits = scanner.scan(text)
+        assert scanner.search(text) == legacy_any(text) == bool(hits)
+        assert [(h.start, h.end) for h in hits] == legacy_all(text)
+        row = [timeit(f, text, args.repeat) * 1000 for f in (legacy_any, legacy_all, scanner.search, scanner.scan)]
+        print(f"{name:<26}" + "".join(f"{t:>11.3f}ms" for t in row[:2]) + f"{row[2]:>14.3f}ms{row[3]:>12.3f}ms  {len(hits)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
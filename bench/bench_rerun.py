@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Streamlit の再実行時間（AppTest で画面操作を再現）
+# - 7つのラジオを順にクリックしていく操作を繰り返し、1回の再実行にかかる時間を測る
+# - --app で別のスクリプトも測れる（変更前との比較用）
+# 実行例：
+#   python -m bench.bench_rerun --clicks 100
+#   git show <変更前のコミット>:app.py > /tmp/app_before.py && python -m bench.bench_rerun --app /tmp/app_before.py
+
+import argparse
+import os
+import statistics
+import time
+
+RADIO_KEYS = ["part_radio", "ptype_radio", "intensity_radio", "onset_radio", "diurnal_radio", "factor_radio"]
+
+
+def clicks(at, n):
+    """ラジオを順に切り替える（自由入力は選ばない）。(key, 値) を n 回返す"""
+    i = 0
+    while i < n:
+        for key in RADIO_KEYS:
+            opts = [o for o in at.radio(key=key).options if o != "その他（自由入力）"]
+            yield key, opts[i % len(opts)]
+            i += 1
+            if i >= n:
+                return
+
+
+def measure(app_path, n, timeout=30):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.abspath(app_path), default_timeout=timeout)
+    t0 = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - t0
+    if at.exception:
+        raise RuntimeError(at.exception)
+    times = []
+    for key, value in clicks(at, n):
+        at.radio(key=key).set_value(value)
+        t0 = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - t0)
+    # 最後にテキスト入力とボタン（生成）も1回
+    at.text_area(key="free_text").input("3週間前に重い荷物を持ち上げてから悪化。デスクワーク中心。")
+    t0 = time.perf_counter()
+    at.button(key="generate_main").click().run()
+    generate = time.perf_counter() - t0
+    return first, times, generate
+
+
+def summarize(times):
+    times = sorted(times)
+    return {
+        "median_ms": statistics.median(times) * 1000,
+        "p95_ms": times[int(len(times) * 0.95) - 1] * 1000 if len(times) >= 20 else max(times) * 1000,
+        "mean_ms": statistics.fmean(times) * 1000,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--app", default="app.py")
+    ap.add_argument("--clicks", type=int, default=60)
+    args = ap.parse_args(argv)
+    first, times, generate = measure(args.app, args.clicks)
+    s = summarize(times)
+    print(f"{args.app}: 初回 {first*1000:.1f} ms / 再実行 {len(times)} 回 "
+          f"中央値 {s['median_ms']:.1f} ms・p95 {s['p95_ms']:.1f} ms・平均 {s['mean_ms']:.1f} ms / 生成ボタン {generate*1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
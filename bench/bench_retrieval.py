@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# 参考資料の検索（BM25）のベンチマーク：索引作成時間と問い合わせ時間
+# 実行例： python -m bench.bench_retrieval --sizes 100000 1000000 5000000
+
+import argparse
+import statistics
+import time
+
+from painnavi.retrieval import BM25Index
+from bench.corpus import guideline_text
+
+QUERIES = [
+    "腰 急に出た鋭い痛み（ギクッと） 長時間座りっぱなし 朝に強い 3週間前に重い荷物を持ち上げてから悪化",
+    "膝 階段で痛い 前かがみや重い物で悪化 夕方〜夜に強い しゃがむ動作がつらい",
+    "手首 手のしびれ 長時間座りっぱなし 朝に強い キーボード作業で夜にしびれる",
+    "足首 捻挫後 朝より夕方に悪化/歩くと楽 変わらない 段差でつまずきやすい",
+]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="*", default=[100_000, 1_000_000, 3_000_000])
+    ap.add_argument("--budget", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args(argv)
+
+    for n in args.sizes:
+        text = guideline_text(n)
+        t0 = time.perf_counter()
+        idx = BM25Index.from_text(text)
+        build = time.perf_counter() - t0
+        times = []
+        for i in range(args.repeat):
+            q = QUERIES[i % len(QUERIES)]
+            t0 = time.perf_counter()
+            out = idx.select(q, args.budget)
+            times.append(time.perf_counter() - t0)
+        times.sort()
+        print(f"{len(text):>9} chars  chunks {len(idx.chunks):>6}  n-grams {len(idx.postings):>6}  "
+              f"索引 {build*1000:8.0f} ms  問い合わせ 中央値 {statistics.median(times)*1000:6.1f} ms / "
+              f"最大 {times[-1]*1000:6.1f} ms  （抜粋 {len(out)} 文字）")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
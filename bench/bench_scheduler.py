@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# LLM 受付制御（painnavi.scheduler）のベンチマーク（ローカルのモックサーバ相手）
+# - burst  : 多数のセッションが同時に生成（質問の種類は少ない）→ API の呼び出し回数・完了までの時間
+# - outage : API が全件失敗 → 直接呼ぶ場合と比べて、デモへ切り替わるまでの時間。復旧後に再開するか
+# - overload: 同時数・待ち行列を小さくして大量に投げる → 断った数・待ち時間
+# 実行例： python -m bench.bench_scheduler --users 32 --prompts 4 --latency 0.3
+
+import argparse
+import statistics
+import threading
+import time
+
+from painnavi.llm import make_client, stream_chat
+from painnavi.metrics import Metrics
+from painnavi.scheduler import LLMScheduler, LLMUnavailable
+from bench.mock_openai import serve
+
+
+def run_users(n, fn):
+    """n スレッドで同時に fn(i) を呼び、(所要秒, 結果) のリストを返す"""
+    out = [None] * n
+    start = threading.Barrier(n)
+
+    def user(i):
+        start.wait()
+        t0 = time.perf_counter()
+        try:
+            r = fn(i)
+        except Exception as e:
+            r = e
+        out[i] = (time.perf_counter() - t0, r)
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return out
+
+
+def summary(rows):
+    secs = sorted(s for s, _ in rows)
+    ok = sum(1 for _, r in rows if isinstance(r, str))
+    unavailable = sum(1 for _, r in rows if isinstance(r, LLMUnavailable))
+    return (f"成功 {ok:>3} / 断った {unavailable:>3} / 失敗 {len(rows) - ok - unavailable:>3}  "
+            f"中央値 {statistics.median(secs) * 1000:7.1f} ms  最大 {secs[-1] * 1000:7.1f} ms")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=32)
+    ap.add_argument("--prompts", type=int, default=4, help="同時に来る質問の種類")
+    ap.add_argument("--latency", type=float, default=0.3)
+    ap.add_argument("--token-delay", type=float, default=0.005)
+    ap.add_argument("--concurrency", type=int, default=4)
+    args = ap.parse_args(argv)
+
+    server, state = serve(latency=args.latency, token_delay=args.token_delay)
+    client = make_client("dummy", f"http://127.0.0.1:{server.server_port}/v1", timeout=10, max_retries=0)
+
+    def direct(i):
+        return "".join(stream_chat(client, "sys", f"質問{i % args.prompts}", "mock"))
+
+    def scheduled(sched):
+        return lambda i: "".join(sched.stream(client, "sys", f"質問{i % args.prompts}", "mock"))
+
+    print(f"[burst] {args.users} セッションが同時に生成（質問 {args.prompts} 種類、遅延 {args.latency}s）")
+    state.requests = 0
+    rows = run_users(args.users, direct)
+    print(f"  直接      API {state.requests:>3} 回  {summary(rows)}")
+    state.requests = 0
+    m = Metrics()
+    sched = LLMScheduler(max_concurrency=args.concurrency, metrics=m)
+    rows = run_users(args.users, scheduled(sched))
+    print(f"  受付制御  API {state.requests:>3} 回  {summary(rows)}  合流 {m.counters.get('llm_coalesced', 0)}")
+
+    print(f"\n[outage] API が全件失敗（{args.users} 件を順に）")
+    state.error_rate = 1.0
+    for name, fn in [("直接", direct),
+                     ("受付制御", scheduled(LLMScheduler(args.concurrency, reset_timeout=1.0, metrics=Metrics())))]:
+        state.requests = 0
+        rows = []
+        for i in range(args.users):
+            t0 = time.perf_counter()
+            try:
+                r = fn(i + 1000)
+            except Exception as e:
+                r = e
+            rows.append((time.perf_counter() - t0, r))
+        tail = statistics.median(s for s, _ in rows[-10:]) * 1000
+        print(f"  {name:<8}API {state.requests:>3} 回  {summary(rows)}  直近10件の中央値 {tail:7.2f} ms")
+    sched = LLMScheduler(args.concurrency, reset_timeout=1.0, metrics=Metrics())
+    for i in range(3):
+        try:
+            "".join(sched.stream(client, "sys", f"停止{i}", "mock"))
+        except Exception:
+            pass
+    state.error_rate = 0.0
+    time.sleep(1.1)
+    "".join(sched.stream(client, "sys", "復旧", "mock"))
+    print(f"  復旧後    状態 {sched.state}（{sched.reset_timeout:g} 秒後に1件試して再開）")
+
+    print(f"\n[overload] 同時 2・待ち行列 8・待ち時間の上限 1 s に {args.users} 種類の質問")
+    m = Metrics(enabled=True)
+    sched = LLMScheduler(max_concurrency=2, max_queue=8, queue_timeout=1.0, metrics=m)
+    rows = run_users(args.users, lambda i: "".join(sched.stream(client, "sys", f"過負荷{i}", "mock")))
+    wait = m.snapshot()["stages"].get("llm_queue_wait", {})
+    print(f"  {summary(rows)}  満杯 {m.counters.get('llm_rejected', 0)} / 時間切れ "
+          f"{m.counters.get('llm_queue_timeouts', 0)}  待ち p50 {wait.get('p50', 0):.0f} ms p95 {wait.get('p95', 0):.0f} ms")
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# 出力の5セクションの解析・描き直し（painnavi.sections）の確認とベンチマーク
+# - check : LLM がよく書く Markdown を normalize() に通し、内容が崩れない・増えないこと、2回通しても変わらないことを確認
+#           （前置きの注意書き・入れ子・太字の行・区切り線・1.5kg・知らない小見出し・優先度の無い提案）
+# - parse : 長い応答を小さなチャンクで流し込んだときの解析時間（行数に比例するか）
+# 実行例： python -m bench.bench_sections --lines 1000 10000
+
+import argparse
+import time
+
+from painnavi.engine import default_engine
+from painnavi.rules import H_AVOID, H_CAUSES, H_DIFFS, H_REFERRAL, H_TIPS
+from painnavi.sections import SectionParser, normalize
+from bench.corpus import iter_intakes
+
+# (名前, 入力, 出力に含まれるべき行, 出力に含まれてはいけない文字列)
+CASES = [
+    ("preamble", f"※強い痛みが続く場合はまず受診を。\n\n{H_CAUSES}\n- 座位\n",
+     ["※強い痛みが続く場合はまず受診を。"], []),
+    ("nested", f"{H_CAUSES}\n- 長時間の座位\n  - 特にデスクワーク\n- 筋疲労\n",
+     ["- 長時間の座位", "  - 特にデスクワーク", "- 筋疲労"], ["\n- 特にデスクワーク"]),
+    ("bold", f"{H_CAUSES}\n- 座位\n**ポイント**：無理をしない\n",
+     ["   **ポイント**：無理をしない"], ["- *ポイント"]),
+    ("rule", f"{H_CAUSES}\n- 座位\n\n---\n\n{H_DIFFS}\n- 筋・筋膜性\n", [], ["- --", "---"]),
+    ("decimal", f"{H_TIPS}\n1. 荷物を分けて持つ\n1.5kg 以下を目安に\n", ["1. 荷物を分けて持つ", "   1.5kg 以下を目安に"],
+     ["5kg 以下を目安に（", "2. 5kg"]),
+    ("subheading", f"{H_AVOID}\n- 重い物を持つ\n### 補足\n- 前かがみ\n", ["- 重い物を持つ", "- 前かがみ"],
+     ["- ### 補足", "- 補足"]),
+    ("unranked", f"{H_TIPS}\n1. 歩く\n2. ストレッチ（優先度★★★）\n", ["1. 歩く", "2. ストレッチ（優先度★★★）"],
+     ["歩く（優先度"]),
+    ("bullet_no_space", f"{H_REFERRAL}\n・発熱がある\n•しびれが広がる\n", ["- 発熱がある", "- しびれが広がる"], []),
+]
+
+
+def check() -> list:
+    """(名前, 問題) のリスト（空なら全件問題なし）"""
+    bad = []
+    for name, md, want, unwanted in CASES:
+        out = normalize(md)
+        lines = out.split("\n")
+        bad += [(name, f"行がない: {w!r}") for w in want if w not in lines]
+        bad += [(name, f"含まれている: {u!r}") for u in unwanted if u in out]
+        if normalize(out) != out:
+            bad.append((name, "2回目で変わる"))
+    engine = default_engine()
+    for x in list(iter_intakes())[::500]:      # デモエンジンの出力はそのまま
+        md = engine.advise(x)
+        if normalize(md) != md:
+            bad.append(("engine", f"描き直しで変わる: {x}"))
+    return bad
+
+
+def long_reply(n_lines) -> str:
+    body = [f"- 項目{i}\n  - 補足{i}" if i % 3 else f"{i}. 提案{i}（優先度★★）" for i in range(n_lines * 3 // 5)]
+    per = max(1, len(body) // 5)
+    heads = [H_CAUSES, H_DIFFS, H_TIPS, H_AVOID, H_REFERRAL]
+    return "\n".join(f"{h}\n" + "\n".join(body[k * per:(k + 1) * per]) for k, h in enumerate(heads)) + "\n"
+
+
+def parse_time(md, chunk=8, repeat=3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        p = SectionParser()
+        for i in range(0, len(md), chunk):
+            p.feed(md[i:i + chunk])
+        p.close()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--lines", type=int, nargs="*", default=[1000, 10000])
+    args = ap.parse_args(argv)
+
+    bad = check()
+    print(f"[check] {len(CASES)} 件の Markdown とデモエンジンの出力：問題 {len(bad)} 件")
+    for name, msg in bad:
+        print(f"  {name}: {msg}")
+    for n in args.lines:
+        md = long_reply(n)
+        t = parse_time(md)
+        print(f"[parse] {md.count(chr(10)):>6} 行 {len(md):>8} 文字  {t * 1000:8.2f} ms（8文字ずつ流し込み）")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
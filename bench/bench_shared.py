@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# 共有ファイルの同時書き込みの確認とベンチマーク（複数プロセス）
+# - ログ：P プロセスが同時に追記 → 全件がそろい、各行の列数が正しく、索引の位置が行頭を指すかを確認
+# - 方針：書き手が全文を書き換え続ける間に読み手が読み、書きかけ（混ざった内容）を読んだ回数を数える
+#   変更前の Path.write_text と SharedText.write（一時ファイル→置換＋ロック）を比べる
+# - 変更がないときの SharedText.read() と毎回ファイルを読む場合の時間
+# 実行例： python -m bench.bench_shared --procs 4 --rows 2000
+
+import argparse
+import csv
+import multiprocessing as mp
+import tempfile
+import time
+from pathlib import Path
+
+from painnavi.painlog import LOG_FIELDS, PainLog, log_files, read_index
+from painnavi.shared import SharedText
+from bench.corpus import log_rows
+
+VERSIONS = [ch * 200_000 for ch in "ABCDEFGH"]   # 1文字だけで埋めた版（混ざれば検出できる）
+
+
+def _append(log_dir, seed, n, buffer_size):
+    log = PainLog(log_dir, buffer_size=buffer_size)
+    for row in log_rows(n, seed):
+        row["red_flags"] = f"proc{seed}"
+        log.append(row)
+    log.flush()
+
+
+def check_log(procs, rows):
+    log_dir = tempfile.mkdtemp()
+    ps = [mp.Process(target=_append, args=(log_dir, i, rows, 1 + i * 7)) for i in range(procs)]
+    t0 = time.perf_counter()
+    for p in ps:
+        p.start()
+    for p in ps:
+        p.join()
+    elapsed = time.perf_counter() - t0
+    total, bad, per_proc, bad_index = 0, 0, {}, 0
+    for path in log_files(log_dir):
+        with open(path, encoding="utf-8", newline="") as f:
+            r = csv.reader(f)
+            if next(r) != LOG_FIELDS:
+                bad += 1
+            for row in r:
+                total += 1
+                if len(row) != len(LOG_FIELDS):
+                    bad += 1
+                else:
+                    per_proc[row[7]] = per_proc.get(row[7], 0) + 1
+        with open(path, "rb") as f:
+            for off, _ in read_index(path):
+                f.seek(off - 1)
+                if f.read(1) != b"\n":
+                    bad_index += 1
+    ok = total == procs * rows and not bad and not bad_index and all(v == rows for v in per_proc.values())
+    print(f"ログ追記： {procs} プロセス × {rows} 件 → {total} 件 / 壊れた行 {bad} / 索引のずれ {bad_index} "
+          f"/ {'OK' if ok else 'NG'}（{elapsed:.1f} s）")
+    return ok
+
+
+def _writer(path, atomic, seconds):
+    store = SharedText(path)
+    end = time.time() + seconds
+    i = 0
+    while time.time() < end:
+        text = VERSIONS[i % len(VERSIONS)]
+        if atomic:
+            store.write(text)
+        else:
+            Path(path).write_text(text, encoding="utf-8")
+        i += 1
+
+
+def _reader(path, atomic, seconds, out):
+    store = SharedText(path)
+    end = time.time() + seconds
+    reads = torn = 0
+    while time.time() < end:
+        if atomic:
+            store.invalidate()      # 毎回ディスクから読む（書きかけが見えないかの確認）
+            text = store.read()
+        else:
+            text = Path(path).read_text(encoding="utf-8")
+        reads += 1
+        if text not in VERSIONS:
+            torn += 1
+    out.put((reads, torn))
+
+
+def check_profile(writers, readers, seconds):
+    ok = True
+    for atomic in (False, True):
+        path = Path(tempfile.mkdtemp()) / "profile.md"
+        path.write_text(VERSIONS[0], encoding="utf-8")
+        q = mp.Queue()
+        ps = [mp.Process(target=_writer, args=(path, atomic, seconds)) for _ in range(writers)]
+        ps += [mp.Process(target=_reader, args=(path, atomic, seconds, q)) for _ in range(readers)]
+        for p in ps:
+            p.start()
+        res = [q.get() for _ in range(readers)]
+        for p in ps:
+            p.join()
+        reads, torn = sum(r for r, _ in res), sum(t for _, t in res)
+        name = "SharedText（置換＋ロック）" if atomic else "Path.write_text（変更前）"
+        print(f"方針の書き換え中の読み取り：{name:<26} 読み取り {reads} 回 / 書きかけ（空・途中まで・混在） {torn} 回")
+        if atomic and torn:
+            ok = False
+    return ok
+
+
+def read_cost(n=20000):
+    path = Path(tempfile.mkdtemp()) / "profile.md"
+    path.write_text("方針。" * 500, encoding="utf-8")
+    store = SharedText(path)
+    store.read()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        store.read()
+    cached = (time.perf_counter() - t0) / n
+    t0 = time.perf_counter()
+    for _ in range(n):
+        path.read_text(encoding="utf-8")
+    disk = (time.perf_counter() - t0) / n
+    print(f"変更がないときの読み取り： SharedText.read {cached * 1e6:.1f} µs（stat のみ） / 毎回読む {disk * 1e6:.1f} µs")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--procs", type=int, default=4)
+    ap.add_argument("--rows", type=int, default=2000)
+    ap.add_argument("--seconds", type=float, default=2.0)
+    args = ap.parse_args(argv)
+    ok = check_log(args.procs, args.rows)
+    ok = check_profile(2, 2, args.seconds) and ok
+    read_cost()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# セルフケア提案のカタログ（painnavi.tips）のベンチマーク
+# - score: TIP_CATALOG にダミー項目を足して、項目数ごとに
+#     advise（覚えておく表あり＝実運用）/ rank（1件ずつ採点）/ rank_many（まとめて採点）/
+#     Python の素朴な採点（全項目の重みを辞書で引く）の1入力あたりの時間を比べる
+#   rank・rank_many・素朴な採点は特徴量の組の重複を除いた入力で、覚えておく表を使わずに測る
+# - memo : 覚えておく表が一杯になる直前から rank_many を呼んでも、1件ずつ rank したのと同じ結果になるか
+# 実行例： python -m bench.bench_tips --tips 0 1000 5000
+
+import argparse
+import time
+
+from painnavi.engine import AdviceEngine
+from painnavi.tips import MEMO_SIZE
+from bench.bench_advice import timeit
+from bench.corpus import iter_intakes, synthetic_tips
+
+NAIVE_INPUTS = 200      # 素朴な採点は遅いので入力を絞る
+
+
+def naive_rank(catalog, features, limit=5):
+    """比較用：全項目について有効な特徴量の重みを足し、点数順に並べる"""
+    cols = set(features.tolist())
+    active = {name for name, col in catalog.features.items() if col in cols}
+    scored = []
+    for i, t in enumerate(catalog.tips):
+        s = sum(w for name, w in t.weights.items() if name in active)
+        if s > catalog.min_score:
+            scored.append((-s, i, t))
+    return [(t.priority, t.text) for _, _, t in sorted(scored)[:limit]]
+
+
+def distinct_features(engine, intakes) -> list:
+    seen = {}
+    for x in intakes:
+        hits, acc = engine._collect(x)
+        f = engine.catalog.encode(x, hits, acc["rules"])
+        seen.setdefault(f.tobytes(), f)
+    return list(seen.values())
+
+
+def measure(n_tips, intakes, repeat=3) -> dict:
+    """1入力あたりの秒数：advise / rank / rank_many / naive"""
+    engine = AdviceEngine(tips=synthetic_tips(n_tips))
+    catalog = engine.catalog
+    features = distinct_features(engine, intakes)
+    out = {"features": len(features), "catalog": len(catalog)}
+    out["advise"] = timeit(engine.advise, intakes, repeat) / len(intakes)
+    out["rank"] = timeit(lambda f: catalog.select(catalog.scores([f])[0]), features, repeat) / len(features)
+    best = float("inf")
+    for _ in range(repeat):
+        catalog._memo.clear()
+        t0 = time.perf_counter()
+        catalog.rank_many(features)
+        best = min(best, time.perf_counter() - t0)
+    out["rank_many"] = best / len(features)
+    few = features[:NAIVE_INPUTS]
+    out["naive"] = timeit(lambda f: naive_rank(catalog, f), few, 1) / len(few)
+    catalog._memo.clear()
+    batch = catalog.rank_many(few)
+    out["mismatch"] = sum(list(b) != catalog.rank(f) for b, f in zip(batch, few))
+    return out
+
+
+def check_memo(intakes) -> int:
+    """表が一杯のエンジン（長く動いているプロセス）で advise_many と advise が一致するか。不一致の件数"""
+    engine = AdviceEngine()
+    for i in range(MEMO_SIZE - 1):
+        engine.catalog._memo[(b"filler%d" % i, 0, 0)] = ()
+    batch = engine.advise_many(intakes)
+    return sum(a != engine.advise(x) for a, x in zip(batch, intakes))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--tips", type=int, nargs="*", default=[0, 1000, 5000], help="足すダミー項目数（複数指定可）")
+    ap.add_argument("--step", type=int, default=5, help="入力を何件おきに使うか")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    intakes = list(iter_intakes())[::args.step]
+    print(f"[score] 入力 {len(intakes)} 件（1入力あたり us）")
+    bad = 0
+    for n in args.tips:
+        r = measure(n, intakes, args.repeat)
+        print(f"  項目 {r['catalog']:>6}  特徴量の組 {r['features']:>5}  advise {r['advise'] * 1e6:7.1f}  "
+              f"rank {r['rank'] * 1e6:7.1f}  rank_many {r['rank_many'] * 1e6:7.1f}  "
+              f"naive {r['naive'] * 1e6:9.1f}  不一致 {r['mismatch']}")
+        bad += r["mismatch"]
+
+    memo_bad = check_memo(intakes[::10])
+    print(f"[memo] 表が一杯の状態から {len(intakes[::10])} 件をまとめて：1件ずつとの不一致 {memo_bad} 件")
+    return 1 if bad or memo_bad else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
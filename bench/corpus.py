@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+# ベンチマーク用の合成データ
+# - 画面の選択肢の全組合せ × 自由記載の例 で相談入力を作る
+
+import itertools
+
+from painnavi.engine import Intake
+from painnavi.rules import (
+    PART_CHOICES, TYPE_OPTIONS_MAP,
+    INTENSITY_CHOICES, ONSET_CHOICES, DIURNAL_CHOICES, FACTOR_CHOICES,
+)
+
+FREE_PARTS = ["肩", "ひざ", "背中の右側", "すねの外側"]
+FREE_TEXTS = [
+    "",
+    "3週間前に重い荷物を持ち上げてから悪化。朝こわばる。",
+    "デスクワークでPC作業が長い。運転も多い。",
+    "ジョギングを始めてから痛む。走ると悪化。",
+    "肩甲骨の内側が張る。腕まで、しびれることがある。",
+    "階段の下りとしゃがむ動作がつらい。",
+    "キーボード作業で手首が痛い。腱鞘炎と言われた。",
+    "捻挫を繰り返している。段差でつまずきやすい。",
+]
+PROCEED_NOTES = ["", "（赤旗該当のため運動は控えめ。痛みが増す動きは避け、受診を最優先）"]
+
+
+def _fixed(choices):
+    return [c for c in choices if c != "その他（自由入力）"]
+
+
+def iter_intakes(free_texts=FREE_TEXTS, proceed_notes=PROCEED_NOTES):
+    """選択肢の全組合せを Intake として順に返す（自由入力の部位も少し混ぜる）"""
+    parts = _fixed(PART_CHOICES) + FREE_PARTS
+    for part in parts:
+        types = _fixed(TYPE_OPTIONS_MAP.get(part, TYPE_OPTIONS_MAP["その他（自由入力）"]))
+        for combo in itertools.product(types, _fixed(INTENSITY_CHOICES), _fixed(ONSET_CHOICES),
+                                       _fixed(DIURNAL_CHOICES), _fixed(FACTOR_CHOICES)):
+            for ft in free_texts:
+                for note in proceed_notes:
+                    yield Intake(part, *combo, free_text=ft, proceed_note=note)
+
+
+def synthetic_rules(n):
+    """入力に現れないキーワードだけを持つダミールール（ルール数の増加に対するコスト確認用）"""
+    fields = ["text", "ptype", "factor", "free_text"]
+    return [
+        {"id": f"synthetic_{i}", "any": {fields[i % len(fields)]: [f"ダミー語{i:05d}", f"合成{i:05d}症状"]},
+         "tips": [(2, f"ダミーのセルフケア{i}")]}
+        for i in range(n)
+    ]
+
+
+TIP_WORDS = ["荷物", "デスクワーク", "運転", "ジョギング", "しびれ", "階段", "キーボード", "捻挫", "朝"]
+
+
+def synthetic_tips(n, seed=0):
+    """TIP_CATALOG 形式のダミー項目 n 件（入力に実際に現れる特徴量に 1〜3 個の重み）"""
+    import random
+    from painnavi.rules import RULES
+    rnd = random.Random(seed)
+    features = ([f"part={p}" for p in _fixed(PART_CHOICES)]
+                + [f"ptype={t}" for ts in TYPE_OPTIONS_MAP.values() for t in _fixed(ts)]
+                + [f"intensity={v}" for v in _fixed(INTENSITY_CHOICES)]
+                + [f"onset={v}" for v in _fixed(ONSET_CHOICES)]
+                + [f"factor={v}" for v in _fixed(FACTOR_CHOICES)]
+                + [f"text~{w}" for w in TIP_WORDS]
+                + [f"rule:{r['id']}" for r in RULES])
+    return [{"id": f"synthetic_tip_{i}", "text": f"ダミーのセルフケア項目{i}", "priority": rnd.choice([1, 2, 3]),
+             "weights": {f: round(rnd.uniform(0.5, 3.0), 2) for f in rnd.sample(features, rnd.randint(1, 3))}}
+            for i in range(n)]
+
+
+# ---- 長文（貼り付けられたカルテ等を想定）----
+FILLER = [
+    "腰が痛くて朝こわばる。", "前かがみで増悪し、座っていると足にしびれが出る。",
+    "市販の鎮痛薬で少し楽になった。", "MRIでL4/5に軽度の椎間板膨隆を指摘。", "デスクワークは1日8時間程度。",
+    "階段の下りで膝の内側が痛むことがある。", "リハビリで体幹トレーニングを指導された。",
+]
+RED_PHRASES = ["発熱", "尿が出にくい", "交通事故", "会陰部", "急に筋力低下"]
+
+
+def long_text(n_chars, n_hits=0, seed=0):
+    """n_chars 文字程度の記録文。赤旗語句を n_hits 個ちりばめる"""
+    import random
+    rnd = random.Random(seed)
+    parts, size = [], 0
+    while size < n_chars:
+        s = rnd.choice(FILLER)
+        parts.append(s); size += len(s)
+    for _ in range(n_hits):
+        parts.insert(rnd.randrange(len(parts) + 1), rnd.choice(RED_PHRASES) + "。")
+    return "".join(parts)
+
+
+# ---- ガイドライン風の長い資料（参考資料の検索用）----
+GUIDE_TOPICS = {
+    "腰": ["腰痛では長時間の座位を避け、60分ごとに立ち上がることが推奨される。", "急性腰痛では安静にし過ぎず、楽な範囲で日常生活を続ける。"],
+    "膝": ["膝蓋大腿痛では階段の下りやしゃがみ込みで痛みが増えやすい。", "大腿四頭筋のセッティングは膝の痛みを増やさずに行える。"],
+    "肩/首": ["頸部痛ではスマートフォンを見る姿勢が続くと症状が悪化しやすい。", "肩甲骨周囲の運動は頸肩部のこりに有効な場合がある。"],
+    "手首": ["手根管症候群では夜間のしびれが特徴的である。", "キーボード作業では手首を反らしすぎない配置が望ましい。"],
+    "足首": ["足関節捻挫の再発予防にはバランス練習が有効である。", "アキレス腱周囲の痛みにはカーフレイズが用いられる。"],
+}
+
+
+def guideline_text(n_chars, seed=0):
+    """n_chars 文字程度の、部位ごとの記述が散らばった資料"""
+    import random
+    rnd = random.Random(seed)
+    topics = [s for ss in GUIDE_TOPICS.values() for s in ss]
+    parts, size = [], 0
+    while size < n_chars:
+        s = rnd.choice(topics) if rnd.random() < 0.05 else rnd.choice(FILLER)
+        if rnd.random() < 0.1:
+            s += "\n"
+        parts.append(s); size += len(s)
+    return "".join(parts)
+
+
+# ---- 相談ログ（履歴読み込みのベンチ用）----
+def log_rows(n, seed=0, start="2025-01-01T09:00:00", step_seconds=97):
+    """n 件の相談ログのレコード（画面の選択肢から作る。時刻は start から一定間隔で進む）"""
+    import datetime as dt
+    import random
+    from painnavi.engine import default_engine
+    from painnavi.sections import compact
+
+    rnd = random.Random(seed)
+    engine = default_engine()
+    parts = _fixed(PART_CHOICES)
+    t0 = dt.datetime.fromisoformat(start)
+    memo = {}
+    for i in range(n):
+        part = rnd.choice(parts)
+        x = Intake(part, rnd.choice(_fixed(TYPE_OPTIONS_MAP[part])), rnd.choice(_fixed(INTENSITY_CHOICES)),
+                   rnd.choice(_fixed(ONSET_CHOICES)), rnd.choice(_fixed(DIURNAL_CHOICES)),
+                   rnd.choice(_fixed(FACTOR_CHOICES)))
+        sections = memo.get(x)
+        if sections is None:
+            sections = memo[x] = compact(engine.evaluate(x))
+        red = "自動検知： 「発熱」（発熱・体重減少など全身症状）" if rnd.random() < 0.03 else ""
+        yield {"timestamp": (t0 + dt.timedelta(seconds=i * step_seconds)).isoformat(timespec="seconds"),
+               "part": x.part, "type": x.ptype, "intensity": x.intensity, "onset": x.onset,
+               "diurnal": x.diurnal, "factor": x.factor, "red_flags": red, **sections}
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+# ベンチマーク比較用：ルール表導入前の local_advice（if/elif 版）をそのまま保存したもの
+# - 画面のグローバル変数の代わりに Intake を受け取る以外は変更しない
+
+from painnavi.rules import H_CAUSES, H_DIFFS, H_TIPS, H_AVOID, H_REFERRAL
+
+
+def local_advice(intake):
+    part, ptype, intensity, onset, diurnal, factor, free_text, proceed_note = intake
+    causes, diffs, avoid = [], [], []
+    tips_hi, tips_mid, tips_low = [], [], []
+
+    def uniq_extend(dst, items):
+        for x in items:
+            if x and x not in dst:
+                dst.append(x)
+
+    def format_prioritized(hi, mid, low):
+        ordered = [(3, t) for t in hi] + [(2, t) for t in mid] + [(1, t) for t in low]
+        seen, uniq = set(), []
+        for pr, t in ordered:
+            if t not in seen:
+                uniq.append((pr, t)); seen.add(t)
+        pad_pool = [
+            "60分ごとに1–2分立って歩く（タイマー推奨）",
+            "前かがみ作業は股関節から曲げるフォーム練習を1日3回×3分",
+            "ふくらはぎストレッチ20秒×3（朝/入浴後）",
+            "5–10分の楽な歩行を1日2回",
+            "腰に薄いタオルを当てて座る（骨盤を立てる）",
+        ]
+        for t in pad_pool:
+            if len(uniq) >= 5: break
+            if t not in {u[1] for u in uniq}:
+                uniq.append((2, t))
+        base = [
+            (3, "60分ごとに1–2分立って歩く（タイマー推奨）"),
+            (3, "前かがみ作業は股関節から曲げるフォーム練習"),
+            (2, "5–10分の楽な歩行を1日2回"),
+        ]
+        i = 0
+        while len(uniq) < 3 and i < len(base):
+            if base[i][1] not in {u[1] for u in uniq}:
+                uniq.append(base[i])
+            i += 1
+        uniq = uniq[:5]
+        lines = [f"{i}. {t}（優先度{'★'*pr}）" for i, (pr, t) in enumerate(uniq, 1)]
+        return "\n".join(lines)
+
+    txt_all = " ".join([s for s in [part, free_text, factor, diurnal, ptype] if isinstance(s, str)])
+    def has_any(words): return any(w in txt_all for w in words)
+
+    # ---- 部位別（要点ベース）----
+    if part == "腰":
+        uniq_extend(causes, ["腰部の筋・筋膜の過緊張", "骨盤/胸郭位置の崩れによる持続負荷"])
+        if ("鋭" in ptype) or ("ギク" in ptype):
+            uniq_extend(diffs, ["椎間板/靱帯ストレス（前屈で増悪）"])
+            tips_hi += ["台に手を置いて作業（腰を丸めすぎない）","仰向け膝立て＋腹式呼吸1分×3"]
+            tips_mid += ["股関節から曲げるフォーム練習（1日3回×3分）"]
+            avoid += ["深い前屈","勢いよく反る"]
+        elif ("しびれ" in ptype) or ("広が" in ptype):
+            uniq_extend(diffs, ["神経根刺激の可能性（長時間座位で増悪）"])
+            tips_hi += ["60分ごと立って1–2分歩く","腰当て（薄タオル）で骨盤を立てる"]
+            tips_mid += ["背もたれ使用＋座面奥に座る"]
+            avoid += ["長時間の座位","無理な前屈"]
+        else:
+            tips_hi += ["60分ごとに立って1–2分歩く"]
+            tips_mid += ["股関節ヒンジ練習（1日3回×3分）"]
+
+    elif part == "お尻・太もも":
+        uniq_extend(causes, ["臀筋群の硬さ/使いすぎ","坐骨神経の滑走低下"])
+        if ("鋭" in ptype) or ("ピリ" in ptype):
+            uniq_extend(diffs, ["梨状筋周囲の過緊張による神経刺激"])
+            tips_hi += ["尻ポケットに長財布/スマホを入れない"]
+            tips_mid += ["仰向け片膝抱えストレッチ20秒×3（左右）"]
+        elif ("しびれ" in ptype) or ("広が" in ptype):
+            uniq_extend(diffs, ["神経滑走の低下（長座/長距離運転で増悪）"])
+            tips_hi += ["椅子をやや高めにして股関節角度を広げる"]
+            tips_mid += ["短時間の早歩きを1日2回（増悪しない範囲）"]
+        else:
+            tips_mid += ["臀部のやさしいボールほぐし（各30秒）"]
+
+    elif part == "ふくらはぎ/足":
+        if "しびれ" in ptype:
+            uniq_extend(diffs, ["末梢神経の刺激/血流低下の可能性"])
+        elif ("張" in ptype) or ("つり" in ptype):
+            uniq_extend(diffs, ["腓腹筋・ヒラメ筋の過緊張/疲労"])
+        tips_hi += ["ふくらはぎストレッチ20秒×3（朝/入浴後）"]
+        tips_mid += ["つま先上げ下げ20回×2（座位OK）"]
+        avoid += ["急な坂道ダッシュ","長時間の爪先立ち"]
+
+    elif part in ["肩/首","肩","首"] or has_any(["肩","肩甲骨","首","頸","うなじ","回すと","動かすと"]):
+        uniq_extend(causes, ["頸肩部の筋・筋膜の過緊張", "肩甲骨挙上/前傾＋胸郭後方シフト"])
+        if has_any(["しびれ","腕","手まで"]):
+            uniq_extend(diffs, ["頸椎神経根刺激／胸郭出口の可能性"])
+            tips_hi += ["スマホ首回避：画面は目線・肘90°支持","頸部回旋/側屈を各5回（1–2時間ごと）"]
+            tips_mid += ["神経滑走：腕外転＋手のひら上⇄下10回"]
+            avoid += ["長時間のうつむき","強い牽引や強ストレッチ"]
+        else:
+            tips_hi += ["毎時1回の姿勢リセット（立って胸を開き深呼吸3回）",
+                        "前鋸筋活性：四つ這いで小指球押し10回"]
+            tips_mid += ["僧帽筋下部：壁スライド10回（肩すくめない）"]
+
+    elif part in ["股関節","股"] or has_any(["股","股関節","鼠径","そけい"]):
+        uniq_extend(causes, ["股関節前面の過負荷／腸腰筋・殿筋のアンバランス"])
+        uniq_extend(diffs, ["前方インピンジ（前傾＋内/外旋）／後方インピンジ（後傾＋外旋）傾向"])
+        tips_hi += ["ヒップヒンジ10回×2（背中は丸めない）","グルートブリッジ10回×2（痛くない範囲）"]
+        tips_mid += ["長時間座位を避け60分ごとに立つ","歩幅をやや小さくして歩く"]
+        avoid += ["反り腰の維持","勢いよく脚を大きく振る"]
+
+    elif part in ["膝","ひざ"] or has_any(["膝","ひざ","膝蓋","階段","しゃがむ"]):
+        uniq_extend(causes, ["膝蓋大腿部へのストレス増／周囲筋のアンバランス","反張膝傾向（過伸展）"])
+        uniq_extend(diffs, ["膝蓋大腿痛／半月板刺激（クリック・階段で増悪など）"])
+        tips_hi += ["クワッドセッティング5秒×10（1日3回）","横向きクラムシェル10回×2（痛くない範囲）"]
+        tips_mid += ["微屈での立位練習（わずかに膝を緩める）","階段は手すり使用・下りは小刻みに"]
+        avoid += ["急な下り坂ダッシュ","長時間の深屈曲","膝をロックした立位"]
+
+    elif part == "肘" or has_any(["肘","テニス肘","外側上顆","雑巾絞り","強い握り"]):
+        uniq_extend(causes, ["手首背屈筋の使いすぎによる付着部ストレス"])
+        uniq_extend(diffs, ["外側上顆炎（把持で増悪）"])
+        tips_hi += ["グリップを太めに変更（道具/マウス）","前腕伸筋のエキセントリック10回×2"]
+        tips_mid += ["前腕の軽いマッサージ30秒×2","カウンターフォースバンド（短時間）"]
+        avoid += ["強い握り込み・雑巾絞り反復"]
+
+    elif part in ["手首","手"] or has_any(["手首","手のひら","キーボード","腱鞘炎","腕立て"]):
+        uniq_extend(causes, ["手関節の反復伸展／屈曲による腱・神経の刺激"])
+        uniq_extend(diffs, ["腱鞘炎／手根管症候群の可能性"])
+        tips_hi += ["手首ニュートラル：手首置き利用・マウス感度UP","掌支持は拳/バーで代替"]
+        tips_mid += ["正中神経グライド10回×2（増悪しない範囲）","20-8-2ルールでこまめに休憩"]
+        avoid += ["深い手首反りで荷重","長時間の同一姿勢"]
+
+    elif part in ["足首","足関節"] or has_any(["足首","捻挫","段差","つまずき","アキレス"]):
+        uniq_extend(causes, ["足関節不安定性／下腿三頭筋の過負荷"])
+        uniq_extend(diffs, ["外側靭帯軽度損傷／アキレス腱周囲炎の可能性"])
+        tips_hi += ["片脚立ち30秒×2（安全確保）→慣れたら難度UP","カーフレイズ10回×2（増悪しない範囲）"]
+        tips_mid += ["足首のABC運動×1セット/日","凸凹路面は当面回避"]
+        avoid += ["ジャンプ反復","不安定な靴での長時間歩行"]
+
+    # ---- 背景因子・期間・強さ・自由記載（共通）----
+    if "座" in factor:
+        uniq_extend(causes, ["長時間座位で腰背部に持続的負担"])
+        tips_hi += ["60分ごとに立って1–2分歩く"]
+        tips_mid += ["座面奥に座り背もたれを使う"]
+        avoid += ["同じ姿勢を長時間続ける"]
+    if ("前かが" in factor) or ("重い物" in factor) or ("持ち上げ" in txt_all):
+        uniq_extend(causes, ["前屈＋荷重で椎間板・靱帯にストレス"])
+        tips_hi += ["荷物は体に近づけ、ねじらず持ち上げる（股関節から曲げる）"]
+        avoid += ["前かがみで重い物を持つ"]
+    if ("夕方" in diurnal) or ("歩くと楽" in factor) or ("歩くと楽" in txt_all):
+        uniq_extend(diffs, ["脊柱管狭窄傾向（前屈で楽/歩行で改善しやすい）"])
+        tips_mid += ["5–10分の楽な散歩を1日2–3回"]
+
+    if "急性" in onset:
+        tips_hi += ["初期48–72時間は“楽な範囲”の生活動作（安静にし過ぎない）"]
+    if "慢性" in onset:
+        tips_mid += ["1日の合計活動量を少しずつ増やす（週10%目安）"]
+    if any(k in intensity for k in ["7","8","9","10","最強"]):
+        avoid += ["痛みが増える動きの反復"]
+        tips_hi += ["短時間・低負荷で様子見し、楽な姿勢で休む"]
+
+    kw = (free_text or "")
+    if any(k in kw for k in ["ラン", "ジョグ", "走"]):
+        uniq_extend(diffs, ["オーバーユース（走行距離/ペース急増）"])
+        tips_mid += ["距離を半分・ペース1段階下げて1週間様子見"]
+    if any(k in kw for k in ["デスク", "PC", "運転"]):
+        tips_mid += ["作業環境：モニタ目線・肘90°・足裏は床ベタ置き"]
+
+    if not causes: uniq_extend(causes, ["姿勢や活動量の偏りによる筋・筋膜の過緊張"])
+    if not diffs:   uniq_extend(diffs, ["筋・筋膜性の痛みの傾向"])
+    if not avoid:   uniq_extend(avoid, ["急に重い物を持つ","痛みが増える動作の反復"])
+
+    tips_md = format_prioritized(tips_hi, tips_mid, tips_low)
+
+    note = [
+        "発熱・外傷後・排尿排便障害・急な麻痺/広範なしびれ",
+        "改善が数週間以上乏しい/夜間増悪/歩行困難が続く",
+    ]
+    if "受診" in proceed_note:
+        note.insert(0, proceed_note.strip("（）"))
+
+    return (
+        f"{H_CAUSES}\n- " + "\n- ".join(causes[:6]) + "\n\n"
+        f"{H_DIFFS}\n- " + "\n- ".join(diffs[:6]) + "\n\n"
+        f"{H_TIPS}\n" + tips_md + "\n\n"
+        f"{H_AVOID}\n- " + "\n- ".join(avoid[:5]) + "\n\n"
+        f"{H_REFERRAL}\n- " + "\n- ".join(note) + "\n"
+    )
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# ローカル用の OpenAI 互換モックサーバ（/v1/chat/completions のみ）
+# - stream=true なら SSE でトークンを少しずつ返す。応答は固定の見出しつき Markdown
+# - --latency（最初のトークンまで）/ --token-delay / --error-rate で遅延や失敗を再現
+# 実行例： python -m bench.mock_openai --port 8808 --latency 0.3
+#          OPENAI_BASE_URL=http://127.0.0.1:8808/v1 OPENAI_API_KEY=dummy PAINNAVI_DEMO=0 streamlit run app.py
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from painnavi.rules import H_CAUSES, H_DIFFS, H_TIPS, H_REFERRAL
+
+REPLY = (
+    f"{H_CAUSES}\n- 長時間座位による腰背部の持続負荷\n- 股関節の硬さ\n\n"
+    f"{H_DIFFS}\n- 筋・筋膜性の痛みの傾向\n\n"
+    f"{H_TIPS}\n1. 60分ごとに立って1–2分歩く（優先度★★★）\n2. 股関節ヒンジ練習（優先度★★）\n"
+    "3. 5–10分の楽な歩行を1日2回（優先度★★）\n\n"
+    "## 回避すべき動き\n- 深い前屈\n\n"
+    f"{H_REFERRAL}\n- 発熱・外傷後・排尿排便障害・急な麻痺\n"
+)
+
+
+class MockState:
+    def __init__(self, latency=0.0, token_delay=0.0, error_rate=0.0, reply=REPLY, seed=None):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.reply = reply
+        self.rnd = random.Random(seed)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+def make_handler(state: MockState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, code, obj):
+            body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            with state.lock:
+                state.requests += 1
+                fail = state.rnd.random() < state.error_rate
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self._json(404, {"error": {"message": "not found"}})
+            req = json.loads(body or b"{}")
+            time.sleep(state.latency)
+            if fail:
+                return self._json(500, {"error": {"message": "injected error", "type": "server_error"}})
+            model = req.get("model", "mock")
+            step = 8
+            if not req.get("stream"):
+                time.sleep(state.token_delay * -(-len(state.reply) // step))  # 生成にかかる時間ぶん待ってから全文
+                return self._json(200, {
+                    "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": state.reply},
+                                 "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            n_chunks = -(-len(state.reply) // step)   # usage はチャンク数をトークン数として返す（概数）
+            for i in range(0, len(state.reply), step):
+                chunk = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": model, "choices": [{"index": 0, "delta": {"content": state.reply[i:i + step]},
+                                                      "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(state.token_delay)
+            if (req.get("stream_options") or {}).get("include_usage"):
+                n_prompt = sum(len(m.get("content") or "") for m in req.get("messages", []))
+                chunk = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": model, "choices": [],
+                         "usage": {"prompt_tokens": n_prompt, "completion_tokens": n_chunks,
+                                   "total_tokens": n_prompt + n_chunks}}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return Handler
+
+
+def serve(port=0, **kwargs):
+    """バックグラウンドで起動し (server, state) を返す。base_url は f"http://127.0.0.1:{server.server_port}/v1" """
+    state = MockState(**kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8808)
+    ap.add_argument("--latency", type=float, default=0.0)
+    ap.add_argument("--token-delay", type=float, default=0.01)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    args = ap.parse_args(argv)
+    state = MockState(args.latency, args.token_delay, args.error_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(state))
+    print(f"mock OpenAI: http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+# ベンチマーク一式の実行・保存・比較（すべてオフラインで動く）
+# - rerun   : AppTest で画面操作を再現したときの再実行時間（bench_rerun）
+# - advice  : 全部位の合成入力に対する local_advice の calls/s（エンジン単体・キャッシュ経由）
+# - redflag : 短文／長文の赤旗スキャン時間（bench_redflag）
+# - history : 10^3〜10^6 件のログからの履歴読み込み時間（bench_history）
+# - tips    : セルフケア提案のカタログの項目数ごとの advise / rank / rank_many の時間（bench_tips）
+# 結果は JSON（指標名 -> 値・単位・良い向き）。--compare で保存済みの基準と比べ、悪化を検出したら終了コード 1
+# 実行例：
+#   python -m bench.run --save bench/baseline.json            # 基準を保存
+#   python -m bench.run --compare bench/baseline.json         # 変更後に比較（閾値は --threshold）
+#   python -m bench.run --suites advice redflag --quick       # 一部だけ・短時間で
+
+import argparse
+import datetime as dt
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from bench import bench_history, bench_redflag, bench_rerun, bench_tips
+from bench.bench_advice import timeit
+from bench.corpus import iter_intakes, long_text
+
+RESULTS_DIR = Path("bench") / "results"
+LOWER, HIGHER = "lower", "higher"
+
+
+def metric(value, unit, better=LOWER):
+    return {"value": value, "unit": unit, "better": better}
+
+
+# ================= 各スイート（指標名 -> metric を返す） =================
+def suite_rerun(quick):
+    first, times, generate = bench_rerun.measure("app.py", 12 if quick else 60)
+    s = bench_rerun.summarize(times)
+    return {
+        "rerun.first_ms": metric(first * 1000, "ms"),
+        "rerun.median_ms": metric(s["median_ms"], "ms"),
+        "rerun.p95_ms": metric(s["p95_ms"], "ms"),
+        "rerun.generate_ms": metric(generate * 1000, "ms"),
+    }
+
+
+def suite_advice(quick):
+    from painnavi.advice_cache import AdviceCache
+    from painnavi.engine import AdviceEngine
+
+    intakes = list(iter_intakes())
+    if quick:
+        intakes = intakes[::10]
+    repeat = 1 if quick else 3
+    engine = AdviceEngine()
+    cache = AdviceCache(engine)
+    out = {"advice.intakes": metric(len(intakes), "件", better=None)}
+    for name, fn in [("engine", engine.advise), ("cached", cache.advise)]:
+        t = timeit(fn, intakes, repeat)
+        out[f"advice.{name}.calls_per_s"] = metric(len(intakes) / t, "calls/s", HIGHER)
+    return out
+
+
+REDFLAG_CASES = [("short", 200, 0), ("short_hit", 200, 1), ("long_100k", 100_000, 5), ("long_1m", 1_000_000, 50)]
+
+
+def suite_redflag(quick):
+    from painnavi.redflag import RedFlagScanner
+
+    scanner = RedFlagScanner()
+    repeat = 3 if quick else 10
+    out = {}
+    for name, n, hits in REDFLAG_CASES:
+        if quick and n > 100_000:
+            continue
+        text = long_text(n, n_hits=hits)
+        loops = max(1, 2000 // max(1, n // 100))   # 短文は何回も回して1回あたりに直す
+        for fn_name, fn in [("search", scanner.search), ("scan", scanner.scan)]:
+            t = bench_redflag.timeit(lambda s: [fn(s) for _ in range(loops)], text, repeat) / loops
+            out[f"redflag.{name}.{fn_name}_us"] = metric(t * 1e6, "us")
+    return out
+
+
+HISTORY_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def suite_history(quick):
+    out = {}
+    for size in HISTORY_SIZES[:2] if quick else HISTORY_SIZES:
+        r = bench_history.measure(bench_history.make_logs(size), repeat=3 if quick else 5)
+        for k, v in r.items():
+            out[f"history.{size}.{k}_ms"] = metric(v * 1000, "ms")
+    return out
+
+
+TIP_SIZES = [0, 1000, 5000]
+
+
+def suite_tips(quick):
+    intakes = list(iter_intakes())[::25 if quick else 5]
+    out = {}
+    for n in TIP_SIZES[:2] if quick else TIP_SIZES:
+        r = bench_tips.measure(n, intakes, repeat=1 if quick else 3)
+        for k in ("advise", "rank", "rank_many"):
+            out[f"tips.{n}.{k}_us"] = metric(r[k] * 1e6, "us")
+    return out
+
+
+SUITES = {"rerun": suite_rerun, "advice": suite_advice, "redflag": suite_redflag, "history": suite_history,
+          "tips": suite_tips}
+
+
+# ================= 保存・比較 =================
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {"timestamp": dt.datetime.now().isoformat(timespec="seconds"), "commit": commit,
+            "python": platform.python_version(), "platform": platform.platform(),
+            "machine": platform.machine()}
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """基準と比べた (指標名, 基準値, 今回, 変化率, 悪化か) のリスト。変化率は「良い向き」を正とする"""
+    rows = []
+    for name, cur in current["metrics"].items():
+        base = baseline.get("metrics", {}).get(name)
+        if not base or cur.get("better") is None or not base["value"]:
+            continue
+        ratio = cur["value"] / base["value"]
+        change = (ratio - 1) if cur["better"] == HIGHER else (1 - ratio)
+        rows.append((name, base["value"], cur["value"], change, change < -threshold))
+    return rows
+
+
+def print_metrics(metrics: dict):
+    for name, m in metrics.items():
+        print(f"  {name:<40}{m['value']:>14.3f} {m['unit']}")
+
+
+def print_comparison(rows, threshold):
+    print(f"\n基準との比較（±{threshold:.0%} を超える悪化を検出）")
+    for name, base, cur, change, bad in rows:
+        mark = "悪化" if bad else ("改善" if change > threshold else "")
+        print(f"  {name:<40}{base:>12.3f} -> {cur:>12.3f}  {change:>+7.1%}  {mark}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="ベンチマーク一式")
+    ap.add_argument("--suites", nargs="*", default=list(SUITES), choices=list(SUITES))
+    ap.add_argument("--quick", action="store_true", help="件数・回数を減らして短時間で回す")
+    ap.add_argument("-o", "--output", help="結果の JSON（既定：bench/results/<時刻>.json）")
+    ap.add_argument("--save", help="結果を基準として保存するパス")
+    ap.add_argument("--compare", help="比べる基準の JSON")
+    ap.add_argument("--threshold", type=float, default=0.25, help="悪化とみなす変化率（既定 0.25 = 25%%）")
+    args = ap.parse_args(argv)
+
+    result = {"env": environment(), "quick": args.quick, "metrics": {}}
+    for name in args.suites:
+        t0 = time.perf_counter()
+        metrics = SUITES[name](args.quick)
+        print(f"[{name}] {time.perf_counter() - t0:.1f} s")
+        print_metrics(metrics)
+        result["metrics"].update(metrics)
+
+    out = Path(args.output) if args.output else RESULTS_DIR / f"{dt.datetime.now():%Y%m%d_%H%M%S}.json"
+    paths = [out] + ([Path(args.save)] if args.save else [])
+    for p in paths:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n結果: {', '.join(map(str, paths))}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if baseline.get("quick") != args.quick:
+            print("注意: 基準と --quick の指定が違います（件数が異なるため比較は目安）", file=sys.stderr)
+        rows = compare(result, baseline, args.threshold)
+        print_comparison(rows, args.threshold)
+        if any(bad for *_, bad in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
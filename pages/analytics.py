@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# ログ分析ページ：すべての相談ログ（logs/painlog_*.csv）を集計して推移・内訳・よく出る提案を表示
+# - 列キャッシュ（painnavi.analytics）はプロセスで1つ。変わったログファイルだけ読み直す
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from painnavi.analytics import ColumnStore, counts, red_flag_trend, top_items, trend
+from painnavi.painlog import LOG_DIR
+
+st.set_page_config(page_title="痛みナビBot｜ログ分析", layout="wide")
+st.title("📊 相談ログの分析")
+
+LABELS = {"part": "部位", "type": "症状のタイプ", "intensity": "痛みの強さ", "onset": "発症からの期間",
+          "diurnal": "日内変動", "factor": "背景・増悪因子"}
+FREQS = {"月": "M", "週": "W", "日": "D"}
+SECTIONS = {"tips": "セルフケアの提案", "causes": "可能性のある原因", "diffs": "考えられること", "avoid": "避ける動き"}
+
+
+@st.cache_resource(show_spinner=False)
+def column_store() -> ColumnStore:
+    return ColumnStore(LOG_DIR)
+
+
+with st.spinner("ログを読み込み中…（初回のみ CSV を解析します）"):
+    cols = column_store().frame()
+
+if not len(cols):
+    st.info("まだ相談ログがありません。")
+    st.stop()
+
+# ================= 条件 =================
+st.sidebar.subheader("集計条件")
+by = st.sidebar.selectbox("内訳", list(LABELS), format_func=LABELS.get, key="an_by")
+freq = FREQS[st.sidebar.radio("集計単位", list(FREQS), horizontal=True, key="an_freq")]
+parts = ["（すべて）"] + [v for v, _ in counts(cols, "part")]
+part = st.sidebar.selectbox("部位で絞り込む", parts, key="an_part")
+where = {} if part == parts[0] else {"part": part}
+top = st.sidebar.slider("推移に表示する数", 3, 15, 8, key="an_top")
+
+# ================= 概要 =================
+periods, total, red = red_flag_trend(cols, freq, where)
+n_all, n_red = int(total.sum()), int(red.sum())
+c1, c2, c3 = st.columns(3)
+c1.metric("相談件数", f"{n_all:,}")
+c2.metric("赤旗あり", f"{n_red:,}", f"{n_red / n_all:.1%}" if n_all else None, delta_color="off")
+days = cols.day[~np.isnat(cols.day)]
+c3.metric("期間", f"{days.min()} 〜 {days.max()}" if len(days) else "—")
+
+# ================= 推移・内訳 =================
+st.subheader(f"{LABELS[by]}ごとの推移")
+p, labels, table = trend(cols, by, freq, where, top=top)
+st.line_chart(pd.DataFrame(table, index=pd.to_datetime(p), columns=labels))
+
+left, right = st.columns(2)
+with left:
+    st.subheader(f"{LABELS[by]}の内訳")
+    st.bar_chart(pd.DataFrame(counts(cols, by, where), columns=[LABELS[by], "件数"]).set_index(LABELS[by]))
+with right:
+    st.subheader("赤旗ありの割合")
+    rate = pd.DataFrame({"赤旗あり(%)": (red / total.clip(min=1) * 100).round(1)}, index=pd.to_datetime(periods))
+    st.line_chart(rate)
+
+# ================= よく出る項目 =================
+st.subheader("よく出る項目")
+section = st.radio("セクション", list(SECTIONS), format_func=SECTIONS.get, horizontal=True, key="an_section")
+items = top_items(cols, section, 15, where)
+st.dataframe(pd.DataFrame(items, columns=[SECTIONS[section], "件数"]), hide_index=True)
+
+stats = column_store().stats()
+st.caption(f"ログ {stats['files']} ファイル / 解析 {stats['rebuilt']} 回・追記分 {stats['appended']} 回・キャッシュ読込 {stats['loaded']} 回")
@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""痛みナビBot のコア（Streamlit に依存しない部分）"""
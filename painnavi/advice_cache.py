@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# デモエンジンの結果キャッシュ
+# - 選択肢だけの入力（部位×タイプ×強さ×期間×日内変動×因子×赤旗注記）は有限なので、起動時に全件を表にしておく
+# - 自由記載・自由入力を含む入力は、正規化した入力タプルをキーに上限つき LRU で保持
+# - 表/LRU のヒット・ミス・追い出し件数を数える（効き具合の確認用）
+
+import hashlib
+import itertools
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+
+from .engine import Intake, default_engine
+from .redflag import PROCEED_NOTE
+from . import rules as R
+
+FREE = "その他（自由入力）"
+_WS = re.compile(r"\s+")
+
+
+def _fixed(choices):
+    return [c for c in choices if c != FREE]
+
+
+def structured_intakes():
+    """画面の選択肢だけで作れる入力をすべて返す"""
+    for part in _fixed(R.PART_CHOICES):
+        for combo in itertools.product(_fixed(R.TYPE_OPTIONS_MAP[part]), _fixed(R.INTENSITY_CHOICES),
+                                       _fixed(R.ONSET_CHOICES), _fixed(R.DIURNAL_CHOICES),
+                                       _fixed(R.FACTOR_CHOICES), ["", PROCEED_NOTE]):
+            *fields, note = combo
+            yield Intake(part, *fields, free_text="", proceed_note=note)
+
+
+def normalize(intake: Intake) -> Intake:
+    """キャッシュキー用の正規化（前後の空白除去・連続空白の圧縮。キーワードに空白は無いので結果は変わらない）"""
+    return Intake(*(_WS.sub(" ", v).strip() if isinstance(v, str) else v for v in intake))
+
+
+def rules_fingerprint() -> str:
+    """ルール表と補充リストのハッシュ（保存した表が古くなっていないかの確認用）"""
+    data = [R.RULES, R.DEFAULT_CAUSES, R.DEFAULT_DIFFS, R.DEFAULT_AVOID, R.PAD_POOL, R.BASE_TIPS,
+            R.TIP_CATALOG, R.REFERRAL_NOTES, [R.H_CAUSES, R.H_DIFFS, R.H_TIPS, R.H_AVOID, R.H_REFERRAL], PROCEED_NOTE]
+    return hashlib.sha256(json.dumps(data, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class AdviceCache:
+    """選択肢だけの入力は表引き、それ以外は LRU 経由でエンジンを呼ぶ"""
+
+    def __init__(self, engine=None, maxsize=4096, table_path=None, eager=True):
+        self.engine = engine or default_engine()
+        self.maxsize = maxsize
+        self.table_path = Path(table_path) if table_path else None
+        self.table = {}
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.table_hits = self.hits = self.misses = self.evictions = 0
+        if eager:
+            self.load_table()
+
+    # ---- 事前計算の表 ----
+    def load_table(self):
+        """保存済みの表があれば読み、無い/古い場合は全件計算する（table_path 指定時は保存も）"""
+        fp = rules_fingerprint()
+        if self.table_path and self.table_path.exists():
+            try:
+                data = json.loads(self.table_path.read_text(encoding="utf-8"))
+                if data.get("fingerprint") == fp:
+                    self.table = {Intake(*k): v for k, v in data["entries"]}
+                    return self.table
+            except (OSError, ValueError, TypeError, KeyError):
+                pass
+        intakes = list(structured_intakes())
+        self.table = dict(zip(intakes, self.engine.advise_many(intakes)))   # 提案はまとめて採点
+        if self.table_path:
+            self._save_table(fp)
+        return self.table
+
+    def _save_table(self, fp):
+        self.table_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.table_path.with_name(self.table_path.name + f".{os.getpid()}.tmp")
+        data = {"fingerprint": fp, "entries": [[list(k), v] for k, v in self.table.items()]}
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.table_path)
+
+    # ---- 参照 ----
+    def advise(self, intake: Intake) -> str:
+        if not intake.free_text:
+            hit = self.table.get(intake)
+            if hit is not None:
+                self.table_hits += 1
+                return hit
+        key = normalize(intake)
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return hit
+            self.misses += 1
+        advice = self.engine.advise(key)
+        with self._lock:
+            self._lru[key] = advice
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+                self.evictions += 1
+        return advice
+
+    def stats(self) -> dict:
+        total = self.table_hits + self.hits + self.misses
+        return {
+            "table_size": len(self.table), "table_hits": self.table_hits,
+            "lru_size": len(self._lru), "lru_maxsize": self.maxsize,
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            "hit_ratio": (self.table_hits + self.hits) / total if total else 0.0,
+        }
+
+
+@lru_cache(maxsize=None)
+def default_cache() -> AdviceCache:
+    """プロセスごとに1つの既定キャッシュ（初回に表を作る）"""
+    return AdviceCache()
+
+
+def cached_advise(intake: Intake) -> str:
+    return default_cache().advise(intake)
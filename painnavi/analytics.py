@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+# 相談ログ全体の集計（部位・タイプ・因子・赤旗の推移、よく出る提案）
+# - CSV は1ファイルにつき1回だけ解析し、列ごとの NumPy 配列（カテゴリは番号＋語彙）として .cache/analytics/ に保存
+# - 次回からは (mtime, size) が同じファイルは保存済みの配列を読むだけ。追記で大きくなったファイルは増えた行だけ解析
+# - 集計は番号の配列に対する np.bincount（数百万行でも CSV を読み直さない）
+
+import csv
+import io
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from .painlog import LOG_DIR, _unescape, log_files
+from .resources import content_key, file_signature
+
+CACHE_DIR = Path(".cache") / "analytics"
+CATEGORIES = ["part", "type", "intensity", "onset", "diurnal", "factor"]
+ITEM_SECTIONS = ["causes", "diffs", "tips", "avoid"]     # 「 | 」区切りの項目（sections.compact）
+FORMAT = 1
+PERIODS = {"D": "datetime64[D]", "W": "W", "M": "datetime64[M]"}
+
+
+def _item(text: str) -> str:
+    return text.lstrip("★").strip()
+
+
+def _remap(index: dict, vocab) -> np.ndarray:
+    """ファイルごとの番号 -> 共通の番号（index に無い語は末尾に足す）"""
+    return np.array([index.setdefault(v, len(index)) for v in vocab] or [0], dtype=np.int32)
+
+
+class Columns:
+    """1ファイル分（または結合後）の列。カテゴリ列は (codes, vocab)、項目列は CSR（codes, offsets, vocab）"""
+
+    def __init__(self, day, red, cats, items):
+        self.day = day              # datetime64[D]（読めない日付は NaT）
+        self.red = red              # bool：赤旗の記録あり
+        self.cats = cats            # 列名 -> (int32 codes, list vocab)
+        self.items = items          # 節名 -> (int32 codes, int64 offsets, list vocab)
+
+    def __len__(self):
+        return len(self.day)
+
+    # ---- 保存・読み込み ----
+    def save(self, path: Path, meta: dict):
+        arrays = {"day": self.day, "red": self.red}
+        vocab = {}
+        for k, (codes, voc) in self.cats.items():
+            arrays[f"c_{k}"] = codes
+            vocab[k] = voc
+        for k, (codes, offs, voc) in self.items.items():
+            arrays[f"i_{k}"], arrays[f"o_{k}"] = codes, offs
+            vocab[f"items:{k}"] = voc
+        arrays["meta"] = np.frombuffer(json.dumps({**meta, "vocab": vocab}, ensure_ascii=False).encode("utf-8"),
+                                       dtype=np.uint8)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp.npz")
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path):
+        with np.load(path, allow_pickle=False) as z:
+            meta = json.loads(z["meta"].tobytes().decode("utf-8"))
+            vocab = meta.pop("vocab")
+            cats = {k: (z[f"c_{k}"], vocab[k]) for k in CATEGORIES}
+            items = {k: (z[f"i_{k}"], z[f"o_{k}"], vocab[f"items:{k}"]) for k in ITEM_SECTIONS}
+            return cls(z["day"], z["red"], cats, items), meta
+
+    # ---- 結合（語彙を共通にして番号を振り直す） ----
+    @classmethod
+    def concat(cls, parts):
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return cls.empty()
+        cats, items = {}, {}
+        for k in CATEGORIES:
+            index, codes = {}, []
+            for p in parts:
+                c, voc = p.cats[k]
+                codes.append(_remap(index, voc)[c])
+            cats[k] = (np.concatenate(codes), list(index))
+        for k in ITEM_SECTIONS:
+            index, codes, offs, base = {}, [], [np.zeros(1, dtype=np.int64)], 0
+            for p in parts:
+                c, o, voc = p.items[k]
+                codes.append(_remap(index, voc)[c])
+                offs.append(o[1:] + base)
+                base += len(c)
+            items[k] = (np.concatenate(codes), np.concatenate(offs), list(index))
+        return cls(np.concatenate([p.day for p in parts]), np.concatenate([p.red for p in parts]), cats, items)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.array([], dtype="datetime64[D]"), np.zeros(0, dtype=bool),
+                   {k: (np.zeros(0, dtype=np.int32), []) for k in CATEGORIES},
+                   {k: (np.zeros(0, dtype=np.int32), np.zeros(1, dtype=np.int64), []) for k in ITEM_SECTIONS})
+
+
+def parse_lines(header, lines) -> Columns:
+    """CSV の行（ヘッダ以外）を列に変換する"""
+    col = {name: i for i, name in enumerate(header)}
+    days, red = [], []
+    cat_idx = {k: {} for k in CATEGORIES}
+    cat_codes = {k: [] for k in CATEGORIES}
+    item_idx = {k: {} for k in ITEM_SECTIONS}
+    item_codes = {k: [] for k in ITEM_SECTIONS}
+    item_offs = {k: [0] for k in ITEM_SECTIONS}
+
+    def get(row, name):
+        i = col.get(name)
+        return _unescape(row[i]) if i is not None and i < len(row) else ""
+
+    for row in csv.reader(lines):    # 語彙は dict の挿入順＝番号順
+        if not row:
+            continue
+        days.append(get(row, "timestamp")[:10] or "NaT")
+        red.append(bool(get(row, "red_flags")))
+        for k in CATEGORIES:
+            idx = cat_idx[k]
+            cat_codes[k].append(idx.setdefault(get(row, k), len(idx)))
+        for k in ITEM_SECTIONS:
+            idx, codes = item_idx[k], item_codes[k]
+            for x in get(row, k).split(" | "):
+                x = _item(x)
+                if x:
+                    codes.append(idx.setdefault(x, len(idx)))
+            item_offs[k].append(len(codes))
+
+    try:
+        day = np.array(days, dtype="datetime64[D]")
+    except ValueError:
+        day = np.array([_day(d) for d in days], dtype="datetime64[D]")
+    return Columns(
+        day, np.array(red, dtype=bool),
+        {k: (np.array(cat_codes[k], dtype=np.int32), list(cat_idx[k])) for k in CATEGORIES},
+        {k: (np.array(item_codes[k], dtype=np.int32), np.array(item_offs[k], dtype=np.int64), list(item_idx[k]))
+         for k in ITEM_SECTIONS},
+    )
+
+
+def _day(s):
+    try:
+        return np.datetime64(s, "D")
+    except ValueError:
+        return np.datetime64("NaT")
+
+
+def read_columns(path, start=0):
+    """CSV を start バイト目から読み、(Columns, ヘッダ, 解析した末尾の位置) を返す（書きかけの行は読まない）"""
+    with open(path, "rb") as f:
+        head = f.readline()
+        header = next(csv.reader([head.decode("utf-8-sig").rstrip("\r\n")]), [])
+        f.seek(max(start, len(head)))
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    pos = max(start, len(head)) + end
+    text = data[:end].decode("utf-8", errors="replace")
+    return parse_lines(header, io.StringIO(text)), header, pos
+
+
+class ColumnStore:
+    """全ログファイルの列キャッシュ。frame() は変わったファイルだけ読み直して結合済みの列を返す"""
+
+    def __init__(self, log_dir=LOG_DIR, cache_dir=CACHE_DIR):
+        self.log_dir = Path(log_dir)
+        self.cache_dir = Path(cache_dir)
+        self._files = {}        # path -> (signature, Columns, meta)
+        self._frame = None
+        self._frame_key = None
+        self._lock = threading.Lock()
+        self.rebuilt = self.appended = self.loaded = 0
+
+    def _cache_path(self, path: Path) -> Path:
+        # ログの置き場所ごとに分ける（同名ファイルの取り違え防止）
+        return self.cache_dir / content_key(str(self.log_dir.resolve()).encode("utf-8"))[:10] / f"{path.name}.npz"
+
+    def _load_cache(self, path: Path):
+        try:
+            cols, meta = Columns.load(self._cache_path(path))
+        except (OSError, ValueError, KeyError):
+            return None, None
+        if meta.get("format") != FORMAT:
+            return None, None
+        self.loaded += 1
+        return cols, meta
+
+    def _file(self, path: Path) -> Columns:
+        sig = file_signature(path)
+        hit = self._files.get(path)
+        if hit and hit[0] == sig:
+            return hit[1]
+        cols, meta = hit[1:] if hit else self._load_cache(path)
+        dirty = True
+        if meta is not None and tuple(meta["sig"]) == sig:
+            dirty = False
+        elif meta is not None and meta["parsed"] <= sig[1]:
+            # 追記専用なので、前回解析した位置から後ろだけ読む
+            more, header, pos = read_columns(path, meta["parsed"])
+            if header == meta["header"]:
+                cols = Columns.concat([cols, more])
+                meta = {**meta, "sig": list(sig), "parsed": pos}
+                self.appended += 1
+            else:
+                meta = None
+        else:
+            meta = None     # 縮んだ・作り直されたファイル
+        if meta is None:
+            cols, header, pos = read_columns(path)
+            meta = {"format": FORMAT, "sig": list(sig), "parsed": pos, "header": header}
+            self.rebuilt += 1
+        if dirty:
+            try:
+                cols.save(self._cache_path(path), meta)
+            except OSError:
+                pass
+        self._files[path] = (sig, cols, meta)
+        return cols
+
+    def frame(self) -> Columns:
+        with self._lock:
+            paths = log_files(self.log_dir)
+            parts = [self._file(p) for p in paths]
+            key = tuple((p, self._files[p][0]) for p in paths)
+            if key != self._frame_key:
+                self._frame = Columns.concat(parts)
+                self._frame_key = key
+                for p in set(self._files) - set(paths):
+                    del self._files[p]
+            return self._frame
+
+    def stats(self) -> dict:
+        return {"files": len(self._files), "rebuilt": self.rebuilt, "appended": self.appended, "loaded": self.loaded}
+
+
+# ================= 集計 =================
+def period_of(day, freq="M"):
+    """日付を集計単位（D=日, W=週（月曜始まり）, M=月）の先頭日に丸める"""
+    if freq == "W":
+        d = day.astype("datetime64[D]").astype(np.int64)
+        return ((d - (d + 3) % 7)).astype("datetime64[D]")   # 1970-01-01 は木曜
+    return day.astype(PERIODS[freq]).astype("datetime64[D]")
+
+
+def _period_index(day, freq):
+    """(集計単位の先頭日の配列, 各行の期間番号)。並べ替えの代わりに日数の bincount で番号を振る"""
+    d = period_of(day, freq).astype(np.int64)
+    if not len(d):
+        return np.array([], dtype="datetime64[D]"), np.zeros(0, dtype=np.int64)
+    lo = d.min()
+    present = np.bincount(d - lo) > 0
+    rank = np.cumsum(present) - 1
+    return (np.flatnonzero(present) + lo).astype("datetime64[D]"), rank[d - lo]
+
+
+def mask_of(cols: Columns, where=None, start=None, end=None):
+    """条件（{列名: 値}・期間）に合う行の真偽配列。条件なしなら None"""
+    m = None
+    for k, v in (where or {}).items():
+        codes, vocab = cols.cats[k]
+        hit = codes == vocab.index(v) if v in vocab else np.zeros(len(codes), dtype=bool)
+        m = hit if m is None else (m & hit)
+    if start is not None:
+        hit = cols.day >= np.datetime64(start, "D")
+        m = hit if m is None else (m & hit)
+    if end is not None:
+        hit = cols.day <= np.datetime64(end, "D")
+        m = hit if m is None else (m & hit)
+    return m
+
+
+def counts(cols: Columns, by="part", where=None) -> list:
+    """(値, 件数) を多い順に"""
+    codes, vocab = cols.cats[by]
+    m = mask_of(cols, where)
+    n = np.bincount(codes if m is None else codes[m], minlength=len(vocab))
+    order = np.argsort(-n, kind="stable")
+    return [(vocab[i], int(n[i])) for i in order if n[i]]
+
+
+def trend(cols: Columns, by="part", freq="M", where=None, top=None):
+    """期間×値の件数表。戻り値：(期間の配列, 値のリスト, 件数の2次元配列[期間, 値])"""
+    codes, vocab = cols.cats[by]
+    ok = ~np.isnat(cols.day)
+    m = mask_of(cols, where)
+    if m is not None:
+        ok &= m
+    periods, pidx = _period_index(cols.day[ok], freq)
+    table = np.bincount(pidx * len(vocab) + codes[ok], minlength=len(periods) * len(vocab))
+    table = table.reshape(len(periods), len(vocab)) if len(vocab) else table.reshape(len(periods), 0)
+    order = np.argsort(-table.sum(axis=0), kind="stable")
+    if top:
+        order = order[:top]
+    order = [i for i in order if table[:, i].any()]
+    return periods, [vocab[i] for i in order], table[:, order]
+
+
+def red_flag_trend(cols: Columns, freq="M", where=None):
+    """期間ごとの (件数, 赤旗ありの件数)"""
+    ok = ~np.isnat(cols.day)
+    m = mask_of(cols, where)
+    if m is not None:
+        ok &= m
+    periods, pidx = _period_index(cols.day[ok], freq)
+    total = np.bincount(pidx, minlength=len(periods))
+    red = np.bincount(pidx, weights=cols.red[ok], minlength=len(periods)).astype(np.int64)
+    return periods, total, red
+
+
+def top_items(cols: Columns, section="tips", n=10, where=None) -> list:
+    """よく出る項目（セルフケア提案など）を (項目, 件数) で多い順に"""
+    codes, offs, vocab = cols.items[section]
+    m = mask_of(cols, where)
+    if m is not None:
+        lens = np.diff(offs)
+        codes = codes[np.repeat(m, lens)]
+    cnt = np.bincount(codes, minlength=len(vocab))
+    order = np.argsort(-cnt, kind="stable")[:n]
+    return [(vocab[i], int(cnt[i])) for i in order if cnt[i]]
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+# HTTP API（ASGI / Starlette）：デモエンジン・赤旗判定・プロンプト要約を JSON で返す
+# - 1件用と一括用（{"items": [...]}）のエンドポイント。入力の形式は batch と同じ（part, ptype/type, …, free_text）
+# - 処理はプロセスプールに分けて実行（--workers 0 ならスレッドで。どちらもイベントループは止めない）。
+#   advice・redflags で数件以下・本文が短いもの（1件用の多く）だけは、プロセス間の受け渡しの方が高くつくので
+#   イベントループ内で直接処理する（表引きが中心で1件は数十 µs）。summary は参考資料の索引を作るので常にプール
+# - 各ワーカーは起動時（initializer）にデモ表を作る → 全ワーカーの準備が済むまで /readyz は 503
+# - keep-alive は uvicorn の既定どおり有効（--keep-alive で保持秒数を指定）
+# 実行例： python -m painnavi.api --port 8000 --workers 4
+#          curl -s localhost:8000/v1/advice -d '{"part": "腰", "ptype": "慢性的な鈍痛"}'
+
+import argparse
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .advice_cache import default_cache
+from .batch import hit_dict, process_record, screen_record
+from .metrics import default_metrics
+from .prompt import build_prompt
+
+MAX_BATCH = 1000            # 一括リクエストの上限件数
+CHUNK_SIZE = 64             # 一括リクエストをワーカーに分ける単位
+INLINE_MAX = 8              # この件数以下はプールに渡さない
+INLINE_KINDS = ("advice", "redflags")
+INLINE_TEXT_MAX = 4000      # 直接処理する入力の文字数の合計の上限（赤旗スキャンは本文の長さに比例）
+MAX_INFLIGHT_PER_WORKER = 4
+WORKER_START_TIMEOUT = 120.0    # ワーカーがデモ表を作り終えるまで待つ上限（秒）
+
+
+# ================= ワーカー側の処理（プロセスプールに渡すので関数はモジュール直下） =================
+def _init_worker(ready):
+    """ワーカーの起動時：デモ表を作ってから、準備できたことを知らせる"""
+    default_cache()
+    ready.put(os.getpid())
+
+
+def _text_size(items) -> int:
+    return sum(len(v) for rec in items for v in rec.values() if isinstance(v, str))
+
+
+def advice_many(items) -> list:
+    out = []
+    for rec in items:
+        try:
+            out.append(process_record(rec))
+        except Exception as e:
+            out.append({"id": rec.get("id") if isinstance(rec, dict) else None, "error": f"{type(e).__name__}: {e}"})
+    return out
+
+
+def redflags_many(items) -> list:
+    out = []
+    for rec in items:
+        try:
+            _, red_flags, hits = screen_record(rec)
+            out.append({"id": rec.get("id"), "has_red_flag": bool(red_flags), "red_flags": red_flags,
+                        "red_flag_hits": [hit_dict(h) for h in hits]})
+        except Exception as e:
+            out.append({"id": rec.get("id") if isinstance(rec, dict) else None, "error": f"{type(e).__name__}: {e}"})
+    return out
+
+
+def summary_many(items) -> list:
+    out = []
+    for rec in items:
+        try:
+            intake, red_flags, _ = screen_record(rec)
+            prompt = build_prompt(intake, detail=int(rec.get("detail") or 4),
+                                  profile_text=rec.get("profile_text") or "",
+                                  history_text=rec.get("history_text") or "", extra_ref=rec.get("extra_ref") or "")
+            out.append({"id": rec.get("id"), "has_red_flag": bool(red_flags), "system": prompt.system,
+                        "summary": prompt.user, "prompt_tokens": prompt.usage})
+        except Exception as e:
+            out.append({"id": rec.get("id") if isinstance(rec, dict) else None, "error": f"{type(e).__name__}: {e}"})
+    return out
+
+
+HANDLERS = {"advice": advice_many, "redflags": redflags_many, "summary": summary_many}
+
+
+# ================= 実行基盤 =================
+class Engine:
+    """処理の振り分け先（プロセスプール、または workers=0 ならこのプロセスで直接）"""
+
+    def __init__(self, workers=0, chunk_size=CHUNK_SIZE, inline_max=INLINE_MAX, start_timeout=WORKER_START_TIMEOUT):
+        self.workers = workers
+        self.start_timeout = start_timeout
+        self.chunk_size = chunk_size
+        self.inline_max = inline_max
+        self.pool = None
+        self.ready = False
+        self._slots = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, default_cache)     # 直接処理する分の表
+        if self.workers > 0:
+            ctx = multiprocessing.get_context()
+            ready = ctx.Queue()
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                            initializer=_init_worker, initargs=(ready,))
+            self._slots = asyncio.Semaphore(self.workers * MAX_INFLIGHT_PER_WORKER)
+            # 全ワーカーを起こし、それぞれがデモ表を作り終えるまで待つ（起動直後のリクエストが表の作成を待たないように）
+            deadline = time.monotonic() + self.start_timeout
+            try:
+                await asyncio.wait_for(asyncio.gather(*(loop.run_in_executor(self.pool, os.getpid)
+                                                        for _ in range(self.workers))), self.start_timeout)
+                for _ in range(self.workers):
+                    await loop.run_in_executor(None, ready.get, True, max(0.0, deadline - time.monotonic()))
+            except (asyncio.TimeoutError, queue.Empty, BrokenProcessPool) as e:
+                self.stop()
+                raise RuntimeError(f"ワーカーの起動に失敗しました（{self.start_timeout:g} 秒以内にデモ表の準備が"
+                                   f"揃わない：{type(e).__name__}）") from e
+        self.ready = True
+
+    def stop(self):
+        self.ready = False
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    async def run(self, kind: str, items: list) -> list:
+        fn = HANDLERS[kind]
+        if kind in INLINE_KINDS and len(items) <= self.inline_max and _text_size(items) <= INLINE_TEXT_MAX:
+            return fn(items)
+        loop = asyncio.get_running_loop()
+        if self.pool is None:
+            return await loop.run_in_executor(None, fn, items)
+
+        async def one(part):
+            async with self._slots:
+                return await loop.run_in_executor(self.pool, fn, part)
+
+        if len(items) <= self.chunk_size:
+            return await one(items)
+        parts = await asyncio.gather(*(one(items[i:i + self.chunk_size])
+                                       for i in range(0, len(items), self.chunk_size)))
+        return [x for p in parts for x in p]
+
+
+def create_app(workers=None, chunk_size=CHUNK_SIZE):
+    """Starlette アプリを作る（uvicorn の --factory からも呼べる。workers 省略時は PAINNAVI_API_WORKERS）"""
+    try:
+        from starlette.applications import Starlette
+        from starlette.responses import JSONResponse, PlainTextResponse
+        from starlette.routing import Route
+    except ImportError as e:
+        raise RuntimeError("API には starlette と uvicorn が必要です。`python3 -m pip install -r requirements-api.txt`") from e
+
+    if workers is None:
+        workers = int(os.environ.get("PAINNAVI_API_WORKERS", "0"))
+    engine = Engine(workers, chunk_size)
+    metrics = default_metrics()
+
+    def error(status, message):
+        return JSONResponse({"error": message}, status_code=status)
+
+    async def body_of(request):
+        try:
+            return await request.json()
+        except ValueError:
+            return None
+
+    def endpoint(kind, batch):
+        async def handler(request):
+            if not engine.ready:
+                return error(503, "starting")
+            data = await body_of(request)
+            if batch:
+                items = data.get("items") if isinstance(data, dict) else data
+                if not isinstance(items, list):
+                    return error(400, '{"items": [...]} の形式で送ってください')
+                if len(items) > MAX_BATCH:
+                    return error(413, f"一括は最大 {MAX_BATCH} 件です")
+            else:
+                items = [data]
+            if not all(isinstance(x, dict) for x in items):
+                return error(400, "各記録は JSON オブジェクトである必要があります")
+            t0 = time.perf_counter()
+            results = await engine.run(kind, items)
+            if metrics.enabled:
+                metrics.observe(f"api_{kind}", time.perf_counter() - t0)
+                metrics.inc("api_requests")
+                metrics.inc("api_items", len(items))
+            if batch:
+                return JSONResponse({"items": results})
+            res = results[0]
+            return JSONResponse(res, status_code=400 if "error" in res else 200)
+        return handler
+
+    async def healthz(request):
+        return JSONResponse({"status": "ok"})
+
+    async def readyz(request):
+        if engine.ready:
+            return JSONResponse({"status": "ready", "workers": engine.workers})
+        return JSONResponse({"status": "starting"}, status_code=503)
+
+    async def prometheus(request):
+        return PlainTextResponse(metrics.prometheus(), media_type="text/plain; version=0.0.4")
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        await engine.start()
+        try:
+            yield
+        finally:
+            engine.stop()
+
+    routes = [Route("/healthz", healthz), Route("/readyz", readyz), Route("/metrics", prometheus)]
+    for kind in HANDLERS:
+        routes.append(Route(f"/v1/{kind}", endpoint(kind, False), methods=["POST"]))
+        routes.append(Route(f"/v1/{kind}/batch", endpoint(kind, True), methods=["POST"]))
+    app = Starlette(routes=routes, lifespan=lifespan)
+    app.state.engine = engine
+    return app
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="痛みナビBot の HTTP API")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="ルール評価のプロセス数（0 でこのプロセスのスレッドで実行）")
+    ap.add_argument("--processes", type=int, default=1,
+                    help="uvicorn のプロセス数（それぞれが --workers のプールを持つ）")
+    ap.add_argument("--keep-alive", type=int, default=30, help="keep-alive の保持秒数")
+    args = ap.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("uvicorn が必要です。`python3 -m pip install -r requirements-api.txt`")
+    os.environ["PAINNAVI_API_WORKERS"] = str(args.workers)
+    uvicorn.run("painnavi.api:create_app", factory=True, host=args.host, port=args.port,
+                workers=args.processes, timeout_keep_alive=args.keep_alive, access_log=False)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
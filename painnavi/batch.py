@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+# ヘッドレス一括実行：相談記録（JSONL / CSV）にデモエンジンを流し、結果を JSONL で書き出す
+# - 入力は1行ずつ読み、チャンク単位でプロセスプールに投げる（同時に抱えるチャンク数は上限つき＝メモリ一定）
+# - 出力は入力順のまま逐次書き出す
+# 実行例： python -m painnavi.batch intake.jsonl -o advice.jsonl --workers 8 --chunk-size 500
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from .advice_cache import cached_advise
+from .engine import Intake
+from .prompt import build_prompt
+from .redflag import MANUAL_FLAGS, PROCEED_NOTE, collect_red_flags, default_scanner
+
+MISSING = "その他（詳細未入力）"
+# 入力キーの別名（ログCSVは type 列）
+ALIASES = {"ptype": ("ptype", "type")}
+TRUE_WORDS = {"1", "true", "yes", "y", "on", "はい"}
+MANUAL_NAMES = [name for _, name, _ in MANUAL_FLAGS]
+
+
+def _truthy(v) -> bool:
+    if isinstance(v, str):
+        return v.strip().lower() in TRUE_WORDS
+    return bool(v)
+
+
+def _field(rec, name):
+    for key in ALIASES.get(name, (name,)):
+        v = rec.get(key)
+        if v not in (None, ""):
+            return str(v).strip()
+    return ""
+
+
+def intake_from_record(rec: dict) -> Intake:
+    """1件の記録から Intake を作る（空欄は画面の自由入力と同じく「詳細未入力」扱い）"""
+    values = {f: _field(rec, f) or MISSING for f in ("part", "ptype", "intensity", "onset", "diurnal", "factor")}
+    return Intake(free_text=_field(rec, "free_text"), **values)
+
+
+def manual_flags_from_record(rec: dict) -> list:
+    """手動の赤旗（flag_* の列、または red_flags に書かれた手動項目の表示名）。
+    red_flags はログCSVでは「 / 」区切り（表示名自体に / を含む）。自動検出の行は読まない（いまのスキャナで判定し直す）"""
+    names = [name for key, name, _ in MANUAL_FLAGS if _truthy(rec.get(key))]
+    extra = rec.get("red_flags") or []
+    if isinstance(extra, str):
+        extra = [x.strip() for x in extra.split(" / ")]
+    return names + [x for x in MANUAL_NAMES if x in extra and x not in names]
+
+
+def hit_dict(h) -> dict:
+    return {"category": h.category, "phrase": h.phrase, "start": h.start, "end": h.end}
+
+
+def screen_record(rec: dict):
+    """赤旗の判定（手動の項目＋自由記載の自動検知）。該当すれば受診優先の注記を付けた Intake を返す
+    戻り値：(intake, red_flags, hits)"""
+    intake = intake_from_record(rec)
+    hits = default_scanner().scan(intake.free_text)
+    red_flags = collect_red_flags(manual_flags_from_record(rec), intake.free_text, hits)
+    if red_flags:
+        intake = intake._replace(proceed_note=PROCEED_NOTE)
+    return intake, red_flags, hits
+
+
+def process_record(rec: dict, with_summary=False, profile_text="") -> dict:
+    intake, red_flags, hits = screen_record(rec)
+    out = {
+        "id": rec.get("id"),
+        "has_red_flag": bool(red_flags),
+        "red_flags": red_flags,
+        "red_flag_hits": [hit_dict(h) for h in hits],
+        "advice": cached_advise(intake),
+    }
+    if with_summary:
+        # 方針はシステムプロンプト側（全件共通）に入るので、ここでは可変部分とトークン数だけを出す
+        prompt = build_prompt(intake, detail=rec.get("detail") or 4, profile_text=profile_text)
+        out["summary"] = prompt.user
+        out["prompt_tokens"] = prompt.usage
+    return out
+
+
+# ---- ワーカー側（プロセスごとに1回だけ設定を受け取る）----
+_OPTS = {}
+
+
+def _init_worker(opts):
+    _OPTS.update(opts)
+
+
+def _process_chunk(chunk):
+    """(行番号, 記録) のリストを処理し、JSONL 文字列にして返す（JSON の読み書きもワーカー側で行う）"""
+    lines = []
+    for n, rec in chunk:
+        try:
+            if isinstance(rec, str):
+                rec = json.loads(rec)
+            if not isinstance(rec, dict):
+                raise ValueError("記録は JSON オブジェクトである必要があります")
+            res = process_record(rec, **_OPTS)
+        except Exception as e:
+            res = {"id": rec.get("id") if isinstance(rec, dict) else None, "error": f"{type(e).__name__}: {e}"}
+        res["line"] = n
+        lines.append(json.dumps(res, ensure_ascii=False) + "\n")
+    return "".join(lines)
+
+
+# ---- 入出力 ----
+def iter_records(path, fmt=None):
+    """(行番号, 記録) を順に返す。JSONL は未解析の行文字列、CSV は dict
+    fmt 省略時は拡張子で判定（- は標準入力の JSONL）"""
+    fmt = fmt or ("csv" if str(path).lower().endswith(".csv") else "jsonl")
+    f = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig") if str(path) == "-" \
+        else open(path, "r", encoding="utf-8-sig", newline="")
+    with f:
+        if fmt == "csv":
+            for n, row in enumerate(csv.DictReader(f), 2):
+                yield n, row
+        else:
+            for n, line in enumerate(f, 1):
+                if line.strip():
+                    yield n, line
+
+
+def iter_chunks(records, size):
+    it = iter(records)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run(records, out, workers=None, chunk_size=500, **opts) -> int:
+    """記録をプールで処理し、入力順に out へ JSONL を書く。書いた件数を返す"""
+    workers = workers or os.cpu_count() or 1
+    written = 0
+
+    def emit(text):
+        nonlocal written
+        out.write(text)
+        written += text.count("\n")
+
+    chunks = iter_chunks(records, chunk_size)
+    if workers <= 1:
+        _init_worker(opts)
+        for chunk in chunks:
+            emit(_process_chunk(chunk))
+        return written
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(opts,)) as pool:
+        for chunk in chunks:
+            pending.append(pool.submit(_process_chunk, chunk))
+            if len(pending) >= workers * 2:
+                emit(pending.popleft().result())
+        while pending:
+            emit(pending.popleft().result())
+    return written
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="相談記録（JSONL/CSV）にデモエンジンを一括適用し、JSONL で出力する")
+    ap.add_argument("input", help="入力ファイル（.jsonl / .csv、- で標準入力）")
+    ap.add_argument("-o", "--output", default="-", help="出力 JSONL（既定：標準出力）")
+    ap.add_argument("--format", choices=["jsonl", "csv"], help="入力形式（既定：拡張子で判定）")
+    ap.add_argument("--workers", type=int, default=None, help="プロセス数（既定：CPU数、1で単一プロセス）")
+    ap.add_argument("--chunk-size", type=int, default=500)
+    ap.add_argument("--summary", action="store_true", help="プロンプト用の要約も出力する")
+    ap.add_argument("--profile", type=Path, help="要約に含める方針ファイル（profile_masuda.md など）")
+    args = ap.parse_args(argv)
+
+    profile_text = args.profile.read_text(encoding="utf-8") if args.profile else ""
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        n = run(iter_records(args.input, args.format), out, workers=args.workers, chunk_size=args.chunk_size,
+                with_summary=args.summary, profile_text=profile_text)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{n} 件を出力しました", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+# デモ用アドバイスエンジン（ルール表をコンパイルして1パスで評価）
+# - ルール表（rules.RULES）のキーワードを1つのオートマトンにまとめ、入力欄ごとに1回だけ走査
+# - 一致したキーワード/部位から候補ルールを引き、表の順に適用（ルール数が増えても1回あたりのコストはほぼ一定）
+# - セルフケアの提案は成立したルールと入力を特徴量にしてカタログ全体を採点し、上位を選ぶ（painnavi.tips）
+
+from collections import defaultdict
+from functools import lru_cache
+from typing import NamedTuple
+
+from .matcher import KeywordMatcher
+from .rules import (
+    H_CAUSES, H_DIFFS, H_TIPS, H_AVOID, H_REFERRAL,
+    RULES, DEFAULT_CAUSES, DEFAULT_DIFFS, DEFAULT_AVOID,
+    PAD_POOL, BASE_TIPS, TIP_CATALOG, REFERRAL_NOTES,
+)
+from .tips import TipCatalog, rule_tips
+
+
+class Intake(NamedTuple):
+    """1件の相談入力（画面の選択肢/自由入力をそのまま保持）"""
+    part: str
+    ptype: str
+    intensity: str
+    onset: str
+    diurnal: str
+    factor: str
+    free_text: str = ""
+    proceed_note: str = ""
+
+
+# 照合する入力欄と、まとめて "text" として扱う欄（旧実装の txt_all と同じ並び）
+SCAN_FIELDS = ("part", "ptype", "intensity", "onset", "diurnal", "factor", "free_text")
+TEXT_FIELDS = ("part", "free_text", "factor", "diurnal", "ptype")
+CONDITION_FIELDS = set(SCAN_FIELDS) | {"text"}
+
+
+class AdviceEngine:
+    """ルール表を一度だけコンパイルし、相談入力からアドバイスを組み立てる"""
+
+    def __init__(self, rules=RULES, tips=TIP_CATALOG, pad=PAD_POOL, base=BASE_TIPS):
+        self.rules = list(rules)
+        index = {r["id"]: i for i, r in enumerate(self.rules)}
+        self._children = defaultdict(list)   # 親ルール -> 子ルール
+        self._by_part = defaultdict(list)    # 部位（完全一致） -> トップレベルのルール
+        self._by_word = defaultdict(list)    # (入力欄, キーワード) -> トップレベルのルール
+        self._always = []                    # 条件なしのトップレベルルール
+        words = []
+        for i, r in enumerate(self.rules):
+            cond = r.get("any", {})
+            unknown = set(cond) - CONDITION_FIELDS
+            if unknown:
+                raise ValueError(f"ルール {r['id']} の入力欄が不正です: {sorted(unknown)}")
+            for kws in cond.values():
+                words.extend(kws)
+            if r.get("parent"):
+                self._children[index[r["parent"]]].append(i)
+                continue
+            if not r.get("part") and not cond:
+                self._always.append(i)
+            for p in r.get("part", ()):
+                self._by_part[p].append(i)
+            for field, kws in cond.items():
+                for w in kws:
+                    self._by_word[(field, w)].append(i)
+        self.catalog = TipCatalog(rule_tips(self.rules) + list(tips), pad, base)
+        for field, w in self.catalog.keywords():
+            if field not in CONDITION_FIELDS:
+                raise ValueError(f"セルフケア項目の特徴量の入力欄が不正です: {field}~{w}")
+            words.append(w)
+        self._matcher = KeywordMatcher(words)
+        self._memo = {}                      # 選択肢の文字列 -> 照合結果（自由記載以外は種類が限られる）
+
+    def _scan_choice(self, value):
+        hit = self._memo.get(value)
+        if hit is None:
+            if len(self._memo) >= 4096:
+                self._memo.clear()
+            hit = self._memo[value] = frozenset(self._matcher.scan(value))
+        return hit
+
+    def _scan(self, intake):
+        hits = {f: self._scan_choice(getattr(intake, f)) for f in SCAN_FIELDS if f != "free_text"}
+        hits["free_text"] = self._matcher.scan(intake.free_text)
+        hits["text"] = hits["free_text"].union(*(hits[f] for f in TEXT_FIELDS if f != "free_text"))
+        return hits
+
+    def _matches(self, rule, intake, hits):
+        cond = rule.get("any", {})
+        if not rule.get("part") and not cond:
+            return True
+        if intake.part in rule.get("part", ()):
+            return True
+        return any(w in hits[f] for f, kws in cond.items() for w in kws)
+
+    def _fire(self, i, intake, hits, taken, acc):
+        rule = self.rules[i]
+        group = rule.get("group")
+        if group:
+            if group in taken:
+                return
+            taken.add(group)
+        for key in ("causes", "diffs"):
+            for x in rule.get(key, ()):
+                if x not in acc[key]:
+                    acc[key].append(x)
+        acc["rules"].append(rule["id"])            # 提案はカタログの採点で選ぶ
+        acc["avoid"].extend(rule.get("avoid", ()))  # 旧実装どおり重複は除かない
+        for c in self._children.get(i, ()):
+            if self._matches(self.rules[c], intake, hits):
+                self._fire(c, intake, hits, taken, acc)
+
+    def _collect(self, intake):
+        """(照合結果, 成立したルールで集めた項目)"""
+        hits = self._scan(intake)
+        cand = set(self._always)
+        cand.update(self._by_part.get(intake.part, ()))
+        for field, ws in hits.items():
+            for w in ws:
+                cand.update(self._by_word.get((field, w), ()))
+        acc = {"causes": [], "diffs": [], "avoid": [], "rules": []}
+        taken = set()
+        for i in sorted(cand):
+            self._fire(i, intake, hits, taken, acc)
+        return hits, acc
+
+    @staticmethod
+    def _sections(intake, acc, tips) -> dict:
+        return {
+            "causes": (acc["causes"] or list(DEFAULT_CAUSES))[:6],
+            "diffs": (acc["diffs"] or list(DEFAULT_DIFFS))[:6],
+            "tips": tips,
+            "avoid": (acc["avoid"] or list(DEFAULT_AVOID))[:5],
+            "referral": referral_notes(intake.proceed_note),
+        }
+
+    def evaluate(self, intake: Intake) -> dict:
+        """各セクションの項目リストを返す（tips は (優先度, 文) のリスト）"""
+        hits, acc = self._collect(intake)
+        tips = self.catalog.rank(self.catalog.encode(intake, hits, acc["rules"]))
+        return self._sections(intake, acc, tips)
+
+    def evaluate_many(self, intakes) -> list:
+        """複数の入力をまとめて評価（提案の採点は全件で1回）"""
+        intakes = list(intakes)
+        collected = [self._collect(x) for x in intakes]
+        features = [self.catalog.encode(x, hits, acc["rules"]) for x, (hits, acc) in zip(intakes, collected)]
+        ranked = self.catalog.rank_many(features)
+        return [self._sections(x, acc, tips) for x, (_, acc), tips in zip(intakes, collected, ranked)]
+
+    def advise(self, intake: Intake) -> str:
+        return render(self.evaluate(intake))
+
+    def advise_many(self, intakes) -> list:
+        return [render(r) for r in self.evaluate_many(intakes)]
+
+
+def referral_notes(proceed_note: str = "") -> list:
+    note = list(REFERRAL_NOTES)
+    if "受診" in (proceed_note or ""):
+        note.insert(0, proceed_note.strip("（）"))
+    return note
+
+
+def _tip_md(i, pr, text) -> str:
+    """番号付きの1項目。優先度（★）は1行目の末尾に付ける（優先度の無い項目は付けない）"""
+    head, sep, rest = text.partition("\n")
+    return f"{i}. {head}" + (f"（優先度{'★'*pr}）" if pr else "") + sep + rest
+
+
+def render(result: dict) -> str:
+    tips_md = "\n".join(_tip_md(i, pr, t) for i, (pr, t) in enumerate(result["tips"], 1))
+    preamble = result.get("preamble")
+    return (
+        (f"{preamble}\n\n" if preamble else "") +
+        f"{H_CAUSES}\n- " + "\n- ".join(result["causes"]) + "\n\n"
+        f"{H_DIFFS}\n- " + "\n- ".join(result["diffs"]) + "\n\n"
+        f"{H_TIPS}\n" + tips_md + "\n\n"
+        f"{H_AVOID}\n- " + "\n- ".join(result["avoid"]) + "\n\n"
+        f"{H_REFERRAL}\n- " + "\n- ".join(result["referral"]) + "\n"
+    )
+
+
+@lru_cache(maxsize=None)
+def default_engine() -> AdviceEngine:
+    """プロセスごとに1回だけコンパイルする既定エンジン"""
+    return AdviceEngine(RULES)
+
+
+def advise(intake: Intake) -> str:
+    return default_engine().advise(intake)
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+# 過去の相談の検索（「過去ログを取り込む」で、いまの入力に似た相談を上位 N 件返す）
+# - 全ログファイルを1回だけ読み、同じ (部位, タイプ, 因子, 出力の要旨) の相談を1つのまとまりにする（件数・最新の1件を保持）
+# - 索引：(部位, タイプ, 因子)・(部位, タイプ)・(部位, 因子)・部位 → まとまり（更新の新しい順）、
+#   出力の要旨（原因・提案・避ける動き）の文字 n-gram → 要旨の番号
+# - 検索は候補（一致の強いキーから最大 CANDIDATES 件＋自由記載と n-gram が合う要旨）だけを採点する＝ログの件数によらない
+# - 追記は PainLog からの通知でその場で索引に足す。他のプロセスの追記は REFRESH_INTERVAL 秒ごとに stat して差分だけ読む
+# - 索引（まとまりと各ファイルの読み終えた位置）は .cache/history/ に保存。次のプロセスは増えた分の CSV だけ読む
+#   保存は検索の外（裏のスレッドで SAVE_INTERVAL 秒に1回まで＋終了時）。数十万件の JSON を書く間も検索は待たない
+
+import atexit
+import csv
+import heapq
+import itertools
+import json
+import math
+import operator
+import os
+import threading
+import time
+from pathlib import Path
+
+from .painlog import LOG_DIR, _read_header, _unescape, default_log, log_files
+from .resources import content_key, file_signature
+from .retrieval import grams
+
+TEXT_SECTIONS = ["causes", "tips", "avoid"]     # n-gram の対象（受診の目安は定型文が多いので除く）
+ROW_SECTIONS = ["causes", "diffs", "tips", "avoid", "referral", "advice"]
+GROUP_FIELDS = ["part", "type", "factor"] + ROW_SECTIONS
+CANDIDATES = 64             # キーごとに採点する最大のまとまり数
+RARE_GRAMS = 8              # 自由記載から候補を足すときに使う n-gram の数（出現の少ない順）
+CACHE_DIR = Path(".cache") / "history"
+FORMAT = 1
+REFRESH_INTERVAL = 2.0      # 他のプロセスの追記を確かめる間隔（秒）
+SAVE_INTERVAL = 30.0        # 索引を保存する最短の間隔（秒）
+# 採点の重み（部位は一致が前提）
+W_TYPE, W_FACTOR, W_TEXT, W_INTENSITY, W_ONSET, W_RECENT = 3.0, 2.0, 2.0, 0.5, 0.5, 0.25
+
+
+def _group_lines(header, lines) -> list:
+    """(部位, タイプ, 因子, 出力) が同じ行をまとめる：[件数, 最後の行番号, 最後の行] を行番号の順に"""
+    width = len(header)
+    key_of = operator.itemgetter(*[header.index(k) if k in header else width for k in GROUP_FIELDS])
+    groups = {}
+    for i, row in enumerate(csv.reader(lines)):
+        if not row:
+            continue
+        try:
+            key = key_of(row)
+        except IndexError:      # 列の足りない行・列の無い旧形式
+            row = (row + [""] * (width + 1))[:width + 1]
+            key = key_of(row)
+        g = groups.get(key)
+        if g is None:
+            groups[key] = [1, i, row]
+        else:
+            g[0] += 1
+            g[1], g[2] = i, row
+    return [[count, last, {k: _unescape(v) for k, v in zip(header, row)}]
+            for count, last, row in sorted(groups.values(), key=lambda g: g[1])]
+
+
+class HistoryIndex:
+    """相談ログ全体の検索用索引（プロセスに1つ。スレッドから共有してよい）"""
+
+    def __init__(self, log_dir=LOG_DIR, cache_dir=CACHE_DIR, refresh_interval=REFRESH_INTERVAL,
+                 save_interval=SAVE_INTERVAL):
+        self.log_dir = Path(log_dir)
+        self.cache_dir = Path(cache_dir)
+        self.refresh_interval = refresh_interval
+        self.save_interval = save_interval
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()  # ファイルへの書き込みの直列化（索引のロックとは別）
+        self._dirty = False     # 保存していない変更がある
+        self._saver = None      # 保存待ちのスレッド
+        self._saved_at = 0.0
+        self._checked = 0.0
+        self._loaded = False
+        self.rebuilds = 0
+        self.snapshot_loaded = False
+        self._reset()
+
+    def _reset(self):
+        self._files = {}        # path -> [読み終えた位置, ヘッダ, signature]
+        self.rows = 0           # 読み込んだ相談の数（新しさの採点に使う通し番号）
+        self._buckets = {}      # (部位, タイプ, 因子, 要旨の番号) -> まとまりの番号
+        self._bucket = []       # まとまりの番号 -> [キー, 件数, 最後の通し番号, 最新の行]
+        self._by_key = {}       # (部位, タイプ|None, 因子|None) -> {まとまりの番号: None}（更新の古い順）
+        self._texts = {}        # 要旨 -> 要旨の番号
+        self._text_grams = []   # 要旨の番号 -> frozenset(n-gram)
+        self._text_buckets = [] # 要旨の番号 -> [まとまりの番号]
+        self._postings = {}     # n-gram -> [要旨の番号]
+
+    # ---- 読み込み ----
+    def refresh(self, force=False):
+        """ログファイルの増えた分を読む（間隔内なら何もしない）。縮んだ・消えたファイルがあれば作り直す"""
+        now = time.monotonic()
+        if not force and self._loaded and now - self._checked < self.refresh_interval:
+            return
+        with self._lock:
+            self._checked = now
+            paths = log_files(self.log_dir)
+            sigs = {p: file_signature(p) for p in paths}
+            if not self._loaded:
+                self._loaded = True
+                self._load_snapshot(sigs)
+            if any(sigs.get(p) is None or sigs[p][1] < st[0] for p, st in self._files.items()):
+                self._reset()
+                self.rebuilds += 1
+            dirty = False
+            for path in paths:
+                state = self._files.get(path)
+                if state is None or state[2] != sigs[path]:
+                    self._read(path, state, sigs[path])
+                    dirty = True
+            if dirty:
+                self._schedule_save()
+
+    def _read(self, path, state, sig):
+        with open(path, "rb") as f:
+            if state is None:
+                header = _read_header(f)
+                start = f.tell()
+            else:
+                start, header = state[0], state[1]
+            f.seek(start)
+            data = f.read()
+        end = data.rfind(b"\n") + 1         # 書き込み途中の行は次回
+        lines = data[:end].decode("utf-8", errors="replace").split("\n")[:-1]
+        base = self.rows
+        for count, last, row in _group_lines(header, lines):
+            self._add(row, count, base + last)
+        self.rows = base + len(lines)
+        self._files[path] = [start + end, header, sig if end == len(data) else None]
+
+    # ---- 索引の保存（.cache/history/）：次のプロセスは読み終えた位置より後ろだけ読む ----
+    def _snapshot_path(self) -> Path:
+        # ログの置き場所ごとに分ける
+        return self.cache_dir / f"{content_key(str(self.log_dir.resolve()).encode('utf-8'))[:10]}.json"
+
+    def _load_snapshot(self, sigs):
+        try:
+            snap = json.loads(self._snapshot_path().read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if snap.get("format") != FORMAT:
+            return
+        files = {self.log_dir / name: st for name, st in snap["files"].items()}
+        if any(sigs.get(p) is None or sigs[p][1] < st[0] for p, st in files.items()):
+            return      # 消えた・縮んだファイルがある → 全部読み直す
+        for count, seq, row in snap["groups"]:
+            self._add(row, count, seq)
+        self.rows = snap["rows"]
+        self._files = {p: [pos, header, tuple(sig) if sig else None] for p, (pos, header, sig) in files.items()}
+        self.snapshot_loaded = True
+
+    def _schedule_save(self):
+        """変更を保存待ちにする（索引のロックを持って呼ぶ）。保存は裏のスレッドで間隔をあけて"""
+        self._dirty = True
+        if self._saver is None:
+            self._saver = threading.Thread(target=self._save_loop, name="history-snapshot", daemon=True)
+            self._saver.start()
+
+    def _save_loop(self):
+        while True:
+            time.sleep(max(0.0, self.save_interval - (time.monotonic() - self._saved_at)))
+            with self._lock:
+                if not self._dirty:
+                    self._saver = None
+                    return
+            self.save_snapshot()
+
+    def save_snapshot(self):
+        """保存待ちの変更があれば今すぐ保存する（終了時にも呼ばれる）"""
+        with self._save_lock:
+            with self._lock:    # 中身の写しだけをロック内で作り、JSON にして書くのは外で
+                if not self._dirty:
+                    return
+                self._dirty = False
+                snap = {"format": FORMAT, "rows": self.rows,
+                        "files": {p.name: list(st) for p, st in self._files.items()},
+                        "groups": [[count, seq, row] for _, count, seq, row in sorted(self._bucket, key=lambda b: b[2])]}
+            out = self._snapshot_path()
+            try:
+                out.parent.mkdir(parents=True, exist_ok=True)
+                tmp = out.with_name(f"{out.name}.{os.getpid()}.tmp")
+                tmp.write_text(json.dumps(snap, ensure_ascii=False), encoding="utf-8")
+                os.replace(tmp, out)
+            except OSError:
+                pass    # 保存できなくても検索には影響しない
+            self._saved_at = time.monotonic()
+
+    def on_append(self, path, rows, start, end):
+        """PainLog の書き込み通知（start はファイルを新しく作ったとき 0）。読み終えた位置の続きなら索引に足す"""
+        with self._lock:
+            if not self._loaded:
+                return      # 最初の検索でまとめて読む
+            path = Path(path)
+            state = self._files.get(path)
+            if state is None and start == 0:
+                state = self._files[path] = [0, None, None]
+            if state is None or state[0] != start or not (state[1] or start == 0):
+                return      # 間が空いている → 次の refresh で読む
+            for row in rows:
+                self._add({k: str(v) for k, v in row.items()}, 1, self.rows)
+                self.rows += 1
+            if state[1] is None:
+                with open(path, "rb") as f:
+                    state[1] = _read_header(f)
+            state[0], state[2] = end, file_signature(path)
+
+    def _add(self, row, count, seq):
+        text = "\x1f".join(row.get(k, "") for k in ROW_SECTIONS)
+        tid = self._texts.get(text)
+        if tid is None:
+            tid = self._texts[text] = len(self._text_grams)
+            gs = frozenset(grams(" ".join(row.get(k, "") for k in TEXT_SECTIONS) or row.get("advice", "")))
+            self._text_grams.append(gs)
+            self._text_buckets.append([])
+            for g in gs:
+                self._postings.setdefault(g, []).append(tid)
+        part, ptype, factor = row.get("part", ""), row.get("type", ""), row.get("factor", "")
+        key = (part, ptype, factor, tid)
+        b = self._buckets.get(key)
+        if b is None:
+            b = self._buckets[key] = len(self._bucket)
+            self._bucket.append([key, 0, 0, None])
+            self._text_buckets[tid].append(b)
+        entry = self._bucket[b]
+        entry[1] += count
+        entry[2] = seq
+        entry[3] = row
+        for k in ((part, ptype, factor), (part, ptype, None), (part, None, factor), (part, None, None)):
+            d = self._by_key.setdefault(k, {})
+            d.pop(b, None)
+            d[b] = None     # 末尾＝最近
+
+    # ---- 検索 ----
+    def search(self, part, ptype="", factor="", free_text="", n=3, intensity="", onset="") -> list:
+        """いまの入力に似た過去の相談を最大 n 件、関連の低い順に返す（各行に count＝同じ内容の相談の数）"""
+        self.refresh()
+        with self._lock:
+            cands = {}
+            for k in ((part, ptype, factor), (part, ptype, None), (part, None, factor), (part, None, None)):
+                cands.update(dict.fromkeys(itertools.islice(reversed(self._by_key.get(k, {})), CANDIDATES)))
+            q = {g for g in set(grams(free_text)) if g in self._postings} if free_text else set()
+            if q:
+                n_texts = len(self._text_grams)
+                idf = {g: math.log(1 + n_texts / len(self._postings[g])) for g in q}
+                q_norm = sum(idf.values())
+                for g in sorted(q, key=lambda g: len(self._postings[g]))[:RARE_GRAMS]:
+                    for tid in itertools.islice(self._postings[g], CANDIDATES):
+                        cands.update(dict.fromkeys(b for b in self._text_buckets[tid] if self._bucket[b][0][0] == part))
+            total = max(1, self.rows)
+            sims = {}       # 要旨の番号 -> 自由記載との近さ（同じ要旨のまとまりは多い）
+            scored = []
+            for b in cands:
+                (_, btype, bfactor, tid), count, last, row = self._bucket[b]
+                s = W_TYPE * (btype == ptype) + W_FACTOR * (bfactor == factor) + W_RECENT * last / total
+                s += W_INTENSITY * (row.get("intensity") == intensity) + W_ONSET * (row.get("onset") == onset)
+                if q:
+                    sim = sims.get(tid)
+                    if sim is None:
+                        sim = sims[tid] = sum(idf[g] for g in q & self._text_grams[tid]) / q_norm
+                    s += W_TEXT * sim
+                scored.append((s, last, b))
+            top = heapq.nlargest(n, scored)
+            return [{**self._bucket[b][3], "count": self._bucket[b][1], "score": round(s, 3)}
+                    for s, _, b in reversed(top)]
+
+    def stats(self) -> dict:
+        return {"rows": self.rows, "groups": len(self._bucket), "texts": len(self._text_grams),
+                "ngrams": len(self._postings), "files": len(self._files), "rebuilds": self.rebuilds,
+                "snapshot_loaded": self.snapshot_loaded}
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_history(log_dir=LOG_DIR) -> HistoryIndex:
+    """プロセスで共有する索引（既定のログの書き込みを通知で受け取る）"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = HistoryIndex(log_dir)
+            default_log(log_dir).listeners.append(_default.on_append)
+            atexit.register(_default.save_snapshot)
+        return _default
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# LLM 呼び出し（OpenAI 互換 API）
+# - クライアントはプロセスごとに1つ（接続を再利用）。タイムアウトと再試行回数を明示
+# - 応答はトークン単位でストリーミングし、最後まで届いたらディスクに保存
+#   （相談内容を含むので期限 CACHE_TTL と件数の上限 CACHE_MAX_ENTRIES つき。超えたら古い順に消す）
+# - キャッシュキーは (システムプロンプト, 利用者の要約, モデル) のハッシュ → 同じ質問は即時に返す
+# - usage に dict を渡すとトークン数を書き込む（API が返さなければ文字数からの概算）
+
+import hashlib
+import json
+import contextlib
+import os
+import threading
+import time
+from pathlib import Path
+
+from .resources import openai_class
+from .tokens import estimate_tokens
+
+CACHE_DIR = Path(".cache") / "llm"
+DEFAULT_TIMEOUT = 60.0      # 応答全体（ストリーミング中は各読み取り）
+CONNECT_TIMEOUT = 5.0
+MAX_RETRIES = 2
+CACHE_TTL = 7 * 24 * 3600   # 応答を使い回す期間（秒）
+CACHE_MAX_ENTRIES = 2000
+PRUNE_TO = 0.9              # 上限を超えたら、この割合まで古い順に消す
+
+
+def make_client(api_key: str, base_url: str = "", timeout=DEFAULT_TIMEOUT, connect_timeout=CONNECT_TIMEOUT,
+                max_retries=MAX_RETRIES):
+    OpenAI = openai_class()
+    if OpenAI is None:
+        raise RuntimeError("openai ライブラリが必要です。`python3 -m pip install openai`")
+    import openai
+    to = openai.Timeout(timeout, connect=connect_timeout) if hasattr(openai, "Timeout") else timeout
+    return OpenAI(api_key=api_key, base_url=base_url or None, timeout=to, max_retries=max_retries)
+
+
+def cache_key(system: str, user: str, model: str) -> str:
+    data = json.dumps([system, user, model], ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """応答のディスクキャッシュ（1キー1ファイル、書き込みは一時ファイル→置換。期限切れ・件数超過は消す）"""
+
+    def __init__(self, root=CACHE_DIR, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.root = Path(root)
+        self.ttl = ttl          # 秒。None なら期限なし
+        self.max_entries = max_entries  # None なら上限なし
+        self.hits = self.misses = 0
+        self._count = None      # おおよその件数（最初の put でフォルダを数える）
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str):
+        p = self._path(key)
+        try:
+            data = json.loads(p.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = None
+        if data is not None and self.ttl is not None and time.time() - data.get("created", 0) > self.ttl:
+            with contextlib.suppress(OSError):
+                p.unlink()
+            data = None
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data.get("text")
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def put(self, key: str, text: str, **meta):
+        p = self._path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        new = not p.exists()
+        tmp = p.with_name(f"{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps({"created": time.time(), "text": text, **meta}, ensure_ascii=False),
+                       encoding="utf-8")
+        os.replace(tmp, p)
+        with self._lock:
+            if self._count is None:
+                self._count = sum(1 for _ in self.root.glob("*/*.json"))
+            elif new:
+                self._count += 1
+            if self.max_entries is not None and self._count > self.max_entries:
+                self.prune()
+
+    def prune(self) -> int:
+        """期限切れを消し、まだ上限を超えていれば古い順に上限の PRUNE_TO まで消す。消した件数を返す"""
+        now, files = time.time(), []
+        for p in self.root.glob("*/*.json"):
+            with contextlib.suppress(OSError):
+                files.append((p.stat().st_mtime, p))    # 1回だけ書くので mtime ＝ 作成時刻
+        files.sort()
+        keep = int(self.max_entries * PRUNE_TO) if self.max_entries is not None else len(files)
+        removed = 0
+        for mtime, p in files:
+            expired = self.ttl is not None and now - mtime > self.ttl
+            if not expired and len(files) - removed <= keep:
+                break
+            with contextlib.suppress(OSError):
+                p.unlink()
+            removed += 1
+        self._count = len(files) - removed
+        return removed
+
+
+def stream_chat(client, system: str, user: str, model: str, temperature=0.6, cache=None, usage=None):
+    """応答テキストを届いた分から順に返すジェネレータ（キャッシュにあれば全文を1回で返す）"""
+    key = cache_key(system, user, model)
+    if cache is not None:
+        hit = cache.get(key)
+        if hit is not None:
+            if usage is not None:
+                usage.update(prompt_tokens=0, completion_tokens=0, cached=True, estimated=False)
+            yield hit
+            return
+    t0 = time.perf_counter()
+    stream = client.chat.completions.create(
+        model=model,
+        messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
+        temperature=temperature,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    parts, reported = [], None
+    for chunk in stream:
+        if getattr(chunk, "usage", None):
+            reported = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            if usage is not None and not parts:
+                usage["first_token_s"] = time.perf_counter() - t0
+            parts.append(delta)
+            yield delta
+    text = "".join(parts).strip()
+    if usage is not None:
+        if reported is not None:
+            usage.update(prompt_tokens=reported.prompt_tokens, completion_tokens=reported.completion_tokens,
+                         estimated=False)
+        else:
+            usage.update(prompt_tokens=estimate_tokens(system) + estimate_tokens(user),
+                         completion_tokens=estimate_tokens(text), estimated=True)
+        usage["cached"] = False
+    if cache is not None and text:
+        cache.put(key, text, model=model)
+
+
+def complete(client, system: str, user: str, model: str, temperature=0.6, cache=None, usage=None) -> str:
+    return "".join(stream_chat(client, system, user, model, temperature, cache, usage)).strip()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# 複数キーワードの一括照合（Aho-Corasick）
+# - 語数が増えても走査は入力長に比例（1回の走査で全キーワードを拾う）
+
+from collections import deque
+
+
+class KeywordMatcher:
+    """キーワード集合をオートマトンに一度だけコンパイルし、テキストを1パスで照合する"""
+
+    def __init__(self, words):
+        self._goto = [{}]      # 状態ごとの遷移（文字 -> 状態）
+        self._fail = [0]
+        self._out = [()]       # 状態ごとの一致キーワード
+        for w in dict.fromkeys(w for w in words if w):
+            self._add(w)
+        self._build()
+
+    def _add(self, word):
+        s = 0
+        for ch in word:
+            nxt = self._goto[s].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[s][ch] = nxt
+                self._goto.append({}); self._fail.append(0); self._out.append(())
+            s = nxt
+        self._out[s] = self._out[s] + (word,)
+
+    def _build(self):
+        q = deque(self._goto[0].values())
+        while q:
+            s = q.popleft()
+            for ch, nxt in self._goto[s].items():
+                q.append(nxt)
+                f = self._fail[s]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                f = self._goto[f].get(ch, 0)
+                self._fail[nxt] = f if f != nxt else 0
+                if self._out[self._fail[nxt]]:
+                    self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        # 失敗遷移を畳み込んだ遷移表（根以外へ向かう遷移だけ保持）→ 1文字1回の辞書引きで済む
+        self._delta = [None] * len(self._goto)
+        self._delta[0] = dict(self._goto[0])
+        q = deque(self._goto[0].values())
+        while q:
+            s = q.popleft()
+            d = dict(self._delta[self._fail[s]])
+            d.update(self._goto[s])
+            self._delta[s] = d
+            q.extend(self._goto[s].values())
+
+    def scan(self, text: str) -> set:
+        """text に含まれるキーワードの集合を返す"""
+        delta, out = self._delta, self._out
+        hits, s = set(), 0
+        for ch in text or "":
+            s = delta[s].get(ch, 0)
+            if out[s]:
+                hits.update(out[s])
+        return hits
+
+    def __len__(self):
+        return len(self._goto)
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+# 処理段階ごとの所要時間の計測（再実行・添付デコード・方針読込・履歴・赤旗・アドバイス/LLM・見出し整形）
+# - 計測が無効なら span() は共有の空コンテキストを返すだけ（時刻も取らない）
+# - 段階ごとにヒストグラム（Prometheus 形式のバケット）と直近の値（パーセンタイル用）を持つ
+# - 再実行1回ぶんの区間は Trace にまとめ、JSON Lines に1行追記。Prometheus のテキストファイルも定期的に書き出す
+# 有効化：環境変数 PAINNAVI_METRICS=1（画面のデバッグパネルを開いたセッションはその間だけ計測）
+
+import atexit
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+
+METRICS_DIR = Path("logs") / "metrics"
+SPANS_FILE = "spans.jsonl"
+PROM_FILE = "painnavi.prom"
+PREFIX = "painnavi"
+# 秒。再実行（数十 ms）から LLM 応答（数十秒）までを覆う
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RESERVOIR = 1024            # パーセンタイル計算に使う直近の観測数
+PROM_INTERVAL = 5.0         # Prometheus ファイルを書き直す最短間隔（秒）
+
+_NULL = contextlib.nullcontext()
+
+
+class Histogram:
+    """累積バケット・合計・件数と、直近 RESERVOIR 件の値"""
+
+    def __init__(self, buckets=BUCKETS, reservoir=RESERVOIR):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # 最後は +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=reservoir)
+
+    def observe(self, v: float):
+        self.counts[bisect.bisect_left(self.buckets, v)] += 1
+        self.sum += v
+        self.count += 1
+        self.recent.append(v)
+
+    def percentiles(self, qs=(0.5, 0.95, 0.99)) -> dict:
+        vals = sorted(self.recent)
+        if not vals:
+            return {}
+        return {f"p{int(q * 100)}": vals[min(len(vals) - 1, int(q * len(vals)))] for q in qs}
+
+
+class _Span:
+    __slots__ = ("trace", "name", "t0")
+
+    def __init__(self, trace, name):
+        self.trace, self.name = trace, name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.record(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+class Trace:
+    """再実行1回ぶんの区間の記録（enabled=False なら何もしない）"""
+
+    def __init__(self, metrics, enabled: bool):
+        self.metrics = metrics
+        self.enabled = enabled
+        self.spans = []         # (段階, 秒)
+        self.extra = {}
+        self.t0 = time.perf_counter() if enabled else 0.0
+        self.done = False
+
+    def span(self, name: str):
+        return _Span(self, name) if self.enabled else _NULL
+
+    def record(self, name: str, seconds: float):
+        if self.enabled:
+            self.spans.append((name, seconds))
+            self.metrics.observe(name, seconds)
+
+    def note(self, **kw):
+        """トークン数などを記録（JSON Lines の行に入る）"""
+        if self.enabled:
+            self.extra.update(kw)
+
+    def finish(self, stage="rerun"):
+        """再実行の終わりに1回（st.stop() の前にも呼ぶ）。2回目以降は何もしない"""
+        if not self.enabled or self.done:
+            return
+        self.done = True
+        total = time.perf_counter() - self.t0
+        self.spans.append((stage, total))
+        self.metrics.observe(stage, total)
+        self.metrics.inc("reruns")
+        self.metrics.emit({"ts": time.time(), "spans": {n: round(s * 1000, 3) for n, s in self.spans},
+                           **self.extra})
+
+
+class Metrics:
+    """プロセスで共有する計測値（段階ごとのヒストグラム・カウンタ・キャッシュのヒット率）"""
+
+    def __init__(self, enabled=False, out_dir=METRICS_DIR, prom_interval=PROM_INTERVAL):
+        self.enabled = enabled
+        self.out_dir = Path(out_dir) if out_dir else None
+        self.prom_interval = prom_interval
+        self.stages = {}
+        self.counters = {}
+        self.ratios = {}        # 名前 -> ヒット率を返す関数
+        self.gauges = {}        # 名前 -> 現在値を返す関数（待ち行列の長さなど）
+        self._lock = threading.Lock()
+        self._last_prom = 0.0
+
+    # ---- 記録 ----
+    def trace(self, force=False) -> Trace:
+        return Trace(self, self.enabled or force)
+
+    def span(self, name: str, force=False):
+        """単発の計測（Trace を持たない処理用）"""
+        return _Span(self, name) if (self.enabled or force) else _NULL
+
+    def record(self, name: str, seconds: float):
+        self.observe(name, seconds)
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            h = self.stages.get(stage)
+            if h is None:
+                h = self.stages[stage] = Histogram()
+            h.observe(seconds)
+
+    def inc(self, name: str, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def ratio(self, name: str, fn):
+        """キャッシュのヒット率などを返す関数を登録（書き出し時に呼ぶ）"""
+        self.ratios[name] = fn
+
+    def gauge(self, name: str, fn):
+        """待ち行列の長さなど、その時点の値を返す関数を登録（書き出し時に呼ぶ）"""
+        self.gauges[name] = fn
+
+    # ---- 参照・書き出し ----
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = {name: {"count": h.count, "mean_ms": h.sum / h.count * 1000 if h.count else 0.0,
+                             **{k: v * 1000 for k, v in h.percentiles().items()}}
+                      for name, h in self.stages.items()}
+            counters = dict(self.counters)
+        return {"stages": stages, "counters": counters, "ratios": self._read(self.ratios),
+                "gauges": self._read(self.gauges)}
+
+    @staticmethod
+    def _read(fns) -> dict:
+        out = {}
+        for name, fn in list(fns.items()):
+            try:
+                out[name] = float(fn())
+            except Exception:
+                continue
+        return out
+
+    def prometheus(self) -> str:
+        lines = [f"# HELP {PREFIX}_stage_seconds 処理段階ごとの所要時間",
+                 f"# TYPE {PREFIX}_stage_seconds histogram"]
+        with self._lock:
+            for stage, h in sorted(self.stages.items()):
+                acc = 0
+                for le, c in zip(list(h.buckets) + ["+Inf"], h.counts):
+                    acc += c
+                    lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {acc}')
+                lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {h.sum:.6f}')
+                lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {h.count}')
+            counters = sorted(self.counters.items())
+        for name, v in counters:
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {v}")
+        ratios = self._read(self.ratios)
+        if ratios:
+            lines.append(f"# TYPE {PREFIX}_cache_hit_ratio gauge")
+            lines += [f'{PREFIX}_cache_hit_ratio{{cache="{k}"}} {v:.6f}' for k, v in sorted(ratios.items())]
+        for name, v in sorted(self._read(self.gauges).items()):
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {v:g}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=None):
+        path = Path(path) if path else self.out_dir / PROM_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(self.prometheus(), encoding="utf-8")
+        os.replace(tmp, path)   # 収集側が書きかけを読まないように置換
+
+    def emit(self, record: dict):
+        """JSON Lines に1行追記し、間隔が空いていれば Prometheus ファイルも更新"""
+        if self.out_dir is None:
+            return
+        try:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            with self._lock:
+                with open(self.out_dir / SPANS_FILE, "a", encoding="utf-8") as f:
+                    f.write(line)
+                due = time.monotonic() - self._last_prom >= self.prom_interval
+                if due:
+                    self._last_prom = time.monotonic()
+            if due:
+                self.write_prometheus()
+        except OSError:
+            pass    # 計測の失敗で画面を止めない
+
+
+@lru_cache(maxsize=None)
+def default_metrics() -> Metrics:
+    """プロセスごとに1つ（PAINNAVI_METRICS=1 で常時有効、PAINNAVI_METRICS_DIR で出力先を変更）"""
+    m = Metrics(enabled=os.environ.get("PAINNAVI_METRICS", "0") not in ("", "0"),
+                out_dir=os.environ.get("PAINNAVI_METRICS_DIR") or METRICS_DIR)
+
+    def final():
+        if m.stages:
+            with contextlib.suppress(OSError):
+                m.write_prometheus()
+    atexit.register(final)
+    return m
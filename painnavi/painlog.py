@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+# 相談ログ（logs/painlog_*.csv）の書き込みと読み出し
+# - 追記専用：バッファしてまとめて書く（ロックで保護）。日付が変わるか上限サイズを超えたら次のファイルへ
+# - 書き出しはフォルダ単位の助言ロック（logs/.painlog.lock）の中で行う → 複数プロセスが同時に追記しても行が混ざらない
+# - 1レコード＝1行（値の改行は \n にエスケープ）→ 末尾から逆向きに読むだけで直近N件が取れる
+# - 索引（painlog_*.csv.idx：行の先頭位置と部位）があれば、部位ごとの検索で CSV 全体を読まない
+# - 書き込みは listeners に通知（painnavi.history の検索索引がファイルを読み直さずに更新される）
+# ファイル名：painlog_YYYYMMDD.csv → 上限超過で painlog_YYYYMMDD_01.csv, _02 …（名前順＝時系列順）
+
+import atexit
+import csv
+import datetime as dt
+import io
+import itertools
+import os
+import re
+import threading
+from pathlib import Path
+
+from .shared import file_lock
+
+LOG_DIR = Path("logs")
+# 出力は全文ではなくセクションごとの短い表現で持つ（sections.compact）。旧形式の advice 列も読める
+LOG_FIELDS = ["timestamp", "part", "type", "intensity", "onset", "diurnal", "factor", "red_flags",
+              "causes", "diffs", "tips", "avoid", "referral"]
+NAME_RE = re.compile(r"^painlog_(\d{8})(?:_(\d+))?\.csv$")
+INDEX_SUFFIX = ".idx"
+LOCK_NAME = ".painlog"       # logs/.painlog.lock
+
+_UNESCAPE = {"n": "\n", "r": "\r", "\\": "\\"}
+
+
+def _escape(v) -> str:
+    return str("" if v is None else v).replace("\\", "\\\\").replace("\r", "\\r").replace("\n", "\\n")
+
+
+def _unescape(v: str) -> str:
+    if "\\" not in v:
+        return v
+    return re.sub(r"\\(.)", lambda m: _UNESCAPE.get(m.group(1), m.group(0)), v)
+
+
+def log_files(log_dir=LOG_DIR) -> list:
+    """ログファイルを古い順に返す"""
+    return sorted(p for p in Path(log_dir).glob("painlog_*.csv") if NAME_RE.match(p.name))
+
+
+def _index_path(path: Path) -> Path:
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+# ================= 読み出し =================
+def _read_header(f) -> list:
+    f.seek(0)
+    line = f.readline().decode("utf-8-sig").rstrip("\r\n")
+    return next(csv.reader([line]), [])
+
+
+def _parse(header, lines) -> list:
+    return [{k: _unescape(v) for k, v in zip(header, row)} for row in csv.reader(lines)]
+
+
+def tail_records(path, n: int, block: int = 8192) -> list:
+    """ファイル末尾から逆向きに読み、直近 n 件を古い順に返す（読む量は n に比例）"""
+    if n <= 0:
+        return []
+    with open(path, "rb") as f:
+        header = _read_header(f)
+        start = f.tell()
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        buf = b""
+        while pos > start and buf.count(b"\n") <= n:
+            step = min(block, pos - start)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+    if not buf.endswith(b"\n"):
+        buf = buf[:buf.rfind(b"\n") + 1]    # 書き込み途中の行は読まない
+    lines = buf.decode("utf-8", errors="replace").split("\n")[:-1]
+    if pos > start:
+        lines = lines[1:]                   # 途中から読んだ先頭行は捨てる
+    return _parse(header, lines[-n:])
+
+
+def build_index(path) -> list:
+    """CSV を1回読んで (行の先頭位置, 部位) の索引を作り直し、索引ファイルに保存する"""
+    entries = []
+    with open(path, "rb") as f:
+        header = _read_header(f)
+        col = header.index("part") if "part" in header else None
+        while True:
+            off = f.tell()
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                break
+            row = next(csv.reader([line.decode("utf-8", errors="replace")]), [])
+            part = _unescape(row[col]) if col is not None and col < len(row) else ""
+            entries.append((off, part))
+    _write_index(_index_path(Path(path)), entries, mode="w")
+    return entries
+
+
+def _write_index(idx_path, entries, mode="a"):
+    with open(idx_path, mode, encoding="utf-8", newline="") as f:
+        f.write("".join(f"{off}\t{_escape(part)}\n" for off, part in entries))
+
+
+def read_index(path) -> list:
+    """索引を返す（無い・CSV より古い場合は作り直す）"""
+    path = Path(path)
+    idx = _index_path(path)
+    try:
+        if idx.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+            with open(idx, "r", encoding="utf-8") as f:
+                return [(int(off), _unescape(part)) for off, part in (l.rstrip("\n").split("\t", 1) for l in f)]
+    except (OSError, ValueError):
+        pass
+    return build_index(path)
+
+
+def read_at(path, offsets) -> list:
+    """索引の位置からレコードを読む"""
+    with open(path, "rb") as f:
+        header = _read_header(f)
+        lines = []
+        for off in offsets:
+            f.seek(off)
+            lines.append(f.readline().decode("utf-8", errors="replace").rstrip("\n"))
+    return _parse(header, lines)
+
+
+# ================= 書き込み =================
+class PainLog:
+    """追記専用の相談ログ。append はバッファに積み、buffer_size 件ごと（または flush/終了時）に書く"""
+
+    def __init__(self, log_dir=LOG_DIR, max_bytes=5_000_000, buffer_size=16, index=True,
+                 clock=dt.datetime.now):
+        self.log_dir = Path(log_dir)
+        self.max_bytes = max_bytes
+        self.buffer_size = buffer_size
+        self.index = index
+        self.clock = clock
+        self._buf = []
+        self._lock = threading.Lock()
+        self._path = None
+        self._idx_cache = {}    # path -> (索引の mtime, {部位: [位置]})
+        self.listeners = []     # 書き込みの通知先 fn(path, rows, 開始位置（新規ファイルは 0）, 終了位置)
+
+    # ---- 追記 ----
+    def append(self, record: dict):
+        row = dict(record)
+        row.setdefault("timestamp", self.clock().isoformat(timespec="seconds"))
+        if isinstance(row.get("red_flags"), (list, tuple)):
+            row["red_flags"] = " / ".join(row["red_flags"])
+        with self._lock:
+            self._buf.append(row)
+            if len(self._buf) >= self.buffer_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    close = flush
+
+    def _day_of(self, row) -> str:
+        """行の日付（timestamp から。読めなければ今日）"""
+        try:
+            return dt.datetime.fromisoformat(str(row.get("timestamp", ""))).strftime("%Y%m%d")
+        except ValueError:
+            return self.clock().strftime("%Y%m%d")
+
+    def _target(self, incoming: int, day: str) -> Path:
+        """書き込み先：その日のファイル。上限サイズを超える・列構成が違うなら連番を進める"""
+        path = self._path
+        if path is None or not path.name.startswith(f"painlog_{day}"):
+            today = [p for p in log_files(self.log_dir) if p.name.startswith(f"painlog_{day}")]
+            path = today[-1] if today else self.log_dir / f"painlog_{day}.csv"
+        while True:
+            size = path.stat().st_size if path.exists() else 0
+            if not size or (size + incoming <= self.max_bytes and self._header_ok(path)):
+                break
+            m = NAME_RE.match(path.name)
+            path = self.log_dir / f"painlog_{day}_{int(m.group(2) or 0) + 1:02d}.csv"
+        self._path = path
+        return path
+
+    def _header_ok(self, path) -> bool:
+        if path == self._path:
+            return True     # 自分が書いているファイル
+        with open(path, "rb") as f:
+            return _read_header(f) == LOG_FIELDS
+
+    def _flush_locked(self):
+        if not self._buf:
+            return
+        rows, self._buf = self._buf, []
+        out = io.StringIO()
+        w = csv.writer(out, lineterminator="\n")
+        lines = []
+        for row in rows:
+            out.seek(0); out.truncate()
+            w.writerow([_escape(row.get(k, "")) for k in LOG_FIELDS])
+            lines.append(out.getvalue().encode("utf-8"))
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        # 日付をまたいでバッファした行は、それぞれの行の日付のファイルへ
+        runs = itertools.groupby(zip(rows, lines), key=lambda rl: self._day_of(rl[0]))
+        with file_lock(self.log_dir / LOCK_NAME):
+            for day, run in runs:
+                run_rows, run_lines = zip(*run)
+                self._write_locked(list(run_rows), list(run_lines), day)
+
+    def _write_locked(self, rows, lines, day):
+        path = self._target(sum(map(len, lines)), day)
+        with open(path, "ab") as f:
+            fresh = f.tell() == 0
+            if fresh:
+                f.write((",".join(LOG_FIELDS) + "\n").encode("utf-8"))
+            start = off = f.tell()
+            entries = []
+            for row, line in zip(rows, lines):
+                entries.append((off, str(row.get("part", ""))))
+                off += len(line)
+            f.write(b"".join(lines))
+        if self.index:
+            if fresh or _index_path(path).exists():
+                _write_index(_index_path(path), entries)
+            else:
+                build_index(path)   # 索引なしで書かれた既存ファイル
+        for fn in self.listeners:
+            fn(path, rows, 0 if fresh else start, off)
+
+    # ---- 読み出し ----
+    def tail(self, n: int) -> list:
+        """直近 n 件（古い順）。新しいファイルから遡り、必要な分だけ末尾から読む"""
+        self.flush()
+        out = []
+        for path in reversed(log_files(self.log_dir)):
+            out = tail_records(path, n - len(out)) + out
+            if len(out) >= n:
+                break
+        return out
+
+    def tail_by_part(self, part: str, n: int) -> list:
+        """部位が一致する直近 n 件（古い順）。索引を使い、該当行だけを読む"""
+        self.flush()
+        out = []
+        for path in reversed(log_files(self.log_dir)):
+            offsets = self._part_offsets(path).get(part, [])
+            if offsets:
+                out = read_at(path, offsets[-(n - len(out)):]) + out
+            if len(out) >= n:
+                break
+        return out
+
+    def _part_offsets(self, path) -> dict:
+        idx = _index_path(path)
+        mtime = idx.stat().st_mtime_ns if idx.exists() else None
+        cached = self._idx_cache.get(path)
+        if cached and cached[0] == mtime and mtime is not None and mtime >= path.stat().st_mtime_ns:
+            return cached[1]
+        by_part = {}
+        for off, part in read_index(path):
+            by_part.setdefault(part, []).append(off)
+        self._idx_cache[path] = (idx.stat().st_mtime_ns, by_part)
+        return by_part
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_log(log_dir=LOG_DIR) -> PainLog:
+    """プロセスで共有する既定のログ（終了時にバッファを書き出す）"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = PainLog(log_dir)
+            atexit.register(_default.flush)
+        return _default
+
+
+def format_history(rows) -> str:
+    def excerpt(row):
+        if row.get("tips"):
+            return "提案:" + " | ".join(row["tips"].split(" | ")[:3])
+        return "抜粋:" + row.get("advice", "")[:160]
+
+    def times(row):
+        return f" / 同様の相談{row['count']}回" if int(row.get("count") or 1) > 1 else ""
+    return "\n".join(
+        f"部位:{row.get('part','')} / タイプ:{row.get('type','')} / 因子:{row.get('factor','')}{times(row)} / {excerpt(row)}"
+        for row in rows
+    )
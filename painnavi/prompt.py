@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# プロンプト（システムプロンプト / 利用者の要約）
+# - 固定部分（指示・見出しの指定・制作者の方針）はシステムプロンプトにまとめ、方針が同じなら毎回バイト単位で同一
+#   → API 側のプロンプトキャッシュが効く。見出しの一覧は利用者の要約には重ねて書かない
+# - 利用者の要約（可変部分）は入力欄を短い1ブロックにし、自由記載・履歴・参考資料はトークン予算に優先度順で詰める
+# - トークン数は手元の概算（painnavi.tokens）。build_prompt() は内訳も返す
+
+from functools import lru_cache
+from typing import NamedTuple
+
+from .retrieval import relevant_passages
+from .rules import H_CAUSES, H_DIFFS, H_TIPS, H_AVOID, H_REFERRAL
+from .tokens import estimate_tokens, keep_last_lines, truncate_tokens
+
+# トークン予算（概算）。方針はシステムプロンプト側、それ以外は利用者の要約側
+PROFILE_TOKENS = 1500
+USER_TOKENS = 1800
+# 可変部分の詰め込み順（優先度の高い順）：(名前, 予算が足りなくても残す最小量, 上限（None は無制限）)
+CONTEXT_PRIORITY = [("free_text", 200, None), ("history", 80, 400), ("reference", 150, None)]
+CONTEXT_LABELS = {"free_text": "症状の自由記載", "history": "似た過去の相談と出力の要旨", "reference": "参考資料の抜粋"}
+
+# 旧来の文字数予算（参考資料の索引を作るかどうかの目安に使う）
+REF_BUDGET = 2000
+
+BASE_SYSTEM_PROMPT = (
+    "あなたは腰痛・坐骨神経痛などの一般向けセルフケアを案内する理学療法の専門家です。"
+    "・“赤旗”症状（外傷/発熱/排尿排便障害/急な麻痺 など）があれば受診を最優先するよう促す。"
+    "・自宅でできる安全なセルフケア（姿勢/生活習慣/軽い運動）を短く具体的に、箇条書き中心で示す。"
+    "・専門用語は控えめ、断定的診断は避ける、痛みが増える動きは無理しないと明記する。"
+    "出力は必ず次のMarkdown見出しの順で、各セクション3〜6項目にまとめる："
+    f"{H_CAUSES}{H_DIFFS}{H_TIPS}{H_AVOID}{H_REFERRAL}"
+    "・セルフケアの提案は最低3件（目安5件）。重要度の高い順に番号付きで、末尾に（優先度★★★/★★/★）を付ける。"
+)
+
+
+@lru_cache(maxsize=32)
+def system_prompt(profile_text: str = "", profile_tokens: int = PROFILE_TOKENS) -> str:
+    """固定部分。指示を先頭に置き、方針（予算内で先頭から）を後ろに付ける"""
+    profile = truncate_tokens(profile_text.strip(), profile_tokens) if profile_text else ""
+    if profile:
+        return BASE_SYSTEM_PROMPT + "\n\n【制作者の発信・方針（回答に反映する）】\n" + profile
+    return BASE_SYSTEM_PROMPT
+
+
+def retrieval_query(intake) -> str:
+    """参考資料の検索に使う文（部位・タイプ・因子・自由記載）"""
+    return " ".join([intake.part, intake.ptype, intake.factor, intake.diurnal, intake.free_text])
+
+
+class Prompt(NamedTuple):
+    system: str
+    user: str
+    usage: dict     # 概算トークン数の内訳（system / user / total / 各資料の元の文字数と残したトークン数）
+
+
+def _intake_block(intake, detail) -> str:
+    lines = [f"部位: {intake.part} / タイプ: {intake.ptype} / 痛み強度: {intake.intensity}",
+             f"発症期間: {intake.onset} / 日内変動: {intake.diurnal} / 増悪因子・背景: {intake.factor}",
+             f"具体性: レベル{detail}（1日のルーティン・回数・頻度・所要時間の例を入れる）"]
+    if intake.proceed_note:
+        lines.insert(0, f"安全注記: {intake.proceed_note}")
+    return "\n".join(lines)
+
+
+def _fit(name, text, tokens, query, key=None):
+    if name == "history":
+        return keep_last_lines(text, tokens)                # 後ろほど関連が高い（painnavi.history）
+    if name == "reference":
+        # 予算は選んだチャンク自体のトークン数で数える（資料の先頭の文字種で文字数に換算すると、英字の目次の後に
+        # 日本語の本文が続く資料で予算の数倍になる）
+        return relevant_passages(text, query, tokens, key=key, cost=estimate_tokens) if text else ""
+    return truncate_tokens(text, tokens)
+
+
+def allocate(wanted: dict, available: int, priority=CONTEXT_PRIORITY) -> dict:
+    """各資料に割り当てるトークン数。まず全員に最小量、残りを優先度の高い順に上限まで配る"""
+    give, limit = {}, {}
+    for name, floor, cap in priority:
+        limit[name] = wanted.get(name, 0) if cap is None else min(cap, wanted.get(name, 0))
+        give[name] = min(limit[name], floor)
+    rest = available - sum(give.values())
+    if rest < 0:    # 最小量すら入らないときは優先度の低い方から削る
+        for name, *_ in reversed(priority):
+            cut = min(give[name], -rest)
+            give[name] -= cut
+            rest += cut
+            if rest >= 0:
+                break
+    for name, *_ in priority:
+        extra = min(max(0, rest), limit[name] - give[name])
+        give[name] += extra
+        rest -= extra
+    return give
+
+
+def build_prompt(intake, detail=4, profile_text="", history_text="", extra_ref="",
+                 user_tokens=USER_TOKENS, profile_tokens=PROFILE_TOKENS, ref_key=None) -> Prompt:
+    """(システムプロンプト, 利用者の要約, トークン内訳) を作る（ref_key は参考資料の索引キャッシュのキー）"""
+    system = system_prompt(profile_text or "", profile_tokens)
+    head = _intake_block(intake, detail)
+    raw = {"free_text": intake.free_text or "", "history": history_text or "", "reference": extra_ref or ""}
+    # 見出しの行（【…】）の分を先に引いておく
+    overhead = estimate_tokens(head) + sum(estimate_tokens(f"\n【{CONTEXT_LABELS[k]}】\n") for k, v in raw.items() if v)
+    # 長い資料は全体を数えない（1文字1トークン以下なので、文字数が予算を超えれば予算いっぱい欲しい）
+    wanted = {k: user_tokens if len(v) > user_tokens * 4 else estimate_tokens(v) for k, v in raw.items()}
+    give = allocate(wanted, user_tokens - overhead)
+    query = retrieval_query(intake)
+    blocks, context = [head], {}
+    for name, *_ in CONTEXT_PRIORITY:
+        text = raw[name]
+        if not text:
+            continue
+        fitted = text if give[name] >= wanted[name] else _fit(name, text, give[name], query, ref_key)
+        context[name] = {"chars": len(text), "kept": estimate_tokens(fitted)}
+        if fitted:
+            blocks.append(f"【{CONTEXT_LABELS[name]}】\n{fitted}")
+    user = "\n\n".join(blocks) + "\n"
+    s_tok, u_tok = estimate_tokens(system), estimate_tokens(user)
+    usage = {"system": s_tok, "user": u_tok, "total": s_tok + u_tok, "user_budget": user_tokens,
+             "context": context}
+    return Prompt(system, user, usage)
+
+
+def build_user_summary(intake, detail=4, profile_text="", history_text="", extra_ref="",
+                       user_tokens=USER_TOKENS) -> str:
+    """利用者の要約（可変部分）だけを返す。方針は system_prompt(profile_text) 側に入る"""
+    return build_prompt(intake, detail, profile_text, history_text, extra_ref, user_tokens).user
+
+
+def normalize_headings(md: str, fallback=None) -> str:
+    """見出しを正式名にそろえ、欠けたセクションを補って描き直す（painnavi.sections）"""
+    from .sections import normalize
+    if not isinstance(md, str):
+        try:
+            md = "" if md is None else str(md)
+        except Exception:
+            return ""
+    return normalize(md, fallback)
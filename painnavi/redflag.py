@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# 赤旗チェック（手動＋自動）
+# - 自動検出は全パターンを1つの正規表現（カテゴリごとの名前付きグループ）にまとめ、プロセスごとに1回だけコンパイル
+# - 1回の走査で「どのカテゴリの、どの語句が、どこにあったか」を返す
+
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+# (入力キー, 表示名, 画面のチェック項目)
+MANUAL_FLAGS = [
+    ("flag_trauma",   "強い外傷",                 "最近の強い外傷（転倒・交通事故など）がある"),
+    ("flag_fever",    "発熱/感染疑い",            "38℃以上の発熱や悪寒などの体調不良がある"),
+    ("flag_cauda",    "排尿排便障害/馬尾症状疑い", "排尿/排便障害・会陰部のしびれがある（馬尾症状の疑い）"),
+    ("flag_weakness", "進行する神経症状",          "足に力が入りにくい等の進行性の麻痺がある"),
+]
+
+# (カテゴリ, 表示名, パターン)  ※グループは (?:…) で書く（カテゴリ名のグループと衝突させない）
+RED_FLAG_RULES = [
+    ("cauda",    "排尿排便障害",       r"膀胱|尿(?:の|が)?出(?:ない|づらい|にくい)|失禁|直腸|便(?:が)?出ない"),
+    ("saddle",   "会陰部の症状",       r"会陰部|サドル麻痺|鞍部"),
+    ("weakness", "急な筋力低下",       r"つま先立ちできない|急(?:な|に)筋力低下|足(?:が)?急激に(?:痩|や)せ"),
+    ("systemic", "発熱/全身症状",      r"発熱|原因不明の体重減少|がん|癌"),
+    ("trauma",   "外傷",               r"交通事故|大怪我|外傷"),
+]
+RED_FLAG_PATTERNS = [rx for _, _, rx in RED_FLAG_RULES]
+
+AUTO_FLAG_LABEL = "自動検出: 危険サインの語句を含む可能性"
+PROCEED_NOTE = "（赤旗該当のため運動は控えめ。痛みが増す動きは避け、受診を最優先）"
+SOURCE_LABELS = {"free_text": "自由記載", "reference": "参考資料", "history": "過去ログ"}
+
+
+class RedFlagHit(NamedTuple):
+    category: str
+    label: str
+    start: int
+    end: int
+    phrase: str
+    source: str = "free_text"
+
+
+def _first_chars(pattern: str):
+    """トップレベルの各選択肢の先頭文字を返す（判定できないパターンは None＝先読みを付けない）"""
+    if "\\" in pattern or "[" in pattern:
+        return None
+    alts, depth, cur = [], 0, ""
+    for ch in pattern:
+        if ch == "|" and depth == 0:
+            alts.append(cur); cur = ""
+            continue
+        depth += (ch == "(") - (ch == ")")
+        cur += ch
+    alts.append(cur)
+    if any(not a or a[0] in "().^$*+?{|" or (len(a) > 1 and a[1] in "*?{") for a in alts):
+        return None
+    return {a[0] for a in alts}
+
+
+class RedFlagScanner:
+    """赤旗パターンをまとめてコンパイルし、テキストを1パスで走査する"""
+
+    def __init__(self, rules=RED_FLAG_RULES):
+        self.labels = {cat: label for cat, label, _ in rules}
+        body = "|".join(f"(?P<{cat}>{rx})" for cat, _, rx in rules)
+        firsts = set()
+        for _, _, rx in rules:
+            f = _first_chars(rx)
+            if f is None:
+                firsts = None
+                break
+            firsts |= f
+        # 先頭文字の先読みを付けると、該当しない位置での全選択肢の試行を省ける
+        if firsts:
+            body = f"(?=[{re.escape(''.join(sorted(firsts)))}])(?:{body})"
+        self.regex = re.compile(body)
+
+    def scan(self, text: str, source: str = "free_text") -> list:
+        return [RedFlagHit(m.lastgroup, self.labels[m.lastgroup], m.start(), m.end(), m.group(), source)
+                for m in self.regex.finditer(text or "")]
+
+    def search(self, text: str) -> bool:
+        return self.regex.search(text or "") is not None
+
+
+@lru_cache(maxsize=None)
+def default_scanner() -> RedFlagScanner:
+    return RedFlagScanner(RED_FLAG_RULES)
+
+
+def auto_red_flag(text: str) -> bool:
+    return default_scanner().search(text)
+
+
+def describe_hits(hits) -> str:
+    """「語句」（カテゴリ）を重複なく並べた短い説明"""
+    seen = dict.fromkeys(f"「{h.phrase}」（{h.label}）" for h in hits)
+    return "、".join(seen)
+
+
+def collect_red_flags(manual, text: str, hits=None) -> list:
+    """手動チェックの表示名リストに、自由記載からの自動検出（該当語句つき）を足して返す"""
+    red_flags = list(manual)
+    if hits is None:
+        hits = default_scanner().scan(text)
+    if hits:
+        red_flags.append(f"{AUTO_FLAG_LABEL}： {describe_hits(hits)}")
+    return red_flags
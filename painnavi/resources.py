@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# ファイル・外部ライブラリなど、プロセス内で使い回す資源（Streamlit に依存しない部分）
+
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+
+@lru_cache(maxsize=None)
+def openai_class():
+    """openai.OpenAI を返す（未インストールなら None）。import の失敗を毎回くり返さない"""
+    try:
+        from openai import OpenAI
+    except Exception:
+        return None
+    return OpenAI
+
+
+def file_signature(path):
+    """(mtime_ns, size)。ファイルが無ければ None（キャッシュの無効化キーに使う）"""
+    try:
+        st_ = Path(path).stat()
+    except OSError:
+        return None
+    return (st_.st_mtime_ns, st_.st_size)
+
+
+def read_text(path) -> str:
+    p = Path(path)
+    return p.read_text(encoding="utf-8") if p.exists() else ""
+
+
+def decode_upload(data: bytes) -> str:
+    """添付ファイルを文字列に（BOM 付きも可、壊れた文字は置換）"""
+    return data.decode("utf-8-sig", errors="replace")
+
+
+def content_key(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# 参考資料・方針テキストからの関連箇所の抽出（先頭 N 文字の切り出しの代わり）
+# - 文の区切りで数百文字のチャンクに分け、文字 n-gram（日本語向け、既定は2文字）の BM25 索引を作る
+# - 索引は本文のハッシュごとに1回だけ作る（同じ資料なら再実行で作り直さない）
+# - 問い合わせ（部位・タイプ・自由記載など）に近いチャンクを、文字数の予算内で本文の順に並べて返す
+
+import hashlib
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+
+CHUNK_SIZE = 400
+NGRAM = 2
+K1, B = 1.2, 0.75
+SEPARATOR = "\n…\n"
+
+_SENT = re.compile(r"[^。！？!?\n]*(?:[。！？!?]+|\n+|$)")
+
+
+def _norm(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def grams(text: str, n: int = NGRAM):
+    s = re.sub(r"\s+", "", _norm(text))
+    return [s[i:i + n] for i in range(len(s) - n + 1)] if len(s) >= n else ([s] if s else [])
+
+
+def chunk_text(text: str, size: int = CHUNK_SIZE) -> list:
+    """文の区切りで size 文字前後のチャンクに分ける（長すぎる文はそのまま切る）"""
+    chunks, cur = [], ""
+    for sent in _SENT.findall(text):
+        if not sent:
+            continue
+        while len(sent) > size:
+            if cur:
+                chunks.append(cur); cur = ""
+            chunks.append(sent[:size]); sent = sent[size:]
+        if len(cur) + len(sent) > size and cur:
+            chunks.append(cur); cur = ""
+        cur += sent
+    if cur.strip():
+        chunks.append(cur)
+    return [c for c in chunks if c.strip()]
+
+
+class BM25Index:
+    """チャンク集合の文字 n-gram BM25 索引（各 n-gram の寄与は作成時に計算済み）"""
+
+    def __init__(self, chunks, n: int = NGRAM):
+        self.chunks = list(chunks)
+        self.n = n
+        tfs = [Counter(grams(c, n)) for c in self.chunks]
+        lens = [sum(tf.values()) for tf in tfs]
+        avgdl = (sum(lens) / len(lens)) if lens else 1.0
+        df = Counter(g for tf in tfs for g in tf)
+        N = len(self.chunks)
+        self.postings = {}      # n-gram -> ([チャンク番号], [重み])
+        for doc, (tf, dl) in enumerate(zip(tfs, lens)):
+            norm = K1 * (1 - B + B * dl / avgdl)
+            for g, f in tf.items():
+                idf = math.log(1 + (N - df[g] + 0.5) / (df[g] + 0.5))
+                ids, ws = self.postings.setdefault(g, ([], []))
+                ids.append(doc)
+                ws.append(idf * f * (K1 + 1) / (f + norm))
+
+    @classmethod
+    def from_text(cls, text: str, size: int = CHUNK_SIZE, n: int = NGRAM):
+        return cls(chunk_text(text, size), n)
+
+    def search(self, query: str, k: int = 10) -> list:
+        """(スコア, チャンク番号) を高い順に最大 k 件"""
+        scores = {}
+        get = scores.get
+        for g in set(grams(query, self.n)):
+            p = self.postings.get(g)
+            if p is None:
+                continue
+            for doc, w in zip(*p):
+                scores[doc] = get(doc, 0.0) + w
+        return heapq.nlargest(k, ((s, d) for d, s in scores.items()))
+
+    def select(self, query: str, budget: int, cost=len) -> str:
+        """関連の高いチャンクから予算まで選び、本文の順に並べて返す（予算の単位は cost：既定は文字数）"""
+        picked, used, sep = [], 0, cost(SEPARATOR)
+        for score, doc in self.search(query, k=max(1, budget // 50)):
+            c = cost(self.chunks[doc])
+            if used + c > budget:
+                continue
+            picked.append(doc)
+            used += c + sep
+        if not picked:
+            return ""
+        return SEPARATOR.join(self.chunks[d].strip() for d in sorted(picked))
+
+
+# ---- 本文のハッシュごとの索引キャッシュ ----
+_CACHE = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+CACHE_SIZE = 8
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def get_index(text: str, key: str = None) -> BM25Index:
+    key = key or text_key(text)
+    with _CACHE_LOCK:
+        idx = _CACHE.get(key)
+        if idx is not None:
+            _CACHE.move_to_end(key)
+            return idx
+    idx = BM25Index.from_text(text)
+    with _CACHE_LOCK:
+        _CACHE[key] = idx
+        while len(_CACHE) > CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    return idx
+
+
+def relevant_passages(text: str, query: str, budget: int, key: str = None, cost=len) -> str:
+    """予算内に収まる短い本文はそのまま、長い本文は問い合わせに近い箇所だけを返す
+    （cost はチャンクの大きさの数え方。1文字あたり1以下であること：トークン数の概算など）"""
+    if not text or len(text) <= budget:
+        return text or ""
+    picked = get_index(text, key).select(query, budget, cost)
+    return picked or text[:budget]
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+# デモ用ルール表（宣言的）
+# - 各ルール：条件（部位の完全一致 / 各入力欄のキーワード）→ 原因・鑑別・セルフケア（優先度つき）・避ける動き
+# - 条件は「どれか1つでも一致すれば成立」。条件なしのルールは親ルール内の既定（else）として扱う
+# - group が同じルールは表の順で最初に成立した1件だけ採用（部位別の if/elif に相当）
+# - parent を持つルールは親ルールが採用されたときだけ評価する
+# - キーワードの照合対象：text（部位＋自由記載＋因子＋日内変動＋タイプ）/ ptype / factor / diurnal / onset / intensity / free_text
+
+# ================= 出力見出し固定 =================
+H_CAUSES   = "## 可能性のある原因（メカニズム・生活要因）"
+H_DIFFS    = "## 考えられること（鑑別の方向性：断定しない）"
+H_TIPS     = "## セルフケアの提案（手順は短く）"
+H_AVOID    = "## 避ける動き"
+H_REFERRAL = "## 受診の目安"
+
+# ================= 入力の選択肢 =================
+PART_CHOICES = ["肩/首","腰","お尻・太もも","股関節","膝","ふくらはぎ/足","肘","手首","足首","その他（自由入力）"]
+
+TYPE_OPTIONS_MAP = {
+    "腰": ["慢性的な鈍痛","急に出た鋭い痛み（ギクッと）","お尻や足に広がる/しびれる","その他（自由入力）"],
+    "お尻・太もも": ["慢性的な痛み","鋭い痛み/ピリッと走る","足先まで広がる/しびれ","その他（自由入力）"],
+    "ふくらはぎ/足": ["しびれがある","鋭い痛み","筋肉が張る・つりやすい","その他（自由入力）"],
+    "肩/首": ["動かすと痛い","しびれがある","重だるい/こり","その他（自由入力）"],
+    "股関節": ["前面が痛い","側面/お尻側が痛い","動かし始めに痛い","その他（自由入力）"],
+    "膝": ["階段で痛い","曲げ伸ばしで痛い","クリック/引っかかる","その他（自由入力）"],
+    "肘": ["物を掴むと痛い","手首を反らすと痛い","その他（自由入力）"],
+    "手首": ["反らすと痛い","手のしびれ","タイピングで悪化","その他（自由入力）"],
+    "足首": ["捻挫後","アキレス周りが痛い","長く歩くと痛い","その他（自由入力）"],
+    "その他（自由入力）": ["痛み中心","しびれ中心","こわばり/張り中心","その他（自由入力）"],
+}
+
+INTENSITY_CHOICES = ["0〜3（軽い）","4〜6（中等度）","7〜10（強い〜最強）","その他（自由入力）"]
+ONSET_CHOICES     = ["急性（〜6週間）","亜急性（6〜12週間）","慢性（3か月〜）","その他（自由入力）"]
+DIURNAL_CHOICES   = ["朝に強い","夕方〜夜に強い","変わらない","その他（自由入力）"]
+FACTOR_CHOICES    = ["長時間座りっぱなし","前かがみや重い物で悪化","朝より夕方に悪化/歩くと楽","その他（自由入力）"]
+
+# ================= ルール表 =================
+HI, MID, LOW = 3, 2, 1
+
+RULES = [
+    # ---- 部位別（最初に一致した1件のみ）----
+    {"id": "lumbar", "group": "part", "part": ["腰"],
+     "causes": ["腰部の筋・筋膜の過緊張", "骨盤/胸郭位置の崩れによる持続負荷"]},
+    {"id": "lumbar_sharp", "parent": "lumbar", "group": "lumbar.type", "any": {"ptype": ["鋭", "ギク"]},
+     "diffs": ["椎間板/靱帯ストレス（前屈で増悪）"],
+     "tips": [(HI, "台に手を置いて作業（腰を丸めすぎない）"), (HI, "仰向け膝立て＋腹式呼吸1分×3"),
+              (MID, "股関節から曲げるフォーム練習（1日3回×3分）")],
+     "avoid": ["深い前屈", "勢いよく反る"]},
+    {"id": "lumbar_radiating", "parent": "lumbar", "group": "lumbar.type", "any": {"ptype": ["しびれ", "広が"]},
+     "diffs": ["神経根刺激の可能性（長時間座位で増悪）"],
+     "tips": [(HI, "60分ごと立って1–2分歩く"), (HI, "腰当て（薄タオル）で骨盤を立てる"),
+              (MID, "背もたれ使用＋座面奥に座る")],
+     "avoid": ["長時間の座位", "無理な前屈"]},
+    {"id": "lumbar_other", "parent": "lumbar", "group": "lumbar.type",
+     "tips": [(HI, "60分ごとに立って1–2分歩く"), (MID, "股関節ヒンジ練習（1日3回×3分）")]},
+
+    {"id": "buttock", "group": "part", "part": ["お尻・太もも"],
+     "causes": ["臀筋群の硬さ/使いすぎ", "坐骨神経の滑走低下"]},
+    {"id": "buttock_sharp", "parent": "buttock", "group": "buttock.type", "any": {"ptype": ["鋭", "ピリ"]},
+     "diffs": ["梨状筋周囲の過緊張による神経刺激"],
+     "tips": [(HI, "尻ポケットに長財布/スマホを入れない"), (MID, "仰向け片膝抱えストレッチ20秒×3（左右）")]},
+    {"id": "buttock_radiating", "parent": "buttock", "group": "buttock.type", "any": {"ptype": ["しびれ", "広が"]},
+     "diffs": ["神経滑走の低下（長座/長距離運転で増悪）"],
+     "tips": [(HI, "椅子をやや高めにして股関節角度を広げる"), (MID, "短時間の早歩きを1日2回（増悪しない範囲）")]},
+    {"id": "buttock_other", "parent": "buttock", "group": "buttock.type",
+     "tips": [(MID, "臀部のやさしいボールほぐし（各30秒）")]},
+
+    {"id": "calf", "group": "part", "part": ["ふくらはぎ/足"],
+     "tips": [(HI, "ふくらはぎストレッチ20秒×3（朝/入浴後）"), (MID, "つま先上げ下げ20回×2（座位OK）")],
+     "avoid": ["急な坂道ダッシュ", "長時間の爪先立ち"]},
+    {"id": "calf_numb", "parent": "calf", "group": "calf.type", "any": {"ptype": ["しびれ"]},
+     "diffs": ["末梢神経の刺激/血流低下の可能性"]},
+    {"id": "calf_tight", "parent": "calf", "group": "calf.type", "any": {"ptype": ["張", "つり"]},
+     "diffs": ["腓腹筋・ヒラメ筋の過緊張/疲労"]},
+
+    {"id": "neck_shoulder", "group": "part", "part": ["肩/首", "肩", "首"],
+     "any": {"text": ["肩", "肩甲骨", "首", "頸", "うなじ", "回すと", "動かすと"]},
+     "causes": ["頸肩部の筋・筋膜の過緊張", "肩甲骨挙上/前傾＋胸郭後方シフト"]},
+    {"id": "neck_radiating", "parent": "neck_shoulder", "group": "neck_shoulder.type",
+     "any": {"text": ["しびれ", "腕", "手まで"]},
+     "diffs": ["頸椎神経根刺激／胸郭出口の可能性"],
+     "tips": [(HI, "スマホ首回避：画面は目線・肘90°支持"), (HI, "頸部回旋/側屈を各5回（1–2時間ごと）"),
+              (MID, "神経滑走：腕外転＋手のひら上⇄下10回")],
+     "avoid": ["長時間のうつむき", "強い牽引や強ストレッチ"]},
+    {"id": "neck_other", "parent": "neck_shoulder", "group": "neck_shoulder.type",
+     "tips": [(HI, "毎時1回の姿勢リセット（立って胸を開き深呼吸3回）"), (HI, "前鋸筋活性：四つ這いで小指球押し10回"),
+              (MID, "僧帽筋下部：壁スライド10回（肩すくめない）")]},
+
+    {"id": "hip", "group": "part", "part": ["股関節", "股"],
+     "any": {"text": ["股", "股関節", "鼠径", "そけい"]},
+     "causes": ["股関節前面の過負荷／腸腰筋・殿筋のアンバランス"],
+     "diffs": ["前方インピンジ（前傾＋内/外旋）／後方インピンジ（後傾＋外旋）傾向"],
+     "tips": [(HI, "ヒップヒンジ10回×2（背中は丸めない）"), (HI, "グルートブリッジ10回×2（痛くない範囲）"),
+              (MID, "長時間座位を避け60分ごとに立つ"), (MID, "歩幅をやや小さくして歩く")],
+     "avoid": ["反り腰の維持", "勢いよく脚を大きく振る"]},
+
+    {"id": "knee", "group": "part", "part": ["膝", "ひざ"],
+     "any": {"text": ["膝", "ひざ", "膝蓋", "階段", "しゃがむ"]},
+     "causes": ["膝蓋大腿部へのストレス増／周囲筋のアンバランス", "反張膝傾向（過伸展）"],
+     "diffs": ["膝蓋大腿痛／半月板刺激（クリック・階段で増悪など）"],
+     "tips": [(HI, "クワッドセッティング5秒×10（1日3回）"), (HI, "横向きクラムシェル10回×2（痛くない範囲）"),
+              (MID, "微屈での立位練習（わずかに膝を緩める）"), (MID, "階段は手すり使用・下りは小刻みに")],
+     "avoid": ["急な下り坂ダッシュ", "長時間の深屈曲", "膝をロックした立位"]},
+
+    {"id": "elbow", "group": "part", "part": ["肘"],
+     "any": {"text": ["肘", "テニス肘", "外側上顆", "雑巾絞り", "強い握り"]},
+     "causes": ["手首背屈筋の使いすぎによる付着部ストレス"],
+     "diffs": ["外側上顆炎（把持で増悪）"],
+     "tips": [(HI, "グリップを太めに変更（道具/マウス）"), (HI, "前腕伸筋のエキセントリック10回×2"),
+              (MID, "前腕の軽いマッサージ30秒×2"), (MID, "カウンターフォースバンド（短時間）")],
+     "avoid": ["強い握り込み・雑巾絞り反復"]},
+
+    {"id": "wrist", "group": "part", "part": ["手首", "手"],
+     "any": {"text": ["手首", "手のひら", "キーボード", "腱鞘炎", "腕立て"]},
+     "causes": ["手関節の反復伸展／屈曲による腱・神経の刺激"],
+     "diffs": ["腱鞘炎／手根管症候群の可能性"],
+     "tips": [(HI, "手首ニュートラル：手首置き利用・マウス感度UP"), (HI, "掌支持は拳/バーで代替"),
+              (MID, "正中神経グライド10回×2（増悪しない範囲）"), (MID, "20-8-2ルールでこまめに休憩")],
+     "avoid": ["深い手首反りで荷重", "長時間の同一姿勢"]},
+
+    {"id": "ankle", "group": "part", "part": ["足首", "足関節"],
+     "any": {"text": ["足首", "捻挫", "段差", "つまずき", "アキレス"]},
+     "causes": ["足関節不安定性／下腿三頭筋の過負荷"],
+     "diffs": ["外側靭帯軽度損傷／アキレス腱周囲炎の可能性"],
+     "tips": [(HI, "片脚立ち30秒×2（安全確保）→慣れたら難度UP"), (HI, "カーフレイズ10回×2（増悪しない範囲）"),
+              (MID, "足首のABC運動×1セット/日"), (MID, "凸凹路面は当面回避")],
+     "avoid": ["ジャンプ反復", "不安定な靴での長時間歩行"]},
+
+    # ---- 背景因子・期間・強さ・自由記載（共通）----
+    {"id": "sitting", "any": {"factor": ["座"]},
+     "causes": ["長時間座位で腰背部に持続的負担"],
+     "tips": [(HI, "60分ごとに立って1–2分歩く"), (MID, "座面奥に座り背もたれを使う")],
+     "avoid": ["同じ姿勢を長時間続ける"]},
+    {"id": "lifting", "any": {"factor": ["前かが", "重い物"], "text": ["持ち上げ"]},
+     "causes": ["前屈＋荷重で椎間板・靱帯にストレス"],
+     "tips": [(HI, "荷物は体に近づけ、ねじらず持ち上げる（股関節から曲げる）")],
+     "avoid": ["前かがみで重い物を持つ"]},
+    {"id": "stenosis", "any": {"diurnal": ["夕方"], "factor": ["歩くと楽"], "text": ["歩くと楽"]},
+     "diffs": ["脊柱管狭窄傾向（前屈で楽/歩行で改善しやすい）"],
+     "tips": [(MID, "5–10分の楽な散歩を1日2–3回")]},
+
+    {"id": "acute", "any": {"onset": ["急性"]},
+     "tips": [(HI, "初期48–72時間は“楽な範囲”の生活動作（安静にし過ぎない）")]},
+    {"id": "chronic", "any": {"onset": ["慢性"]},
+     "tips": [(MID, "1日の合計活動量を少しずつ増やす（週10%目安）")]},
+    {"id": "severe", "any": {"intensity": ["7", "8", "9", "10", "最強"]},
+     "tips": [(HI, "短時間・低負荷で様子見し、楽な姿勢で休む")],
+     "avoid": ["痛みが増える動きの反復"]},
+
+    {"id": "running", "any": {"free_text": ["ラン", "ジョグ", "走"]},
+     "diffs": ["オーバーユース（走行距離/ペース急増）"],
+     "tips": [(MID, "距離を半分・ペース1段階下げて1週間様子見")]},
+    {"id": "desk", "any": {"free_text": ["デスク", "PC", "運転"]},
+     "tips": [(MID, "作業環境：モニタ目線・肘90°・足裏は床ベタ置き")]},
+]
+
+# ---- 該当ルールが無いときの既定 ----
+DEFAULT_CAUSES = ["姿勢や活動量の偏りによる筋・筋膜の過緊張"]
+DEFAULT_DIFFS  = ["筋・筋膜性の痛みの傾向"]
+DEFAULT_AVOID  = ["急に重い物を持つ", "痛みが増える動作の反復"]
+
+# ---- セルフケアを3〜5件に揃えるための補充 ----
+PAD_POOL = [
+    "60分ごとに1–2分立って歩く（タイマー推奨）",
+    "前かがみ作業は股関節から曲げるフォーム練習を1日3回×3分",
+    "ふくらはぎストレッチ20秒×3（朝/入浴後）",
+    "5–10分の楽な歩行を1日2回",
+    "腰に薄いタオルを当てて座る（骨盤を立てる）",
+]
+BASE_TIPS = [
+    (HI, "60分ごとに1–2分立って歩く（タイマー推奨）"),
+    (HI, "前かがみ作業は股関節から曲げるフォーム練習"),
+    (MID, "5–10分の楽な歩行を1日2回"),
+]
+
+# ---- ルール表以外のセルフケア項目（painnavi.tips のカタログに加わる）----
+# {"id": 一意な ID, "text": 文, "priority": 表示の★の数, "weights": {特徴量名: 重み}}
+# 特徴量名："part=腰" のような選択肢の完全一致 / "factor~座" のような入力欄のキーワード / "rule:lumbar" / "bias"
+# 重みの合計が点数。ルール表の項目は 優先度（3/2/1）前後の点数なので、その間に入れたい項目はその大きさで
+TIP_CATALOG = []
+
+REFERRAL_NOTES = [
+    "発熱・外傷後・排尿排便障害・急な麻痺/広範なしびれ",
+    "改善が数週間以上乏しい/夜間増悪/歩行困難が続く",
+]
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+# LLM 呼び出しの受付制御（プロセスに1つ。Streamlit の全セッションで共有）
+# - 同時に API へ出す数は max_concurrency まで。空きを待つのは max_queue 件まで（超えたら即座に断る）、
+#   queue_timeout 秒待っても空かなければ諦める → どちらも呼び出し側はデモエンジンで続行
+# - 同じプロンプト（system・要約・モデル）が処理中なら API は1回だけ呼び、届いたトークンを全員に配る
+# - サーキットブレーカ：API の失敗が failure_threshold 回続いたら reset_timeout 秒は呼ばずに即座に断る。
+#   時間が過ぎたら1件だけ試し、成功すれば再開
+# - 待ち行列の長さ・処理中の数・待ち時間・合流/拒否の回数は painnavi.metrics に記録
+# 設定：PAINNAVI_LLM_CONCURRENCY / PAINNAVI_LLM_QUEUE / PAINNAVI_LLM_QUEUE_TIMEOUT（秒）
+
+import contextlib
+import os
+import threading
+import time
+from functools import lru_cache
+
+from .llm import cache_key, stream_chat
+from .metrics import default_metrics
+
+MAX_CONCURRENCY = 4
+MAX_QUEUE = 32
+QUEUE_TIMEOUT = 20.0
+FAILURE_THRESHOLD = 3
+RESET_TIMEOUT = 30.0
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class LLMUnavailable(RuntimeError):
+    """API を呼ばずに断った（混雑・障害）。呼び出し側はデモエンジンで続行する"""
+
+
+class QueueFull(LLMUnavailable):
+    pass
+
+
+class QueueTimeout(LLMUnavailable):
+    pass
+
+
+class CircuitOpen(LLMUnavailable):
+    pass
+
+
+class _Flight:
+    """処理中の1回の API 呼び出し。届いたチャンクを貯め、合流した全員が先頭から読む"""
+
+    def __init__(self, key):
+        self.key = key
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.usage = {}
+        self.wait_s = 0.0
+        self.cond = threading.Condition()
+
+    def push(self, chunk):
+        with self.cond:
+            self.chunks.append(chunk)
+            self.cond.notify_all()
+
+    def finish(self, error=None):
+        with self.cond:
+            self.done, self.error = True, error
+            self.cond.notify_all()
+
+    def follow(self, usage=None):
+        t0 = time.perf_counter()
+        i = 0
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: len(self.chunks) > i or self.done)
+                new, done, error = self.chunks[i:], self.done, self.error
+            if new:
+                if usage is not None and i == 0:
+                    usage["first_token_s"] = time.perf_counter() - t0
+                i += len(new)
+                yield "".join(new)
+                continue
+            if error is not None:
+                raise error
+            if done:
+                return
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, max_queue=MAX_QUEUE, queue_timeout=QUEUE_TIMEOUT,
+                 failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT, metrics=None):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.metrics = metrics if metrics is not None else default_metrics()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._flights = {}      # キー -> 処理中の _Flight
+        self.waiting = self.running = 0
+        # サーキットブレーカ
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial = False     # HALF_OPEN で試しの1件を出したか
+
+        self.metrics.gauge("llm_queue_depth", lambda: self.waiting)
+        self.metrics.gauge("llm_inflight", lambda: self.running)
+        self.metrics.gauge("llm_circuit_open", lambda: int(self.state != CLOSED))
+
+    # ---- 受付 ----
+    def stream(self, client, system: str, user: str, model: str, temperature=0.6, cache=None, usage=None):
+        """stream_chat と同じく応答を届いた分から返す。断ったときは LLMUnavailable を送出する"""
+        key = cache_key(system, user, model)
+        if cache is not None:
+            hit = cache.get(key)
+            if hit is not None:
+                if usage is not None:
+                    usage.update(prompt_tokens=0, completion_tokens=0, cached=True, estimated=False)
+                yield hit
+                return
+        flight, leader = self._admit(key, client, system, user, model, temperature, cache)
+        yield from flight.follow(usage)
+        if usage is not None:
+            usage.update({k: v for k, v in flight.usage.items() if k != "first_token_s"},
+                         queue_wait_s=flight.wait_s, coalesced=not leader)
+            if not leader:      # トークンは呼び出した1件（先頭）だけに数える
+                usage.update(prompt_tokens=0, completion_tokens=0)
+
+    def _admit(self, key, *call):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.metrics.inc("llm_coalesced")
+                return flight, False
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.metrics.inc("llm_short_circuited")
+                    raise CircuitOpen("LLM API の失敗が続いているため、しばらく呼び出しを止めています")
+                self.state, self._trial = HALF_OPEN, False
+            if self.state == HALF_OPEN:
+                if self._trial:
+                    self.metrics.inc("llm_short_circuited")
+                    raise CircuitOpen("LLM API の復旧を確認中です")
+                self._trial = True
+            if self.waiting >= self.max_queue:
+                self.metrics.inc("llm_rejected")
+                if self.state == HALF_OPEN:
+                    self._trial = False
+                raise QueueFull("LLM API の待ち行列がいっぱいです")
+            flight = self._flights[key] = _Flight(key)
+            self.waiting += 1
+        threading.Thread(target=self._run, args=(flight, *call), daemon=True).start()
+        return flight, True
+
+    # ---- 実行（API 呼び出し1回ごとのスレッド） ----
+    def _run(self, flight, client, system, user, model, temperature, cache):
+        t0 = time.perf_counter()
+        got = self._slots.acquire(timeout=self.queue_timeout)
+        flight.wait_s = time.perf_counter() - t0
+        with self._lock:
+            self.waiting -= 1
+            if got:
+                self.running += 1
+        if self.metrics.enabled:
+            self.metrics.observe("llm_queue_wait", flight.wait_s)
+        error = None
+        try:
+            if not got:
+                self.metrics.inc("llm_queue_timeouts")
+                raise QueueTimeout(f"LLM API の空きを {self.queue_timeout:g} 秒待ちましたが順番が来ませんでした")
+            if self.state == OPEN:      # 待っている間に遮断された
+                self.metrics.inc("llm_short_circuited")
+                raise CircuitOpen("LLM API の失敗が続いているため、しばらく呼び出しを止めています")
+            self.metrics.inc("llm_upstream_calls")
+            try:
+                for chunk in stream_chat(client, system, user, model, temperature, usage=flight.usage):
+                    flight.push(chunk)
+            except Exception:
+                self.metrics.inc("llm_upstream_errors")
+                self._record(False)
+                raise
+            self._record(True)
+            text = "".join(flight.chunks).strip()
+            if cache is not None and text:
+                with contextlib.suppress(OSError):
+                    cache.put(flight.key, text, model=model)
+        except Exception as e:
+            error = e
+        finally:
+            with self._lock:
+                if got:
+                    self.running -= 1
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
+                if error is not None and not got and self.state == HALF_OPEN:
+                    self._trial = False     # 試しの1件が API まで届かなかった
+            if got:
+                self._slots.release()
+            flight.finish(error)
+
+    def _record(self, ok: bool):
+        with self._lock:
+            if ok:
+                self.state, self.failures = CLOSED, 0
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.metrics.inc("llm_circuit_opened")
+                self.state, self._opened_at = OPEN, time.monotonic()
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self.failures, "waiting": self.waiting,
+                "running": self.running, "inflight_prompts": len(self._flights)}
+
+
+@lru_cache(maxsize=None)
+def default_scheduler() -> LLMScheduler:
+    """プロセスごとに1つ（環境変数で上限を変更）"""
+    return LLMScheduler(
+        max_concurrency=int(os.environ.get("PAINNAVI_LLM_CONCURRENCY", MAX_CONCURRENCY)),
+        max_queue=int(os.environ.get("PAINNAVI_LLM_QUEUE", MAX_QUEUE)),
+        queue_timeout=float(os.environ.get("PAINNAVI_LLM_QUEUE_TIMEOUT", QUEUE_TIMEOUT)),
+    )
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# 出力の5セクション（原因/鑑別/セルフケア/避ける動き/受診の目安）を構造化して扱う
+# - 文字列を少しずつ受け取り（ストリーミング可）、完成した行だけを1回ずつ処理する＝全体で線形時間
+# - 見出しは正式名・別名・括弧書きを省いた短縮名のどれでも認識（辞書引き）
+# - 結果はエンジンの evaluate() と同じ形の dict：tips は (優先度, 文)、その他は文のリスト
+#   優先度の書かれていない提案は UNRANKED（None）のまま＝描き直しても★を付けない
+# - 字下げした行（入れ子の箇条書き）・箇条書きでない行・知らない小見出しは直前の項目の続き（項目の文に改行でつなぐ）
+#   区切り線（---）は読み飛ばす
+# - 最初の見出しより前の文（注意書きなど）は preamble として残し、描き直すときも先頭に置く
+# - 欠けたセクションは1つずつ補い、render() で Markdown に戻す
+
+import re
+
+from .engine import render
+from .rules import H_CAUSES, H_DIFFS, H_TIPS, H_AVOID, H_REFERRAL, MID
+
+SECTIONS = [("causes", H_CAUSES), ("diffs", H_DIFFS), ("tips", H_TIPS), ("avoid", H_AVOID), ("referral", H_REFERRAL)]
+HEADING_ALIASES = {
+    "回避の動き": "avoid",
+    "回避すべき動き": "avoid",
+    "注意すべき動き": "avoid",
+    "受診すべき場合": "referral",
+    "注意が必要なサイン": "referral",
+}
+# 補う内容の既定（旧 normalize_headings のテンプレと同じ見た目になる）
+PLACEHOLDER = {"causes": [""], "diffs": [""], "tips": [(MID, "")], "avoid": [""], "referral": [""]}
+
+UNRANKED = None
+CONT_INDENT = "   "         # 字下げの無い続きの行を項目の中に入れる字下げ
+
+# 箇条書きの印の後には空白が要る（**太字**・1.5kg などを項目の始まりと見なさない）。・と • は空白なしも可
+_ITEM = re.compile(r"^\s*(?:(?:[-*]|\d+[.)．])\s+|[・•]\s*)(.*)$")
+_RULE = re.compile(r"^\s*([-*_])(?:\s*\1){2,}\s*$")   # 区切り線（---・***・___）
+_PRIORITY = re.compile(r"\s*[（(]優先度(★{1,3})[）)]\s*$")
+
+
+def _heading_key(text: str) -> str:
+    return text.lstrip("#").strip()
+
+
+def _short(text: str) -> str:
+    return re.split(r"[（(]", text, 1)[0].strip()
+
+
+_HEADINGS = {}
+for _key, _h in SECTIONS:
+    _HEADINGS[_heading_key(_h)] = _key
+    _HEADINGS.setdefault(_short(_heading_key(_h)), _key)
+for _alias, _key in HEADING_ALIASES.items():
+    _HEADINGS[_alias] = _key
+
+
+def section_of(line: str):
+    """見出し行ならセクション名、そうでなければ None"""
+    if not line.lstrip().startswith("#"):
+        return None
+    text = _heading_key(line)
+    return _HEADINGS.get(text) or _HEADINGS.get(_short(text))
+
+
+def parse_tip(text: str):
+    m = _PRIORITY.search(text)
+    if m:
+        return len(m.group(1)), text[:m.start()].strip()
+    return UNRANKED, text.strip()
+
+
+class SectionParser:
+    """Markdown をチャンク単位で受け取り、セクションごとの項目に振り分ける"""
+
+    def __init__(self):
+        self._buf = ""
+        self._cur = None
+        self._indent = None     # いまのセクションの項目の字下げ
+        self.seen = set()
+        self.preamble = []
+        self.sections = {key: [] for key, _ in SECTIONS}
+
+    def feed(self, chunk: str):
+        if not chunk:
+            return
+        self._buf += chunk
+        if "\n" not in chunk:
+            return
+        *lines, self._buf = self._buf.split("\n")
+        for line in lines:
+            self._line(line)
+
+    def tee(self, chunks):
+        """チャンクを解析しながらそのまま流す（ストリーミング表示と同時に解析）"""
+        for c in chunks:
+            self.feed(c)
+            yield c
+
+    def _line(self, line: str):
+        key = section_of(line)
+        if key:
+            self._cur, self._indent = key, None
+            self.seen.add(key)
+            return
+        if self._cur is None:
+            self.preamble.append(line.rstrip())
+            return
+        if not line.strip() or _RULE.match(line):
+            return
+        items = self.sections[self._cur]
+        indent = len(line) - len(line.lstrip())
+        if line.lstrip().startswith("#"):   # 知らない小見出し（### 補足 など）は項目にしない
+            if not items:
+                return
+            m = None
+        else:
+            m = _ITEM.match(line)
+        if items and not (m and indent <= self._indent):
+            # 入れ子の箇条書き・段落は直前の項目の続き（字下げは項目からの相対に）
+            rest = line.rstrip()[min(indent, self._indent):]
+            rest = rest if rest[:1].isspace() else CONT_INDENT + rest
+            if self._cur == "tips":
+                pr, text = items[-1]
+                items[-1] = (pr, f"{text}\n{rest}")
+            else:
+                items[-1] = f"{items[-1]}\n{rest}"
+            return
+        if self._indent is None:
+            self._indent = indent
+        text = (m.group(1) if m else line).strip()
+        items.append(parse_tip(text) if self._cur == "tips" else text)
+
+    def close(self) -> dict:
+        if self._buf:
+            self._line(self._buf)
+            self._buf = ""
+        out = {k: list(v) for k, v in self.sections.items()}
+        preamble = "\n".join(self.preamble).strip("\n")
+        if preamble:
+            out["preamble"] = preamble
+        return out
+
+    @property
+    def missing(self) -> list:
+        return [k for k, _ in SECTIONS if k not in self.seen or not self.sections[k]]
+
+
+def parse_sections(md: str) -> dict:
+    p = SectionParser()
+    p.feed(md)
+    return p.close()
+
+
+def repair(sections: dict, fallback=None) -> dict:
+    """空・欠落のセクションを fallback（無ければ空のテンプレ）で1つずつ補う"""
+    out = {"preamble": sections["preamble"]} if sections.get("preamble") else {}
+    for key, _ in SECTIONS:
+        items = sections.get(key) or []
+        out[key] = list(items) if items else list((fallback or {}).get(key) or PLACEHOLDER[key])
+    return out
+
+
+def normalize(md: str, fallback=None) -> str:
+    return render(repair(parse_sections(md), fallback))
+
+
+def compact(sections: dict) -> dict:
+    """ログ用の短い表現（項目を「 | 」でつなぐ。項目内の改行は空白に。tips は優先度があれば ★ を前に付ける）"""
+    out = {}
+    for key, _ in SECTIONS:
+        items = sections.get(key) or []
+        if key == "tips":
+            items = [f"{'★' * pr} {t}" if pr else t for pr, t in items]
+        out[key] = " | ".join(" ".join(x.split()) for x in items if x)
+    return out
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# 複数セッション（・複数プロセス）で共有するファイルの扱い
+# - 書き込みは同じフォルダの一時ファイル → fsync → 置換（読む側が書きかけを見ることはない）
+# - 書き込みと追記は助言ロック（fcntl.flock、ファイル横の .lock）で直列化。fcntl が無い環境はプロセス内のロックのみ
+# - SharedText はプロセスに1つの読み込み済みの写し。stat して (mtime, size) が同じなら読み直さない
+#   version は書き込み・外部の変更ごとに増える整数（セッション側は数値の比較だけで更新に気づける）
+
+import contextlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from .resources import file_signature
+
+try:
+    import fcntl
+except ImportError:     # Windows など
+    fcntl = None
+
+LOCK_SUFFIX = ".lock"
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(path: Path) -> threading.Lock:
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(str(path), threading.Lock())
+
+
+@contextlib.contextmanager
+def file_lock(path, shared=False):
+    """path 用の助言ロック（path + ".lock" を flock）。プロセス内のスレッド同士も直列化する"""
+    path = Path(path)
+    lock_path = path.with_name(path.name + LOCK_SUFFIX)
+    with _thread_lock(lock_path):
+        if fcntl is None:
+            yield
+            return
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+def _mode_for(path: Path) -> int:
+    try:
+        return path.stat().st_mode & 0o777
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def atomic_write_text(path, text: str, encoding="utf-8"):
+    """一時ファイルに書いて fsync し、置換する（途中で落ちても元のファイルか新しいファイルのどちらか）"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        os.chmod(tmp, _mode_for(path))      # mkstemp は 0600 で作るので、元の（無ければ通常の）権限に戻す
+        with os.fdopen(fd, "w", encoding=encoding, newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+class SharedText:
+    """テキストファイルのプロセス内キャッシュ（書き込みで更新、外部の変更は stat で検出）"""
+
+    def __init__(self, path, encoding="utf-8"):
+        self.path = Path(path)
+        self.encoding = encoding
+        self.version = 0
+        self.reads = self.writes = 0
+        self._sig = None
+        self._text = ""
+        self._lock = threading.Lock()
+
+    def read(self) -> str:
+        """最新の内容（変わっていなければディスクは読まない）"""
+        sig = file_signature(self.path)
+        if sig == self._sig:
+            return self._text
+        with self._lock:
+            if sig != self._sig:
+                with file_lock(self.path, shared=True):
+                    sig = file_signature(self.path)
+                    text = self.path.read_text(encoding=self.encoding) if sig else ""
+                self._text, self._sig = text, sig
+                self.version += 1
+                self.reads += 1
+            return self._text
+
+    def write(self, text: str):
+        with self._lock, file_lock(self.path):
+            atomic_write_text(self.path, text, self.encoding)
+            self._text, self._sig = text, file_signature(self.path)
+            self.version += 1
+            self.writes += 1
+
+    def invalidate(self):
+        """次の read() で必ず読み直す"""
+        with self._lock:
+            self._sig = None
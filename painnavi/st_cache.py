@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# Streamlit の再実行ごとに作り直さないための資源キャッシュ
+# - プロセス共有の資源（ルール表・デモ表・赤旗パターン・ログ・過去ログの索引・openai・LLM クライアントと呼び出しの受付制御）は st.cache_resource で1回だけ
+# - 方針ファイルはプロセスに1つの写し（painnavi.shared.SharedText：書き込みで更新、外部の変更は stat で検出）
+# - 添付（デコード結果・赤旗語句のスキャン結果）は st.cache_data（file_id/内容ハッシュで無効化）
+
+import streamlit as st
+
+from .advice_cache import default_cache
+from .history import default_history
+from .llm import ResponseCache, make_client
+from .metrics import default_metrics
+from .painlog import default_log
+from .redflag import default_scanner
+from .resources import openai_class, decode_upload, content_key
+from .scheduler import default_scheduler
+from .shared import SharedText
+
+
+@st.cache_resource(show_spinner=False)
+def shared_resources() -> dict:
+    res = {
+        "advice": default_cache(),
+        "scanner": default_scanner(),
+        "log": default_log(),
+        "history": default_history(),
+        "OpenAI": openai_class(),
+        "llm_cache": ResponseCache(),
+        "metrics": default_metrics(),
+        "llm_scheduler": default_scheduler(),
+    }
+    res["metrics"].ratio("advice", lambda: res["advice"].stats()["hit_ratio"])
+    res["metrics"].ratio("llm_response", res["llm_cache"].hit_ratio)
+    return res
+
+
+@st.cache_resource(show_spinner=False)
+def llm_client(api_key: str, base_url: str = ""):
+    """APIキー・接続先ごとに1つのクライアント（HTTP接続プールを共有）"""
+    return make_client(api_key, base_url)
+
+
+@st.cache_resource(show_spinner=False)
+def shared_text(path: str) -> SharedText:
+    """全セッションで共有するファイルの写し（保存は一時ファイル→置換、ロックつき）"""
+    return SharedText(path)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _decoded(key: str, _data: bytes) -> str:
+    return decode_upload(_data)
+
+
+def uploaded_text(uploaded) -> str:
+    """添付ファイルの文字列。同じファイルなら再実行でもデコードし直さない"""
+    if uploaded is None:
+        return ""
+    data = uploaded.getvalue()
+    key = getattr(uploaded, "file_id", None) or content_key(data)
+    return _decoded(f"{key}:{len(data)}", data)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _reference_hits(key: str, _text: str) -> list:
+    return default_scanner().scan(_text, "reference")
+
+
+def reference_hits(text: str, key: str = None) -> list:
+    """参考資料の赤旗語句。同じ添付なら再実行でもスキャンし直さない（key は索引キャッシュと同じ）"""
+    if not text:
+        return []
+    return _reference_hits(key or f"{content_key(text.encode('utf-8'))}:{len(text)}", text)
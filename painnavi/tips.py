@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+# セルフケア提案のカタログと採点（デモエンジンの「セルフケアの提案」）
+# - 項目ごとに ID・表示の優先度（★の数）・特徴量ごとの重みを持つ。同じ文の項目は同じ ID
+# - 特徴量（入力 → 0/1 のベクトル）：
+#     part=部位 / ptype=タイプ / intensity=強さ / onset=期間 / diurnal=日内変動 / factor=因子（選択肢の完全一致）
+#     <入力欄>~<キーワード>（照合はエンジンのオートマトン。入力欄は text・ptype・factor・free_text など）
+#     rule:<ルールID>（成立したルール） / bias（常に 1）
+# - ルール表の tips は「そのルールが成立した」特徴量に 重み＝優先度 − 表の順 × ORDER_EPS を持つ項目になる
+#   → 優先度の高い順、同じなら表の順（段階の★だけで並べていた頃と同じ並び）。追加の項目は任意の重みで間に入る
+# - 採点は疎な行列（特徴量ごとの列：項目番号と重み）× 特徴ベクトルを np.bincount 1回で計算。
+#   ルールの数だけ特徴量が増えるので密な行列は持たない。複数の入力は (入力, 項目) の組にして1回でまとめて採点
+# - 点数の上位から ID の重複を除いて limit 件まで。足りなければ pad → base（minimum 件まで）の順で補う
+
+from typing import NamedTuple
+
+import numpy as np
+
+from .rules import BASE_TIPS, MID, PAD_POOL
+
+ORDER_EPS = 1e-6
+EXACT_FIELDS = ("part", "ptype", "intensity", "onset", "diurnal", "factor")
+LIMIT, MINIMUM = 5, 3
+TOPK_FACTOR = 4             # 重複除去に備えて limit の何倍を先に選ぶか
+BATCH = 256                 # まとめて採点する入力数（点数の表は 入力数 × 項目数）
+MEMO_SIZE = 4096
+
+
+class Tip(NamedTuple):
+    """カタログの1項目（weights：特徴量名 -> 重み）"""
+    id: str
+    text: str
+    priority: int
+    weights: dict
+
+
+def rule_tips(rules) -> list:
+    """ルール表の tips をカタログの項目にする（同じ文には最初に出たときの ID を使う）"""
+    ids, out = {}, []
+    for r in rules:
+        for j, (pr, text) in enumerate(r.get("tips", ())):
+            tid = ids.setdefault(text, f"{r['id']}.{j}")
+            out.append(Tip(tid, text, pr, {f"rule:{r['id']}": pr - len(out) * ORDER_EPS}))
+    return out
+
+
+def as_tip(x) -> Tip:
+    if isinstance(x, Tip):
+        return x
+    return Tip(x["id"], x["text"], x.get("priority", MID), dict(x.get("weights", {})))
+
+
+class TipCatalog:
+    def __init__(self, tips, pad=PAD_POOL, base=BASE_TIPS, min_score=0.0):
+        self.tips = [as_tip(t) for t in tips]
+        self.min_score = min_score
+        self._memo = {}             # (特徴量の組, limit, minimum) -> 選んだ提案
+        id_of = {}
+        for t in self.tips:
+            id_of.setdefault(t.text, t.id)
+        # 補充は文が同じならカタログと同じ ID（選ばれていれば足さない）
+        self.pad = [(id_of.get(t, f"pad:{t}"), MID, t) for t in pad]
+        self.base = [(id_of.get(t, f"pad:{t}"), pr, t) for pr, t in base]
+
+        self.features = {}          # 特徴量名 -> 列番号
+        entries = []                # (列, 項目, 重み)
+        for i, t in enumerate(self.tips):
+            for name, w in t.weights.items():
+                entries.append((self.features.setdefault(name, len(self.features)), i, float(w)))
+        entries.sort(key=lambda e: e[0])
+        cols = np.array([e[0] for e in entries], dtype=np.intp)
+        self.indptr = np.searchsorted(cols, np.arange(len(self.features) + 1)).astype(np.intp)
+        self.rows = np.array([e[1] for e in entries], dtype=np.intp)
+        self.vals = np.array([e[2] for e in entries], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.tips)
+
+    def keywords(self) -> list:
+        """(入力欄, キーワード)：エンジンの照合に加える語"""
+        return [tuple(name.split("~", 1)) for name in self.features if "~" in name]
+
+    # ---- 特徴ベクトル（値が 1 の列番号の配列） ----
+    def encode(self, intake, hits=None, fired=()) -> np.ndarray:
+        names = [f"{f}={getattr(intake, f)}" for f in EXACT_FIELDS]
+        names += [f"{f}~{w}" for f, ws in (hits or {}).items() for w in ws]
+        names += [f"rule:{r}" for r in fired]
+        names.append("bias")
+        get = self.features.get
+        return np.array([c for c in map(get, names) if c is not None], dtype=np.intp)
+
+    # ---- 採点 ----
+    def scores(self, batch) -> np.ndarray:
+        """各入力（encode の結果）に対する全項目の点数。形は (入力数, 項目数)"""
+        n, size = len(batch), len(self.tips)
+        if not n:
+            return np.zeros((0, size))
+        cols = np.concatenate(batch)
+        owner = np.repeat(np.arange(n), [len(c) for c in batch])
+        starts = self.indptr[cols]
+        lens = self.indptr[cols + 1] - starts
+        # 選ばれた列の非ゼロ要素の位置を並べる（列ごとの区間をつなげる）
+        pos = np.arange(lens.sum()) - np.repeat(np.cumsum(lens) - lens, lens) + np.repeat(starts, lens)
+        flat = np.bincount(self.rows[pos] + size * np.repeat(owner, lens), weights=self.vals[pos],
+                           minlength=n * size)
+        return flat.reshape(n, size)
+
+    def select(self, s, limit=LIMIT, minimum=MINIMUM) -> list:
+        """点数の上位から ID の重複を除いて (優先度, 文) を limit 件まで。足りなければ補充"""
+        idx = np.flatnonzero(s > self.min_score)
+        k = TOPK_FACTOR * limit
+        cut = len(idx) > k
+        if cut:     # 上位 k 件（k 番目と同点も含む）だけを並べる
+            kth = -np.partition(-s[idx], k - 1)[k - 1]
+            idx = idx[s[idx] >= kth]
+        out, seen = self._take(s, idx, limit)
+        if cut and len(out) < limit:    # 重複が多くて足りなかった
+            out, seen = self._take(s, np.flatnonzero(s > self.min_score), limit)
+        for tid, pr, text in self.pad:
+            if len(out) >= limit:
+                break
+            if tid not in seen:
+                out.append((pr, text)); seen.add(tid)
+        for tid, pr, text in self.base:
+            if len(out) >= minimum:
+                break
+            if tid not in seen:
+                out.append((pr, text)); seen.add(tid)
+        return out[:limit]
+
+    def _take(self, s, idx, limit):
+        out, seen = [], set()
+        for i in idx[np.lexsort((idx, -s[idx]))]:     # 点数の高い順、同点は項目の順
+            t = self.tips[i]
+            if t.id in seen:
+                continue
+            seen.add(t.id)
+            out.append((t.priority, t.text))
+            if len(out) >= limit:
+                break
+        return out, seen
+
+    # ---- 選択（特徴量の組が同じなら結果も同じ → 組ごとに覚えておく） ----
+    def rank(self, features, limit=LIMIT, minimum=MINIMUM) -> list:
+        key = (features.tobytes(), limit, minimum)
+        hit = self._memo.get(key)
+        if hit is None:
+            hit = self._remember(key, self.select(self.scores([features])[0], limit, minimum))
+        return list(hit)
+
+    def rank_many(self, batch, limit=LIMIT, minimum=MINIMUM) -> list:
+        """複数の入力の提案。まだ見ていない特徴量の組だけを、BATCH 件ずつまとめて採点する"""
+        keys = [(f.tobytes(), limit, minimum) for f in batch]
+        found, todo = {}, {}
+        for key, f in zip(keys, batch):
+            hit = self._memo.get(key)
+            if hit is not None:
+                found[key] = hit
+            elif key not in found:
+                todo.setdefault(key, f)
+        # 結果は手元に集める（途中で覚えておく表が一杯になって消えても返せるように）
+        todo = list(todo.items())
+        for i in range(0, len(todo), BATCH):
+            part = todo[i:i + BATCH]
+            for (key, _), s in zip(part, self.scores([f for _, f in part])):
+                found[key] = self._remember(key, self.select(s, limit, minimum))
+        return [list(found[k]) for k in keys]
+
+    def _remember(self, key, tips):
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[key] = tips = tuple(tips)
+        return tips
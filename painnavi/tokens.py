@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# トークン数の概算と切り詰め（API を呼ばずに手元で見積もる）
+# - 英数字・記号（ASCII）は約4文字で1トークン、日本語などそれ以外は1文字で約1トークンとして数える
+# - 実際のトークナイザより少し多めに出る（予算を超えない側に倒す）
+
+import re
+
+_ASCII_RUN = re.compile(r"[\x00-\x7f]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数の概算"""
+    if not text:
+        return 0
+    ascii_chars = sum(len(m) for m in _ASCII_RUN.findall(text))
+    return (len(text) - ascii_chars) + -(-ascii_chars // 4)
+
+
+def chars_for(text: str, max_tokens: int) -> int:
+    """先頭から max_tokens に収まる文字数"""
+    if max_tokens <= 0:
+        return 0
+    if len(text) <= max_tokens:
+        return len(text)    # 1文字は高々1トークン
+    cost = 0.0              # 先頭から数える（長い本文でも予算分しか見ない）
+    for i, ch in enumerate(text):
+        cost += 0.25 if ch < "\x80" else 1.0
+        if cost > max_tokens:
+            return i
+    return len(text)
+
+
+def truncate_tokens(text: str, max_tokens: int, marker: str = "…") -> str:
+    """先頭から max_tokens に収まるところで切る（切ったときは末尾に marker）"""
+    n = chars_for(text, max_tokens - estimate_tokens(marker))
+    if n >= len(text):
+        return text
+    return text[:max(0, n)].rstrip() + marker
+
+
+def keep_last_lines(text: str, max_tokens: int) -> str:
+    """新しい行（末尾）から max_tokens に収まるだけ残す（履歴用。行の途中では切らない）"""
+    kept, used = [], 0
+    for line in reversed(text.splitlines()):
+        t = estimate_tokens(line) + 1
+        if used + t > max_tokens:
+            break
+        kept.append(line)
+        used += t
+    return "\n".join(reversed(kept))